@@ -1,8 +1,40 @@
+import importlib
 import os
 import shutil
+import sys
 import maya.cmds as cmds
 import maya.mel as mel
 
+# The shelf button only imports the installed module, so Python's bytecode
+# cache applies and the shelf file stays small
+SHELF_COMMAND = """import twosify_script
+twosify_script.launch()"""
+
+# Right-click item on the shelf button, picks up edits to the installed module
+RELOAD_COMMAND = """import twosify_script
+twosify_script.launch(reload_if_changed=True)"""
+
+
+def deploy_module(script_path):
+    """
+    Copies twosify_script.py into Maya's user scripts directory, which is on
+    sys.path, and reloads it if this session already imported an older copy.
+    Returns the installed path.
+    """
+    scripts_dir = cmds.internalVar(userScriptDir=True)
+    if not os.path.exists(scripts_dir):
+        os.makedirs(scripts_dir)
+    target_path = os.path.join(scripts_dir, os.path.basename(script_path))
+    shutil.copy(script_path, target_path)
+    print(f"Installed Twosify module to {target_path}")
+
+    if scripts_dir not in sys.path:
+        sys.path.append(scripts_dir)
+    if "twosify_script" in sys.modules:
+        importlib.reload(sys.modules["twosify_script"])
+    return target_path
+
+
 def create_shelf_from_script():
     # Path to this file
     this_dir = os.path.dirname(__file__)
@@ -56,9 +88,11 @@ def create_shelf_from_script():
         cmds.warning(f"Could not find {script_name} next to DragAndDrop.py")
         return
 
-    # Read the script content
-    with open(script_path, "r", encoding="utf-8") as f:
-        script_content = f.read()
+    try:
+        deploy_module(script_path)
+    except Exception as e:
+        cmds.warning(f"Could not install {script_name}: {e}")
+        return
 
     # Get current shelf
     shelf = mel.eval('$gShelfTopLevel=$gShelfTopLevel')
@@ -79,8 +113,10 @@ def create_shelf_from_script():
         parent=current_shelf,
         annotation="Run Twosify Script",
         image=shelf_icon,
-        command=script_content,
-        sourceType="python"
+        command=SHELF_COMMAND,
+        sourceType="python",
+        menuItem=[("Reload If Changed", RELOAD_COMMAND)],
+        menuItemPython=[0]
     )
 
     # Success message
@@ -0,0 +1,90 @@
+"""Tests for the AnimCurve model and the analyses run on it, no Maya needed."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import twosify_script as twosify
+
+
+def stepped_curve(times, values):
+    return twosify.AnimCurve(times=times, values=values, out_tangents=["step"] * len(times))
+
+
+def test_held_key_removal_drops_repeated_values():
+    curve = stepped_curve([1, 2, 3, 4, 5], [0.0, 0.0, 1.0, 1.0, 1.0])
+    assert twosify.plan_held_key_removal([curve]) == {0: [2.0, 4.0, 5.0]}
+
+
+def test_held_key_removal_keeps_keys_that_drift():
+    curve = stepped_curve([1, 2, 3, 4], [0.0, 0.6e-5, 1.2e-5, 1.8e-5])
+    assert twosify.plan_held_key_removal([curve]) == {0: [2.0]}
+
+
+def test_held_key_removal_needs_step_tangents():
+    curve = twosify.AnimCurve(times=[1, 2, 3], values=[1.0, 1.0, 1.0])
+    assert twosify.plan_held_key_removal([curve]) == {}
+
+
+@pytest.mark.parametrize("empty_at", [0, 1, 2])
+def test_held_key_removal_skips_empty_curves(empty_at):
+    curves = [stepped_curve([1, 2, 3], [1.0, 1.0, 2.0]), stepped_curve([1, 2], [5.0, 5.0])]
+    curves.insert(empty_at, twosify.AnimCurve())
+    first, second = [index for index, curve in enumerate(curves) if len(curve)]
+    assert twosify.plan_held_key_removal(curves) == {first: [2.0], second: [2.0]}
+
+
+def test_held_key_removal_does_not_span_curves():
+    curves = [stepped_curve([1, 2], [1.0, 2.0]), stepped_curve([1, 2], [2.0, 3.0])]
+    assert twosify.plan_held_key_removal(curves) == {}
+
+
+def hermite_reference(curve, frame):
+    """Scalar Hermite evaluation of a curve with slopes, one segment at a time."""
+    times, values = list(curve.times), list(curve.values)
+    if frame <= times[0]:
+        return values[0]
+    if frame >= times[-1]:
+        return values[-1]
+    index = next(i for i in range(len(times) - 1) if times[i] <= frame < times[i + 1])
+    span = times[index + 1] - times[index]
+    t = (frame - times[index]) / span
+    m0 = curve.out_slopes[index] * span
+    m1 = curve.in_slopes[index + 1] * span
+    return ((2 * t ** 3 - 3 * t ** 2 + 1) * values[index] + (t ** 3 - 2 * t ** 2 + t) * m0
+            + (-2 * t ** 3 + 3 * t ** 2) * values[index + 1] + (t ** 3 - t ** 2) * m1)
+
+
+FRAMES = np.arange(-2.0, 14.0, 0.25)
+
+
+def test_sample_matches_linear_reference():
+    curves = [
+        twosify.AnimCurve(times=[1, 4, 5, 10], values=[0.0, 3.0, -1.0, 2.0]),
+        twosify.AnimCurve(times=[0, 2, 6], values=[1.0, 5.0, 2.0], out_tangents=["auto", "step", "auto"]),
+        twosify.AnimCurve(times=[3], values=[7.0]),
+    ]
+    matrix = twosify.sample_anim_curves(curves, FRAMES)
+    expected = [[curve.value_at(frame) for frame in FRAMES] for curve in curves]
+    np.testing.assert_allclose(matrix, expected)
+
+
+def test_sample_follows_hermite_slopes():
+    curve = twosify.AnimCurve(times=[0, 3, 4, 10], values=[0.0, 2.0, 2.5, -1.0],
+                              in_slopes=[0.0, 1.5, -0.5, 0.0], out_slopes=[2.0, 0.25, 1.0, 0.0])
+    expected = [hermite_reference(curve, frame) for frame in FRAMES]
+    np.testing.assert_allclose(twosify.sample_anim_curves([curve], FRAMES)[0], expected)
+    np.testing.assert_allclose(curve.sample(FRAMES), expected)
+
+
+def test_sample_holds_stepnext_keys_on_their_own_frame():
+    curve = twosify.AnimCurve(times=[0, 4], values=[1.0, 3.0], out_tangents=["stepnext", "auto"])
+    frames = np.array([-1.0, 0.0, 0.5, 2.0, 4.0, 5.0])
+    np.testing.assert_allclose(curve.sample(frames), [1.0, 1.0, 3.0, 3.0, 3.0, 3.0])
+
+
+def test_sample_leaves_empty_curves_at_zero():
+    curves = [twosify.AnimCurve(), twosify.AnimCurve(times=[0, 2], values=[0.0, 2.0]), twosify.AnimCurve()]
+    matrix = twosify.sample_anim_curves(curves, np.array([0.0, 1.0, 2.0]), dtype=np.float32)
+    assert matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, [[0, 0, 0], [0, 1, 2], [0, 0, 0]])
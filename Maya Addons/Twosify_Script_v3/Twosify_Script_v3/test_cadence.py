@@ -0,0 +1,47 @@
+"""Tests for cadence specs and the frames they compile to."""
+
+import pytest
+
+import twosify_script as twosify
+
+
+@pytest.mark.parametrize("spec, start, end, frames", [
+    ("1", 1, 5, (1, 2, 3, 4, 5)),
+    ("2", 1, 10, (1, 3, 5, 7, 9)),
+    ("3", 0, 10, (0, 3, 6, 9)),
+    ("2,3", 1, 12, (1, 3, 6, 8, 11)),
+    ("3,4,4", 1, 24, (1, 4, 8, 12, 15, 19, 23)),
+])
+def test_base_cycle(spec, start, end, frames):
+    assert twosify.compile_cadence(spec, start, end) == frames
+
+
+def test_override_restarts_cycles():
+    # On 1s from 5 to 8, then the base cycle restarts at 9
+    assert twosify.compile_cadence("2;5-8:1", 1, 12) == (1, 3, 5, 6, 7, 8, 9, 11)
+
+
+def test_overrides_are_clipped_to_the_range():
+    assert twosify.compile_cadence("2;20-30:3", 1, 10) == twosify.compile_cadence("2", 1, 10)
+    assert twosify.compile_cadence("2;0-4:1", 1, 10) == (1, 2, 3, 4, 5, 7, 9)
+
+
+def test_overlapping_override_starts_after_the_previous_one():
+    assert twosify.compile_cadence("4;1-6:2;5-10:1", 1, 12) == (1, 3, 5, 7, 8, 9, 10, 11)
+
+
+def test_parse_cadence_sorts_overrides():
+    assert twosify.parse_cadence("2; 20-30:3 ; 5:1") == ((2,), [(5, 5, (1,)), (20, 30, (3,))])
+
+
+@pytest.mark.parametrize("spec", ["", ";", "0", "2,-1", "2;5-8:0"])
+def test_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        twosify.parse_cadence(spec)
+
+
+@pytest.mark.parametrize("steps, first, last", [((2,), 1, 20), ((2, 3), 0, 17), ((3, 4, 4), 5, 5), ((1,), 3, 9)])
+def test_cadence_frames_match_without_numpy(monkeypatch, steps, first, last):
+    expected = twosify._cadence_frames(steps, first, last)
+    monkeypatch.setattr(twosify, "np", None)
+    assert twosify._cadence_frames(steps, first, last) == expected
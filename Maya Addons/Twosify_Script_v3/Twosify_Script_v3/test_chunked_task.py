@@ -0,0 +1,118 @@
+"""Tests for ChunkedTask driven through LocalQueue, with the undo calls recorded."""
+
+import pytest
+
+import twosify_script as twosify
+
+
+class RecordingCmds(object):
+    """Records the undo calls ChunkedTask makes in place of maya.cmds."""
+
+    def __init__(self):
+        self.calls = []
+
+    def undoInfo(self, openChunk=False, closeChunk=False, chunkName=None):
+        self.calls.append("open" if openChunk else "close")
+
+    def undo(self):
+        self.calls.append("undo")
+
+
+class RecordingProgress(object):
+
+    def __init__(self, cancel_after=None):
+        self.cancel_after = cancel_after
+        self.done = 0
+        self.ended = False
+
+    def start(self, name, total):
+        self.total = total
+
+    def update(self, done, eta):
+        self.done = done
+
+    def is_cancelled(self):
+        return self.cancel_after is not None and self.done >= self.cancel_after
+
+    def end(self):
+        self.ended = True
+
+
+@pytest.fixture
+def cmds(monkeypatch):
+    recording = RecordingCmds()
+    monkeypatch.setattr(twosify, "cmds", recording)
+    return recording
+
+
+def run_task(items, work, progress=None, **options):
+    queue = twosify.LocalQueue()
+    # target_seconds=0 keeps every chunk at one item
+    task = twosify.ChunkedTask("test_task", items, work, queue=queue, progress=progress or RecordingProgress(),
+                               target_seconds=0, **options)
+    task.start()
+    queue.run()
+    return task
+
+
+def test_runs_every_item_in_one_undo_chunk(cmds):
+    seen = []
+    events = []
+    task = run_task(range(5), seen.extend, on_start=lambda: events.append("start"),
+                    on_done=lambda: events.append("done"))
+    assert task.state == "done"
+    assert seen == [0, 1, 2, 3, 4]
+    assert events == ["start", "done"]
+    assert cmds.calls == ["open", "close"]
+    assert task.progress.ended
+
+
+def test_cancel_undoes_the_chunk(cmds):
+    seen = []
+    task = None
+
+    def work(chunk):
+        seen.extend(chunk)
+        if len(seen) == 2:
+            task.cancel()
+
+    queue = twosify.LocalQueue()
+    task = twosify.ChunkedTask("test_task", range(5), work, queue=queue, progress=RecordingProgress(),
+                               target_seconds=0).start()
+    queue.run()
+    assert task.state == "cancelled"
+    assert seen == [0, 1]
+    assert cmds.calls == ["open", "close", "undo"]
+    assert task.progress.ended
+
+
+def test_progress_bar_cancel_rolls_back(cmds):
+    seen = []
+    task = run_task(range(5), seen.extend, progress=RecordingProgress(cancel_after=3))
+    assert task.state == "cancelled"
+    assert seen == [0, 1, 2]
+    assert cmds.calls == ["open", "close", "undo"]
+
+
+def test_rollback_replaces_the_blanket_undo(cmds):
+    rolled_back = []
+    progress = RecordingProgress(cancel_after=1)
+    task = run_task(range(5), lambda chunk: None, progress=progress, rollback=lambda: rolled_back.append(True))
+    assert task.state == "cancelled"
+    assert rolled_back == [True]
+    assert cmds.calls == ["open", "close"]
+
+
+@pytest.mark.parametrize("stage", ["on_start", "work", "on_done"])
+def test_errors_roll_back(cmds, stage):
+    def fail(*args):
+        raise RuntimeError("broken")
+
+    rolled_back = []
+    options = {"on_start": None, "on_done": None, "rollback": lambda: rolled_back.append(True)}
+    if stage != "work":
+        options[stage] = fail
+    task = run_task(range(3), fail if stage == "work" else (lambda chunk: None), **options)
+    assert task.state == "cancelled"
+    assert rolled_back == [True]
+    assert cmds.calls == ["open", "close"]
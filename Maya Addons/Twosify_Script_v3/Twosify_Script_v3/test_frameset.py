@@ -0,0 +1,83 @@
+"""Tests for the FrameSet run-length set algebra, checked against plain sets."""
+
+import pytest
+
+import twosify_script as twosify
+
+
+SETS = [
+    [],
+    [1, 2, 3, 4, 5],
+    [1, 3, 5, 7, 9],
+    [2, 3, 4, 10, 11, 12, 20],
+    [1.5, 2.5, 3.5, 4, 5, 6],
+    [0.25, 1.25, 3, 4.5, 5.5, 6.5, 7],
+]
+
+PAIRS = [(a, b) for a in SETS for b in SETS]
+
+
+@pytest.mark.parametrize("frames", SETS)
+def test_frames_round_trip(frames):
+    frame_set = twosify.FrameSet(frames)
+    assert frame_set.frames() == sorted(float(f) for f in frames)
+    assert len(frame_set) == len(frames)
+
+
+def test_whole_frames_compress_into_runs():
+    frame_set = twosify.FrameSet([1, 2, 3, 7, 8, 2.5, 3.5])
+    assert frame_set.runs == [(1.0, 3.0), (2.5, 3.5), (7.0, 8.0)]
+
+
+@pytest.mark.parametrize("a, b", PAIRS)
+def test_union(a, b):
+    assert (twosify.FrameSet(a) | twosify.FrameSet(b)).frames() == sorted(set(map(float, a)) | set(map(float, b)))
+
+
+@pytest.mark.parametrize("a, b", PAIRS)
+def test_difference(a, b):
+    assert (twosify.FrameSet(a) - twosify.FrameSet(b)).frames() == sorted(set(map(float, a)) - set(map(float, b)))
+
+
+@pytest.mark.parametrize("a, b", PAIRS)
+def test_intersection(a, b):
+    assert (twosify.FrameSet(a) & twosify.FrameSet(b)).frames() == sorted(set(map(float, a)) & set(map(float, b)))
+
+
+@pytest.mark.parametrize("a, b", PAIRS)
+def test_algebra_results_match_sets_built_from_frames(a, b):
+    union = twosify.FrameSet(a) | twosify.FrameSet(b)
+    assert union == twosify.FrameSet(union.frames())
+
+
+def test_contains():
+    frame_set = twosify.FrameSet([1, 2, 3, 10, 2.5])
+    assert 2 in frame_set
+    assert 2.5 in frame_set
+    assert 10 in frame_set
+    assert 4 not in frame_set
+    assert 3.5 not in frame_set
+    assert 0 not in frame_set
+
+
+def test_from_ranges_keeps_whole_frames_inside():
+    frame_set = twosify.FrameSet.from_ranges([(0.5, 3.5), (10, 12), (20.2, 20.8), (2, 5)])
+    assert frame_set.frames() == [1.0, 2.0, 3.0, 4.0, 5.0, 10.0, 11.0, 12.0]
+
+
+def test_clip_is_inclusive_for_every_phase():
+    frame_set = twosify.FrameSet([1, 2, 3, 4, 5, 1.5, 2.5, 3.5, 4.5])
+    assert frame_set.clip(2, 4).frames() == [2.0, 2.5, 3.0, 3.5, 4.0]
+    assert frame_set.clip(2.2, 3.7).frames() == [2.5, 3.0, 3.5]
+    assert frame_set.clip(10, 20).frames() == []
+
+
+def test_spans_merge_across_phases():
+    assert twosify.FrameSet([1, 2, 3, 1.5, 2.5, 6]).spans() == [(1.0, 3.0), (6.0, 6.0)]
+
+
+def test_spans_split_only_at_breaks():
+    frame_set = twosify.FrameSet([2, 4, 6, 7, 12])
+    assert frame_set.spans(breaks=[]) == [(2.0, 12.0)]
+    assert frame_set.spans(breaks=[5, 10]) == [(2.0, 4.0), (6.0, 7.0), (12.0, 12.0)]
+    assert frame_set.spans(breaks=[0, 20]) == [(2.0, 12.0)]
@@ -0,0 +1,107 @@
+"""Tests for per-plug key planning and KeyEditPlan, no Maya needed."""
+
+import pytest
+
+import twosify_script as twosify
+
+
+def test_plug_sync_inserts_and_cuts_between_kept_keys():
+    to_add, cuts, removed = twosify.plan_plug_sync([1, 3, 5, 7], [1, 2, 3, 4, 6, 7, 20], 0, 10)
+    assert to_add == (5.0,)
+    # 4 and 6 go but the inserted 5 sits between them, so they are cut apart
+    assert cuts == ((2.0, 2.0), (4.0, 4.0), (6.0, 6.0))
+    assert removed == 3
+
+
+def test_plug_sync_merges_cuts_over_runs_of_removed_keys():
+    to_add, cuts, removed = twosify.plan_plug_sync([1, 10], [1, 2, 3, 4, 7, 10], 0, 10)
+    assert to_add == ()
+    assert cuts == ((2.0, 7.0),)
+    assert removed == 4
+
+
+def test_plug_sync_stays_inside_the_timeline():
+    assert twosify.plan_plug_sync([1, 3, 50], [1, 2, 3, 60], 0, 10) == ((), ((2.0, 2.0),), 1)
+
+
+def test_plug_sync_without_keys():
+    assert twosify.plan_plug_sync([1, 3], [], 0, 10) == ((1.0, 3.0), (), 0)
+    assert twosify.plan_plug_sync([1, 3], None, 0, 10) == ((1.0, 3.0), (), 0)
+
+
+def test_plug_sync_cuts_never_cover_kept_keys():
+    ref = [1, 3, 5, 7, 9, 11]
+    actual = [0, 1, 2, 2.5, 4, 6, 6.5, 8, 11, 12]
+    to_add, cuts, removed = twosify.plan_plug_sync(ref, actual, 0, 11)
+    inside = [frame for frame in actual if 0 <= frame <= 11]
+    kept = set(ref) | (set(actual) - set(inside))
+    for first, last in cuts:
+        assert not [frame for frame in kept if first <= frame <= last]
+    assert removed == len(set(inside) - set(ref))
+
+
+def make_plan():
+    plan = twosify.KeyEditPlan("test_plan")
+    plan.add("ctrl.translateX", [1, 3, 5], [1, 2, 3], 0, 10,
+             tangents={("step", "step"): [1, 3, 5]}, values={3: 1.5}, seed=1)
+    plan.add("ctrl.rotateY", [1, 5], [1, 2, 3, 4, 5], 0, 10, target="ctrl_rotateY_layer")
+    plan.add("other.scaleZ", [2], [], 0, 10, seed=2)
+    return plan
+
+
+def test_add_skips_plugs_without_changes():
+    plan = make_plan()
+    assert plan.add("ctrl.translateY", [1, 2], [1, 2], 0, 10) == (0, 0)
+    assert "ctrl.translateY" not in plan
+    # Planning a plug again with nothing to do drops its earlier entry
+    plan.add("other.scaleZ", [2], [2], 0, 10)
+    assert "other.scaleZ" not in plan
+
+
+def test_counts_group_by_object():
+    counts = make_plan().counts()
+    assert counts["ctrl"] == {"plugs": 2, "added": 1, "removed": 4, "values": 1, "tangents": 3}
+    assert counts["other"] == {"plugs": 1, "added": 1, "removed": 0, "values": 0, "tangents": 0}
+
+
+def test_json_round_trip():
+    plan = make_plan()
+    loaded = twosify.KeyEditPlan.from_json(plan.to_json())
+    assert loaded.name == "test_plan"
+    assert loaded.entries == plan.entries
+    assert loaded.diff(plan) == {}
+
+
+def test_save_and_load(tmp_path):
+    plan = make_plan()
+    path = str(tmp_path / "plan.json")
+    plan.save(path)
+    assert twosify.KeyEditPlan.load(path).entries == plan.entries
+
+
+def test_from_json_reads_plans_without_seeds_or_values():
+    text = ('{"version": 1, "name": "old", "entries": {"a.tx": {"target": "a.tx", "add": [4.0],'
+            ' "cut": [[2.0, 2.0]], "removed": 1, "tangents": []}}}')
+    entry = twosify.KeyEditPlan.from_json(text).entries["a.tx"]
+    assert entry["seed"] is None
+    assert entry["values"] == ()
+    assert entry["cut"] == ((2.0, 2.0),)
+
+
+def test_from_json_rejects_other_versions():
+    with pytest.raises(ValueError):
+        twosify.KeyEditPlan.from_json('{"version": 99, "entries": {}}')
+
+
+def test_diff_reports_changed_added_and_missing_plugs():
+    plan = make_plan()
+    other = make_plan()
+    other.add("ctrl.rotateY", [1, 3, 5], [1, 2, 3, 4, 5], 0, 10, target="ctrl_rotateY_layer")
+    other.entries.pop("other.scaleZ")
+    other.add("new.visibility", [1], [], 0, 10)
+    diff = plan.diff(other)
+    assert sorted(diff) == ["ctrl.rotateY", "new.visibility", "other.scaleZ"]
+    assert diff["other.scaleZ"][1] is None
+    assert diff["new.visibility"][0] is None
+    assert diff["ctrl.rotateY"][0]["cut"] == ((2.0, 4.0),)
+    assert diff["ctrl.rotateY"][1]["cut"] == ((2.0, 2.0), (4.0, 4.0))
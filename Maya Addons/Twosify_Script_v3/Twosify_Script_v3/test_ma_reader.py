@@ -0,0 +1,50 @@
+"""Tests for the Maya ASCII anim curve reader on the bundled WalkCycle scene."""
+
+import os
+
+import pytest
+
+import twosify_script as twosify
+
+
+WALK_CYCLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir,
+                          "FMP", "Maya", "WalkCycle", "FMP_WalkCycleTests", "scenes", "FMP_WalkCycleTests.ma")
+
+
+@pytest.fixture(scope="module")
+def curves():
+    if not os.path.exists(WALK_CYCLE):
+        pytest.skip("WalkCycle scene not found")
+    return twosify.read_ma_anim_curves(WALK_CYCLE)
+
+
+def test_reads_every_anim_curve(curves):
+    with open(WALK_CYCLE, "r", encoding="latin-1") as f:
+        created = sum(1 for line in f if line.startswith("createNode animCurve"))
+    assert len(curves) == created
+    assert set(curve.curve_type for curve in curves.values()) == {"animCurveTA", "animCurveTL", "animCurveTU"}
+
+
+def test_reads_keys_and_tangents(curves):
+    curve = curves["R_foot_IK_CTRL_translateX"]
+    assert curve.curve_type == "animCurveTL"
+    assert list(curve.times) == [0.0, 1.0, 3.0, 12.0, 17.0, 21.0, 24.0]
+    assert curve.values[0] == pytest.approx(0.51476494558952701)
+    assert curve.values[4] == pytest.approx(2.7295119501178657)
+    # .tan 18 (auto) by default, .kot[2:6] 1 1 18 18 1
+    assert [twosify.TANGENT_TYPES[code] for code in curve.out_tangents] == [
+        "auto", "auto", "fixed", "fixed", "auto", "auto", "fixed"]
+
+
+def test_curves_are_connected_to_their_plugs(curves):
+    assert all(curve.plug for curve in curves.values())
+    plug = curves["R_foot_IK_CTRL_translateX"].plug
+    assert plug.endswith("|mireuk_v01_2:R_foot_IK_CTRL.translateX")
+    assert plug.startswith("|mireuk_v01_2:rig_GRP|")
+
+
+def test_key_buffers_line_up(curves):
+    for curve in curves.values():
+        count = len(curve.times)
+        assert count and len(curve.values) == len(curve.in_tangents) == len(curve.out_tangents) == count
+        assert list(curve.times) == sorted(curve.times)
@@ -0,0 +1,313 @@
+## Twosify batch driver
+# Runs Twosify's stepping and key timing paste headless over a sequence of shots,
+# one worker process per core.
+#
+#   python twosify_batch.py shots.json                  # pure Python, .ma scenes only
+#   mayapy twosify_batch.py shots.json --backend maya   # any scene Maya can open
+#
+# The manifest is JSON:
+#   {
+#       "output_dir": "twosify_out",
+#       "shots": [
+#           {"name": "sh010", "scene": "sh010_anim.ma",
+#            "controls": ["*_ctrl"], "cadence": "*face*=1; set:body_ctrls=2; *=2",
+#            "sets": {"body_ctrls": ["hip_ctrl", "chest_ctrl"]},
+#            "range": [1001, 1096]},
+#           {"name": "sh020", "scene": "sh020_anim.ma", "controls": ["*_ctrl"],
+#            "paste_keys_from": "master_ctrl"}
+#       ]
+#   }
+# "controls" are globs on control names without namespaces, "cadence" is a cadence
+# spec or a cadence map (see twosify_script.parse_cadence_map) and "paste_keys_from"
+# keys every control on the key times of that control instead of a cadence.
+# "range" defaults to the scene's playback range in Maya and to the span of the
+# control keys offline. Top level keys other than "shots" are defaults for every shot.
+#
+# Each shot writes <output_dir>/<name>.json with the timing stats, plus the stepped
+# scene (maya backend) or the stepped curves (ma backend) and <name>_plan.json with the
+# KeyEditPlan of the shot, for diffing runs. Shot names must be unique per output
+# directory. summary.json sums up the run in the manifest's top level output_dir,
+# or in the directory given with --summary-dir.
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import twosify_script as twosify
+
+BACKENDS = ("ma", "maya")
+
+
+def load_manifest(path):
+    """
+    Reads a batch manifest and returns its shots, each with the top level
+    defaults filled in and its paths made absolute.
+    """
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = dict((k, v) for k, v in manifest.items() if k != "shots")
+    defaults.setdefault("output_dir", "twosify_out")
+    defaults.setdefault("controls", ["*"])
+    defaults.setdefault("cadence", "2")
+
+    shots = []
+    outputs = set()
+    for index, entry in enumerate(manifest.get("shots", [])):
+        shot = dict(defaults)
+        shot.update(entry)
+        if "scene" not in shot:
+            raise ValueError(f"Shot {index} has no scene")
+        shot.setdefault("name", os.path.splitext(os.path.basename(shot["scene"]))[0])
+        if isinstance(shot["controls"], str):
+            shot["controls"] = [shot["controls"]]
+        for key in ("scene", "output_dir"):
+            shot[key] = os.path.normpath(os.path.join(base_dir, shot[key]))
+        output = (shot["output_dir"], shot["name"])
+        if output in outputs:
+            raise ValueError(f"Shot {index}: duplicate shot name {shot['name']!r} in {shot['output_dir']}")
+        outputs.add(output)
+        shots.append(shot)
+    return shots
+
+
+def manifest_output_dir(path):
+    """Returns the manifest's top level output_dir, where the batch summary goes."""
+    with open(path, "r") as f:
+        output_dir = json.load(f).get("output_dir", "twosify_out")
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), output_dir))
+
+
+def cadence_entries(cadence):
+    """Returns the cadence map entries of a shot's cadence spec or cadence map."""
+    if "=" in cadence:
+        return twosify.parse_cadence_map(cadence)
+    twosify.parse_cadence(cadence)
+    return [("*", cadence)]
+
+
+def curve_control(curve):
+    """Returns the control name an AnimCurve drives, without namespaces or DAG path."""
+    node = (curve.plug or curve.name).split(".", 1)[0]
+    return twosify.strip_namespaces(node).rsplit("|", 1)[-1]
+
+
+def select_control_curves(curves, patterns):
+    """Keeps the curves driving a control that matches one of the globs."""
+    return [curve for curve in curves
+            if curve.plug and any(fnmatch.fnmatchcase(curve_control(curve), p) for p in patterns)]
+
+
+def curves_key_range(curves):
+    """Returns the (first, last) whole frames keyed on any of the curves."""
+    times = [t for curve in curves for t in (curve.times[:1] + curve.times[-1:])]
+    if not times:
+        return None
+    return int(min(times)), int(-(-max(times) // 1))
+
+
+def step_curves(curves, shot, start, end):
+    """
+    The stepping engine of a shot, on AnimCurve models only.
+    Each curve is retimed onto its control's frames between start and end, from
+    the shot's cadence map or from the key times of paste_keys_from, and its keys
+    there are set to step. Returns {frames source: number of controls}.
+    """
+    source = shot.get("paste_keys_from")
+    if source:
+        source_curves = [c for c in curves if fnmatch.fnmatchcase(curve_control(c), source)]
+        if not source_curves:
+            raise ValueError(f"paste_keys_from {source!r} has no animation")
+        frames = twosify.FrameSet()
+        for curve in source_curves:
+            frames = frames | twosify.FrameSet(curve.times)
+        groups = {f"keys of {source}": (frames.clip(start, end), curves)}
+    else:
+        by_control = {}
+        for curve in curves:
+            by_control.setdefault(curve_control(curve), []).append(curve)
+        set_members = dict((f"set:{name}", set(members)) for name, members in shot.get("sets", {}).items())
+        resolved = twosify.resolve_cadence_map(list(by_control), cadence_entries(shot["cadence"]), set_members)
+        groups = {}
+        for spec, controls in resolved.items():
+            frames = twosify.compile_cadence(spec.replace("|", ";"), start, end)
+            groups[spec] = (frames, [c for control in controls for c in by_control[control]])
+
+    counts = {}
+    for label, (frames, group_curves) in groups.items():
+        for curve in group_curves:
+            curve.retime(frames, start, end)
+            curve.set_tangents(out_tangent="step", start=start, end=end)
+        counts[label] = len(set(curve_control(c) for c in group_curves))
+    return counts
+
+
+def curve_record(curve):
+    """JSON record of an AnimCurve's keys."""
+    return {
+        "plug": curve.plug,
+        "times": list(curve.times),
+        "values": list(curve.values),
+        "in_tangents": [twosify.TANGENT_TYPES[code] for code in curve.in_tangents],
+        "out_tangents": [twosify.TANGENT_TYPES[code] for code in curve.out_tangents],
+    }
+
+
+def write_plan(plan, shot, stats):
+    """Saves the shot's KeyEditPlan as <name>_plan.json and adds its totals to stats."""
+    plan.save(os.path.join(shot["output_dir"], f"{shot['name']}_plan.json"))
+    counts = plan.counts().values()
+    stats["plan"] = {"plugs": len(plan), "added": sum(c["added"] for c in counts),
+                     "removed": sum(c["removed"] for c in counts)}
+
+
+def run_shot_ma(shot):
+    """
+    Pure Python backend: steps the animCurves of a .ma scene and writes the
+    result to <name>_curves.json. Needs no Maya.
+    """
+    stats = {}
+    clock = time.perf_counter()
+    curves = select_control_curves(twosify.read_ma_anim_curves(shot["scene"]).values(), shot["controls"])
+    stats["load_s"] = time.perf_counter() - clock
+
+    start, end = shot.get("range") or curves_key_range(curves) or (0, 0)
+    keys_before = sum(len(c) for c in curves)
+    clock = time.perf_counter()
+    stats["cadences"] = step_curves(curves, shot, start, end)
+    plan = twosify.KeyEditPlan.from_curves(curves, shot["name"])
+    stats["step_s"] = time.perf_counter() - clock
+
+    clock = time.perf_counter()
+    write_plan(plan, shot, stats)
+    output = os.path.join(shot["output_dir"], f"{shot['name']}_curves.json")
+    with open(output, "w") as f:
+        json.dump({"range": [start, end], "curves": dict((c.name, curve_record(c)) for c in curves)}, f)
+    stats["write_s"] = time.perf_counter() - clock
+    stats.update(output=output, range=[start, end], curves=len(curves),
+                 keys_before=keys_before, keys_after=sum(len(c) for c in curves))
+    return stats
+
+
+def run_shot_maya(shot):
+    """
+    mayapy backend: opens the scene, steps the base animation of the controls
+    through the same engine, pushes it back with commit_anim_curves and saves
+    the stepped scene next to the stats.
+    """
+    cmds = twosify.cmds
+    stats = {}
+    clock = time.perf_counter()
+    cmds.file(shot["scene"], open=True, force=True, prompt=False)
+    nodes = [n for n in cmds.ls(type="transform")
+             if any(fnmatch.fnmatchcase(twosify.strip_namespaces(n).rsplit("|", 1)[-1], p) for p in shot["controls"])]
+    plugs = cmds.listAnimatable(nodes) if nodes else []
+    curves = twosify.load_anim_curves(plugs or [])
+    stats["load_s"] = time.perf_counter() - clock
+
+    start, end = shot.get("range") or twosify.get_playback_range()
+    keys_before = sum(len(c) for c in curves)
+    clock = time.perf_counter()
+    stats["cadences"] = step_curves(curves, shot, start, end)
+    with twosify.TwosifySession("batch_step", undo=False, wait_cursor=False, suspend_refresh=False):
+        plan = twosify.commit_anim_curves(curves)
+    stats["step_s"] = time.perf_counter() - clock
+
+    clock = time.perf_counter()
+    write_plan(plan, shot, stats)
+    extension = os.path.splitext(shot["scene"])[1]
+    output = os.path.join(shot["output_dir"], f"{shot['name']}_stepped{extension}")
+    cmds.file(rename=output)
+    cmds.file(save=True, force=True, type="mayaBinary" if extension == ".mb" else "mayaAscii")
+    stats["write_s"] = time.perf_counter() - clock
+    stats.update(output=output, range=[start, end], curves=len(curves),
+                 keys_before=keys_before, keys_after=sum(len(c) for c in curves))
+    return stats
+
+
+def run_shot(shot, backend):
+    """
+    Runs one shot in a worker and writes <output_dir>/<name>.json.
+    Errors are reported in the stats instead of stopping the batch.
+    """
+    clock = time.perf_counter()
+    os.makedirs(shot["output_dir"], exist_ok=True)
+    try:
+        stats = run_shot_maya(shot) if backend == "maya" else run_shot_ma(shot)
+        stats["status"] = "ok"
+    except Exception as e:
+        stats = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    stats.update(shot=shot["name"], scene=shot["scene"], backend=backend,
+                 pid=os.getpid(), total_s=time.perf_counter() - clock)
+    with open(os.path.join(shot["output_dir"], f"{shot['name']}.json"), "w") as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+def init_worker(backend):
+    """Starts Maya standalone once per worker process for the maya backend."""
+    if backend == "maya":
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+
+
+def run_batch(shots, backend="ma", workers=None, summary_dir=None):
+    """
+    Runs every shot across a pool of worker processes, one per core by default,
+    and writes summary.json into summary_dir when one is given.
+    Returns the per-shot stats in manifest order.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(shots) or 1))
+    clock = time.perf_counter()
+    ordered = [None] * len(shots)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(backend,)) as pool:
+        futures = dict((pool.submit(run_shot, shot, backend), index) for index, shot in enumerate(shots))
+        for future in as_completed(futures):
+            stats = future.result()
+            ordered[futures[future]] = stats
+            print(f"{stats['shot']}: {stats['status']} in {stats['total_s']:.2f}s")
+
+    wall = time.perf_counter() - clock
+    busy = sum(stats["total_s"] for stats in ordered)
+    summary = {
+        "backend": backend,
+        "workers": workers,
+        "shots": len(ordered),
+        "failed": [stats["shot"] for stats in ordered if stats["status"] != "ok"],
+        "wall_s": wall,
+        "shot_s": busy,
+        "speedup": busy / wall if wall else 0.0,
+    }
+    if summary_dir:
+        os.makedirs(summary_dir, exist_ok=True)
+        with open(os.path.join(summary_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+    print(f"{len(ordered)} shots on {workers} workers in {wall:.2f}s ({summary['speedup']:.1f}x)")
+    return ordered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Twosify stepping over a manifest of shots.")
+    parser.add_argument("manifest", help="JSON manifest of shots")
+    parser.add_argument("--backend", choices=BACKENDS, default="ma",
+                        help="ma: pure Python over .ma files, maya: run under mayapy")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--summary-dir", default=None,
+                        help="where summary.json goes (default: the manifest's output_dir)")
+    args = parser.parse_args(argv)
+
+    shots = load_manifest(args.manifest)
+    summary_dir = args.summary_dir or manifest_output_dir(args.manifest)
+    results = run_batch(shots, args.backend, args.workers, summary_dir)
+    return 1 if any(stats["status"] != "ok" for stats in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,36 @@
 # v003
 
 
-import maya.cmds as cmds
-import maya.mel as mel
+try:
+    import maya.cmds as cmds
+    import maya.mel as mel
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+except ImportError:
+    # Offline use, e.g. reading .ma files on a machine without Maya
+    cmds = None
+    mel = None
+    om = None
+    oma = None
+import fnmatch
+import importlib
 import json
+import math
+import mmap
 import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from functools import lru_cache, wraps
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 
@@ -26,127 +52,579 @@ def set_outliner_color(obj, color=(0.75, 0.5, 0.9)):
 
 
 
-def get_frames_on_ones():
+class TwosifySession(object):
     """
-    Returns a list of frames in 1s (every frame in timeline range).
+    Fast-edit session shared by every key-editing operation.
+    On enter it opens an undo chunk, shows the wait cursor, suspends viewport
+    refresh and sets autoKey and the evaluation mode if asked to. autoKey is
+    left alone unless auto_key is given, e.g. auto_key=False for operations
+    that move controls through attribute writes. On exit it
+    restores all of them in reverse order, even when the operation raises.
+    Nested sessions only time themselves; the outermost one owns the state,
+    including the names snapshot of the NameAllocator.
+    The elapsed time of each operation is kept in TwosifySession.timings.
     """
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
-    return list(range(min_time, max_time + 1))
 
+    timings = {}
+    _depth = 0
+
+    def __init__(self, name, undo=True, wait_cursor=True, suspend_refresh=True,
+                 auto_key=None, evaluation_mode=None):
+        self.name = name
+        self.undo = undo
+        self.wait_cursor = wait_cursor
+        self.suspend_refresh = suspend_refresh
+        self.auto_key = auto_key
+        self.evaluation_mode = evaluation_mode
+        self.elapsed = 0.0
+        self._restore = []
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        TwosifySession._depth += 1
+        if TwosifySession._depth > 1:
+            return self
 
+        try:
+            names.begin()
+            self._restore.append(names.end)
+            if self.undo:
+                cmds.undoInfo(openChunk=True, chunkName=self.name)
+                self._restore.append(lambda: cmds.undoInfo(closeChunk=True))
+            if self.wait_cursor:
+                cmds.waitCursor(state=True)
+                self._restore.append(lambda: cmds.waitCursor(state=False))
+            if self.suspend_refresh:
+                cmds.refresh(suspend=True)
+                self._restore.append(lambda: cmds.refresh(suspend=False))
+            if self.auto_key is not None:
+                auto_key_state = cmds.autoKeyframe(q=True, state=True)
+                cmds.autoKeyframe(state=self.auto_key)
+                self._restore.append(lambda: cmds.autoKeyframe(state=auto_key_state))
+            if self.evaluation_mode:
+                evaluation_mode = cmds.evaluationManager(q=True, mode=True)[0]
+                if evaluation_mode != self.evaluation_mode:
+                    cmds.evaluationManager(mode=self.evaluation_mode)
+                    self._restore.append(lambda: cmds.evaluationManager(mode=evaluation_mode))
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        while self._restore:
+            try:
+                self._restore.pop()()
+            except Exception as e:
+                print(f"Twosify: failed to restore scene state after {self.name}: {e}")
+        TwosifySession._depth -= 1
+        self.elapsed = time.perf_counter() - self._start
+        TwosifySession.timings[self.name] = self.elapsed
+        return False
 
-def set_keys_ones_anim_layer():
-    
-    
-    sel = cmds.ls(sl=True)
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
-    
-    frames_list = get_frames_on_ones()
 
-    cmds.waitCursor(state=True)  
-     
-    try:
-        cmds.setKeyframe(t = (min_time))
-    except:
-        return
-                
-        
-    if sel:    
-        cmds.setKeyframe(i=True, t=(frames_list))
-    cmds.waitCursor(state=False)
-        
+def twosify_operation(name=None, **session_options):
+    """Decorator running the function inside a TwosifySession."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with TwosifySession(name or func.__name__, **session_options):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LocalQueue(object):
+    """
+    Stand-in for Maya's idle queue: callables are queued and run by run().
+    Used to drive ChunkedTask outside the Maya event loop, e.g. in tests.
+    """
 
+    def __init__(self):
+        self.pending = []
 
+    def __call__(self, func):
+        self.pending.append(func)
 
-def get_frames_every_three():
+    def run(self):
+        while self.pending:
+            self.pending.pop(0)()
+
+
+def idle_queue(func):
+    """Queues func on Maya's idle queue."""
+    cmds.evalDeferred(func, lowestPriority=True)
+
+
+class MainProgressBar(object):
+    """Progress display on Maya's main progress bar, cancelled with Esc."""
+
+    def start(self, name, total):
+        self.name = name
+        self.total = total
+        self.bar = mel.eval('$tmp = $gMainProgressBar')
+        cmds.progressBar(self.bar, edit=True, beginProgress=True, isInterruptable=True,
+                         status=name, maxValue=max(total, 1))
+
+    def update(self, done, eta):
+        cmds.progressBar(self.bar, edit=True, progress=done,
+                         status=f"{self.name}: {done}/{self.total}, about {eta:.0f}s left")
+
+    def is_cancelled(self):
+        return cmds.progressBar(self.bar, query=True, isCancelled=True)
+
+    def end(self):
+        cmds.progressBar(self.bar, edit=True, endProgress=True)
+
+
+class ChunkedTask(object):
     """
-    Returns a list of frames at every 3 frames
-    (e.g. 1, 4, 7, 10, ...), based on the playback range.
+    Cooperative runner for long Twosify operations.
+    work(chunk) is called with successive slices of items, one slice per idle
+    callback, so Maya stays responsive. The slice size adapts so each callback
+    takes about target_seconds. The whole run is one undo chunk; cancelling
+    (Esc on the progress bar, or cancel()) or an error undoes everything done
+    so far.
+    on_start runs inside the undo chunk before the first slice, on_done after
+    the last one.
+    The undo chunk stays open across idle callbacks, so edits the user makes
+    meanwhile land in it too. Tasks that can pass rollback, a callable that
+    restores what the task changed from its own records; it then replaces
+    the blanket undo and leaves those edits alone.
     """
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
 
-    return list(range(min_time, max_time + 1, 3))
+    def __init__(self, name, items, work, on_start=None, on_done=None, queue=None,
+                 progress=None, target_seconds=0.05, chunk_size=1, rollback=None):
+        self.name = name
+        self.items = list(items)
+        self.work = work
+        self.on_start = on_start
+        self.on_done = on_done
+        self.queue = queue or idle_queue
+        self.progress = progress or MainProgressBar()
+        self.target_seconds = target_seconds
+        self.chunk_size = max(1, chunk_size)
+        self.rollback = rollback
+        self.done = 0
+        self.state = "pending"
+        self.elapsed = 0.0
+        self._cancel_requested = False
+
+    def start(self):
+        """Queues the task. Returns self."""
+        self.queue(self._begin)
+        return self
+
+    def cancel(self):
+        """Asks the task to stop and roll back at its next chunk."""
+        self._cancel_requested = True
+
+    def _begin(self):
+        cmds.undoInfo(openChunk=True, chunkName=self.name)
+        self.progress.start(self.name, len(self.items))
+        self.state = "running"
+        try:
+            if self.on_start:
+                self.on_start()
+        except Exception as e:
+            self._rollback(f"failed: {e}")
+            return
+        self.queue(self._step)
 
+    def _step(self):
+        if self.state != "running":
+            return
+        if self._cancel_requested or self.progress.is_cancelled():
+            self._rollback("cancelled")
+            return
 
+        chunk = self.items[self.done:self.done + self.chunk_size]
+        start = time.perf_counter()
+        try:
+            if chunk:
+                self.work(chunk)
+        except Exception as e:
+            self._rollback(f"failed: {e}")
+            return
+        spent = time.perf_counter() - start
+        self.elapsed += spent
+        self.done += len(chunk)
+
+        if chunk:
+            per_item = spent / len(chunk)
+            self.chunk_size = max(1, min(int(self.target_seconds / per_item) if per_item > 0 else self.chunk_size * 2,
+                                         self.chunk_size * 4))
+            self.progress.update(self.done, per_item * (len(self.items) - self.done))
+
+        if self.done < len(self.items):
+            self.queue(self._step)
+            return
 
-def set_keys_threes_anim_layer():
-    
-    
-    sel = cmds.ls(sl=True)
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
-    
-    frames_list = get_frames_every_three()
+        try:
+            if self.on_done:
+                self.on_done()
+        except Exception as e:
+            self._rollback(f"failed: {e}")
+            return
+        self.progress.end()
+        cmds.undoInfo(closeChunk=True)
+        self.state = "done"
+        TwosifySession.timings[self.name] = self.elapsed
+        print(f"{self.name} finished in {self.elapsed:.2f}s")
 
+    def _rollback(self, reason):
+        self.progress.end()
+        cmds.undoInfo(closeChunk=True)
+        if self.rollback:
+            self.rollback()
+        else:
+            cmds.undo()
+        self.state = "cancelled"
+        print(f"{self.name} {reason}, changes rolled back")
 
-    keys = cmds.keyframe(sel , q=True) or []  
-    cmds.waitCursor(state=True)  
-    if keys:    
-        cmds.cutKey(t = (min_time, max_time))
-        
-    try:
-        cmds.setKeyframe(t = (min_time))
-    except:
-        return
-                
-        
-    if sel:    
-        cmds.setKeyframe(i=True, t=(frames_list))
-    cmds.waitCursor(state=False)
-        
 
+class FrameSet(object):
+    """
+    Sorted set of frames stored as run-length intervals.
+    A run (first, last) holds first, first + 1, ..., last, so whole-frame
+    ranges compress into a handful of runs; sub-frame times get runs of
+    their own phase. Union, difference and intersection walk the runs, so
+    set algebra costs O(runs) instead of O(frames); membership is a bisect.
+    Several disjoint ranges (time slider selections, shot sub-ranges) are
+    just several runs.
+    """
+
+    __slots__ = ("runs", "_index")
 
-def generate_twos_threes_pattern():
+    def __init__(self, frames=()):
+        runs = []
+        # Last run of each phase, sub-frame times don't break whole-frame runs
+        open_runs = {}
+        for frame in sorted(set(float(f) for f in frames)):
+            run = open_runs.get(frame % 1.0)
+            if run and frame == run[1] + 1:
+                run[1] = frame
+            else:
+                run = [frame, frame]
+                runs.append(run)
+                open_runs[frame % 1.0] = run
+        self.runs = [tuple(run) for run in runs]
+        self._index = None
+
+    @classmethod
+    def from_runs(cls, runs):
+        """Builds a FrameSet from (first, last) runs, which may overlap."""
+        frame_set = cls()
+        merged = []
+        for phase_runs in cls._group_phases(runs).values():
+            phase_runs.sort()
+            current = []
+            for first, last in phase_runs:
+                if current and first <= current[-1][1] + 1:
+                    current[-1][1] = max(current[-1][1], last)
+                else:
+                    current.append([first, last])
+            merged.extend(tuple(run) for run in current)
+        frame_set.runs = sorted(merged)
+        return frame_set
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """Builds the whole-frame FrameSet of inclusive (start, end) ranges."""
+        return cls.from_runs([(float(math.ceil(start)), float(math.floor(end)))
+                              for start, end in ranges if math.ceil(start) <= math.floor(end)])
+
+    @staticmethod
+    def _group_phases(runs):
+        groups = {}
+        for first, last in runs:
+            first = float(first)
+            groups.setdefault(first % 1.0, []).append((first, first + math.floor(last - first)))
+        return groups
+
+    def __len__(self):
+        return sum(int(last - first) + 1 for first, last in self.runs)
+
+    def __iter__(self):
+        if len(self._group_phases(self.runs)) > 1:
+            return iter(sorted(self.frames_unsorted()))
+        return self.frames_unsorted()
+
+    def frames_unsorted(self):
+        for first, last in self.runs:
+            for step in range(int(last - first) + 1):
+                yield first + step
+
+    def __contains__(self, frame):
+        if self._index is None:
+            self._index = dict((phase, ([run[0] for run in runs], runs))
+                               for phase, runs in self._group_phases(self.runs).items())
+        entry = self._index.get(float(frame) % 1.0)
+        if not entry:
+            return False
+        starts, runs = entry
+        index = bisect_right(starts, frame) - 1
+        return index >= 0 and frame <= runs[index][1]
+
+    def __eq__(self, other):
+        return isinstance(other, FrameSet) and self.runs == other.runs
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return f"FrameSet({', '.join(f'{a:g}-{b:g}' if a != b else f'{a:g}' for a, b in self.runs)})"
+
+    def __or__(self, other):
+        return FrameSet.from_runs(self.runs + other.runs)
+
+    def __sub__(self, other):
+        other_phases = self._group_phases(other.runs)
+        result = []
+        for phase, runs in self._group_phases(self.runs).items():
+            holes = sorted(other_phases.get(phase, []))
+            j = 0
+            for first, last in sorted(runs):
+                current = first
+                while j < len(holes) and holes[j][1] < current:
+                    j += 1
+                k = j
+                while k < len(holes) and holes[k][0] <= last:
+                    if holes[k][0] > current:
+                        result.append((current, holes[k][0] - 1))
+                    current = max(current, holes[k][1] + 1)
+                    k += 1
+                if current <= last:
+                    result.append((current, last))
+        return FrameSet.from_runs(result)
+
+    def __and__(self, other):
+        other_phases = self._group_phases(other.runs)
+        result = []
+        for phase, runs in self._group_phases(self.runs).items():
+            a = sorted(runs)
+            b = sorted(other_phases.get(phase, []))
+            i = j = 0
+            while i < len(a) and j < len(b):
+                lo = max(a[i][0], b[j][0])
+                hi = min(a[i][1], b[j][1])
+                if lo <= hi:
+                    result.append((lo, hi))
+                if a[i][1] < b[j][1]:
+                    i += 1
+                else:
+                    j += 1
+        return FrameSet.from_runs(result)
+
+    def clip(self, start, end):
+        """Returns the frames between start and end, inclusive, of every phase."""
+        result = []
+        for first, last in self.runs:
+            lo = first if start <= first else first + math.ceil(start - first)
+            hi = last if end >= last else first + math.floor(end - first)
+            if lo <= hi:
+                result.append((lo, hi))
+        return FrameSet.from_runs(result)
+
+    def frames(self):
+        """Returns the frames as a sorted list."""
+        return list(self)
+
+    def spans(self, breaks=None):
+        """
+        Contiguous (first, last) intervals of the set, sorted and disjoint.
+        Without breaks these are the runs, with runs of different phases that
+        overlap in time merged. With a sorted list of break frames (not members
+        of the set) they are the widest spans holding members but no break, so
+        members separated only by non-members merge.
+
+        >>> FrameSet([14.25, 15.25, 16, 16.25]).spans()
+        [(14.25, 16.25)]
+        >>> FrameSet([14.25, 15.25, 16, 16.25]).spans(breaks=[15.5])
+        [(14.25, 15.25), (16.0, 16.25)]
+        """
+        pieces = []
+        for first, last in self.runs:
+            lo = 0 if breaks is None else bisect_left(breaks, first)
+            hi = 0 if breaks is None else bisect_right(breaks, last)
+            current = first
+            for cut in breaks[lo:hi] if hi > lo else ():
+                below = current + math.ceil(cut - current) - 1
+                if below >= current:
+                    pieces.append((current, below))
+                current = current + math.floor(cut - current) + 1
+            if current <= last:
+                pieces.append((current, last))
+        # Runs of other phases interleave, so merge in start order over all of them
+        pieces.sort()
+        spans = []
+        for piece in pieces:
+            if spans and (piece[0] <= spans[-1][1] or (breaks is not None and not
+                          breaks[bisect_right(breaks, spans[-1][1]):bisect_left(breaks, piece[0])])):
+                spans[-1] = (spans[-1][0], max(spans[-1][1], piece[1]))
+            else:
+                spans.append(piece)
+        return spans
+
+
+def parse_cadence(spec):
     """
-    Returns a list of frames in a 2,3,2,3... alternating pattern
-    based on the current Maya timeline playback range.
+    Parses a cadence spec into (base steps, [(first, last, steps), ...]).
+    The base is a comma separated cycle of steps, e.g. "2", "2,3" or "3,4,4".
+    Per-range overrides follow after ";" as "first-last:steps",
+    e.g. "2;10-30:1" keys on 2s but on 1s from frame 10 to 30.
     """
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
+    parts = [part.strip() for part in str(spec).split(";") if part.strip()]
+    if not parts:
+        raise ValueError("Empty cadence spec")
+
+    def parse_steps(text):
+        steps = tuple(int(step) for step in text.split(",") if step.strip())
+        if not steps or min(steps) < 1:
+            raise ValueError(f"Invalid cadence steps: {text!r}")
+        return steps
+
+    base = parse_steps(parts[0])
+    overrides = []
+    for part in parts[1:]:
+        frame_range, _, steps = part.partition(":")
+        first, _, last = frame_range.partition("-")
+        overrides.append((int(first), int(last or first), parse_steps(steps)))
+    overrides.sort()
+    return base, overrides
+
+
+def _cadence_frames(steps, first, last):
+    """Frames from first to last following the repeating steps cycle."""
+    count = (last - first) // min(steps) + 1
+    if np is not None:
+        offsets = np.concatenate(([0], np.cumsum(np.resize(np.array(steps), count))))
+        frames = first + offsets[offsets <= last - first]
+        return frames.tolist()
+    frames = []
+    frame = first
+    index = 0
+    while frame <= last:
+        frames.append(frame)
+        frame += steps[index % len(steps)]
+        index += 1
+    return frames
+
 
-    pattern = [2, 3]  # alternating step sizes
-    step_index = 0
+@lru_cache(maxsize=128)
+def compile_cadence(spec, start, end):
+    """
+    Returns the tuple of frames to key between start and end for a cadence spec
+    (see parse_cadence). Each override range restarts its own cycle at its first
+    frame and the base cycle restarts after it. Results are memoized per (spec, range).
+    """
+    base, overrides = parse_cadence(spec)
+    start = int(start)
+    end = int(end)
+
+    segments = []
+    cursor = start
+    for first, last, steps in overrides:
+        first = max(first, cursor)
+        last = min(last, end)
+        if first > last:
+            continue
+        if first > cursor:
+            segments.append((cursor, first - 1, base))
+        segments.append((first, last, steps))
+        cursor = last + 1
+    if cursor <= end:
+        segments.append((cursor, end, base))
 
     frames = []
-    time = min_time
-    while time <= max_time:
-        frames.append(time)
-        time += pattern[step_index % len(pattern)]
-        step_index += 1
+    for first, last, steps in segments:
+        frames.extend(_cadence_frames(steps, first, last))
+    return tuple(frames)
 
-    return frames
 
+def get_playback_range():
+    """Returns the timeline (min, max) as ints."""
+    return int(cmds.playbackOptions(q=True, min=True)), int(cmds.playbackOptions(q=True, max=True))
 
 
+@twosify_operation("apply_cadence")
+def apply_cadence(spec, cut_existing=True, dry_run=False):
+    """
+    Keys the selection on the anim layer following a cadence spec over the
+    timeline range. Existing keys in the range are cut first unless cut_existing
+    is False. With dry_run=True the KeyEditPlan is only reported.
+    Returns the KeyEditPlan.
+    """
+    min_time, max_time = get_playback_range()
+    return apply_key_frames(list(compile_cadence(spec, min_time, max_time)), cut_existing, dry_run=dry_run)
 
-def set_keys_twos_threes_anim_layer():
-    
-    
-    sel = cmds.ls(sl=True)
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
-    
-    frames_list = generate_twos_threes_pattern()
 
+def plan_key_frames(frames_list, cut_existing=True, objects=None, plan=None):
+    """
+    Plans keying every animatable plug of objects at frames_list over the
+    timeline range, cutting the other keys in it unless cut_existing is False.
+    Plugs without keys are keyed at the start of the range first.
+    Returns the KeyEditPlan, plan itself when one is passed.
+    """
+    plan = plan if plan is not None else KeyEditPlan("apply_cadence")
+    min_time, max_time = get_playback_range()
+    plug_times = [(plug, cmds.keyframe(plug, q=True, timeChange=True) or [])
+                  for plug in cmds.listAnimatable(objects) or []]
+    return plan_plug_key_times(plug_times, frames_list, min_time, max_time,
+                               keep_existing=not cut_existing, seed=min_time, plan=plan)
 
-    keys = cmds.keyframe(sel , q=True) or []  
-    cmds.waitCursor(state=True)  
-    if keys:    
-        cmds.cutKey(t = (min_time, max_time))
-        
-    try:
-        cmds.setKeyframe(t = (min_time))
-    except:
-        return
-                
-        
-    if sel:    
-        cmds.setKeyframe(i=True, t=(frames_list))
-    cmds.waitCursor(state=False)
-        
+
+def apply_key_frames(frames_list, cut_existing=True, objects=None, dry_run=False, name="apply_cadence"):
+    """
+    Keys objects (the selection by default) on the anim layer at frames_list,
+    the shared apply path of the fixed, adaptive and mapped cadences, through
+    a KeyEditPlan named name. With dry_run=True the plan is reported instead.
+    Returns the KeyEditPlan, or None without objects.
+    """
+    sel = cmds.ls(sl=True) if objects is None else list(objects)
+    if not sel:
+        return None
+    plan = plan_key_frames(frames_list, cut_existing, sel, plan=KeyEditPlan(name))
+    if dry_run:
+        plan.report()
+    else:
+        plan.execute()
+    return plan
+
+
+def get_frames_on_ones():
+    """
+    Returns a list of frames in 1s (every frame in timeline range).
+    """
+    return list(compile_cadence("1", *get_playback_range()))
+
+
+def set_keys_ones_anim_layer():
+    apply_cadence("1", cut_existing=False)
+
+
+def get_frames_every_three():
+    """
+    Returns a list of frames at every 3 frames
+    (e.g. 1, 4, 7, 10, ...), based on the playback range.
+    """
+    return list(compile_cadence("3", *get_playback_range()))
+
+
+def set_keys_threes_anim_layer():
+    apply_cadence("3")
+
+
+def generate_twos_threes_pattern():
+    """
+    Returns a list of frames in a 2,3,2,3... alternating pattern
+    based on the current Maya timeline playback range.
+    """
+    return list(compile_cadence("2,3", *get_playback_range()))
+
+
+def set_keys_twos_threes_anim_layer():
+    apply_cadence("2,3")
 
 
 def get_frames_three_four():
@@ -154,90 +632,477 @@ def get_frames_three_four():
     Returns a list of frames in a 3–4 alternating pattern
     (e.g. 1, 4, 8, 11, 15, ...), based on the playback range.
     """
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
+    return list(compile_cadence("3,4", *get_playback_range()))
 
-    pattern = [3, 4]  # alternating steps
-    step_index = 0
-    frames = []
 
-    time = min_time
-    while time <= max_time:
-        frames.append(time)
-        time += pattern[step_index % len(pattern)]
-        step_index += 1
+def set_keys_threes_fours_anim_layer():
+    apply_cadence("3,4")
 
-    return frames
 
+def set_keys_twos_anim_layer():
+    apply_cadence("2")
+
+
+def set_keys_custom_cadence():
+    """Asks for a cadence spec and keys the selection with it."""
+    result = cmds.promptDialog(
+        title="Custom Cadence",
+        message='Steps, e.g. "2", "2,3" or "2;10-30:1":',
+        text="2",
+        button=["OK", "Cancel"],
+        defaultButton="OK",
+        cancelButton="Cancel",
+        dismissString="Cancel"
+    )
+    if result != "OK":
+        return
+    spec = cmds.promptDialog(query=True, text=True)
+    try:
+        parse_cadence(spec)
+    except ValueError as e:
+        cmds.warning(str(e))
+        return
+    apply_cadence(spec)
 
 
-def set_keys_threes_fours_anim_layer():
-    
-    
-    sel = cmds.ls(sl=True)
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
-    
-    frames_list = get_frames_three_four()
+# Per-body-part cadences stored on the TWOS layer as JSON
+CADENCE_MAP_ATTR = "twosifyCadenceMap"
 
 
-    keys = cmds.keyframe(sel , q=True) or []  
-    cmds.waitCursor(state=True)  
-    if keys:    
-        cmds.cutKey(t = (min_time, max_time))
-        
+def parse_cadence_map(text):
+    """
+    Parses a cadence map written as "pattern=spec; pattern=spec", e.g.
+    "*face*=1; set:body_ctrls=2; *=2". Patterns are globs on the control name
+    without namespaces, or set:<name> for the members of a selection set.
+    Returns a list of (pattern, spec); the first matching entry wins.
+    """
+    entries = []
+    for entry in re.split(r"[;\n]", text or ""):
+        if not entry.strip():
+            continue
+        pattern, sep, spec = entry.rpartition("=")
+        if not sep or not pattern.strip():
+            raise ValueError(f"Invalid cadence map entry: {entry!r}")
+        parse_cadence(spec.strip().replace("|", ";"))
+        entries.append((pattern.strip(), spec.strip()))
+    return entries
+
+
+def read_cadence_map(layer):
+    """Returns the (pattern, spec) entries stored on the anim layer."""
+    if not cmds.attributeQuery(CADENCE_MAP_ATTR, node=layer, exists=True):
+        return []
     try:
-        cmds.setKeyframe(t = (min_time))
-    except:
+        return [tuple(entry) for entry in json.loads(cmds.getAttr(f"{layer}.{CADENCE_MAP_ATTR}") or "[]")]
+    except ValueError:
+        return []
+
+
+def write_cadence_map(layer, entries):
+    """Stores the (pattern, spec) entries on the anim layer."""
+    if not cmds.attributeQuery(CADENCE_MAP_ATTR, node=layer, exists=True):
+        cmds.addAttr(layer, longName=CADENCE_MAP_ATTR, dataType="string")
+    cmds.setAttr(f"{layer}.{CADENCE_MAP_ATTR}", json.dumps([list(entry) for entry in entries]), type="string")
+
+
+def resolve_cadence_map(objects, entries, set_members=None):
+    """
+    Groups objects by the cadence spec of the first entry matching them.
+    set_members maps each set:<name> pattern to the long names of its members.
+    Objects nothing matches are left out.
+    Returns {spec: [objects]} in the order of the entries.
+    """
+    set_members = set_members or {}
+    groups = dict((spec, []) for _, spec in entries)
+    for obj in objects:
+        name = strip_namespaces(obj).rsplit("|", 1)[-1]
+        for pattern, spec in entries:
+            if pattern.startswith("set:"):
+                if obj in set_members.get(pattern, ()):
+                    groups[spec].append(obj)
+                    break
+            elif fnmatch.fnmatchcase(name, pattern):
+                groups[spec].append(obj)
+                break
+    return dict((spec, objs) for spec, objs in groups.items() if objs)
+
+
+@twosify_operation("apply_cadence_map")
+def apply_cadence_map(layer=None, objects=None, dry_run=False):
+    """
+    Keys every control on its own cadence from the map stored on the anim
+    layer (the selected one by default), in one pass over objects (the
+    selection by default). All cadences go into one KeyEditPlan, so plugs
+    sharing the same key changes are edited together and a whole character
+    costs a few bulk calls per cadence. With dry_run=True the plan is only
+    reported.
+    Returns {spec: [objects]}.
+    """
+    if layer is None:
+        layer = (cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or [None])[0]
+    if objects is None:
+        objects = cmds.ls(sl=True, long=True)
+    entries = read_cadence_map(layer) if layer else []
+    if not entries:
+        cmds.warning("No cadence map on the selected animLayer. Use Edit Cadence Map first.")
+        return {}
+    if not objects:
+        cmds.warning("Please select something!")
+        return {}
+
+    set_members = {}
+    for pattern, _ in entries:
+        if pattern.startswith("set:") and cmds.objExists(pattern[4:]):
+            set_members[pattern] = set(cmds.ls(cmds.sets(pattern[4:], q=True) or [], long=True))
+    groups = resolve_cadence_map(objects, entries, set_members)
+
+    # Specs that land on the same frames share their keying calls
+    min_time, max_time = get_playback_range()
+    by_frames = {}
+    for spec, objs in groups.items():
+        frames = compile_cadence(spec.replace("|", ";"), min_time, max_time)
+        by_frames.setdefault(frames, []).extend(objs)
+    plan = KeyEditPlan("apply_cadence_map")
+    for frames, objs in by_frames.items():
+        plan_key_frames(list(frames), objects=objs, plan=plan)
+    if dry_run:
+        plan.report()
+    else:
+        plan.execute()
+
+    print("Cadence map: " + ", ".join(f"{spec}: {len(objs)} controls" for spec, objs in groups.items()))
+    return groups
+
+
+def edit_cadence_map_dialog():
+    """Prompts for the cadence map of the selected anim layer and stores it."""
+    layer = (cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or [None])[0]
+    if not layer or layer == cmds.animLayer(q=True, root=True):
+        cmds.warning("Please select an animLayer.")
         return
-                
-        
-    if sel:    
-        cmds.setKeyframe(i=True, t=(frames_list))
-    cmds.waitCursor(state=False)
-        
-        
-  
+    current = "; ".join(f"{pattern}={spec}" for pattern, spec in read_cadence_map(layer))
+    result = cmds.promptDialog(
+        title="Cadence Map",
+        message='pattern=cadence, e.g. "*face*=1; set:body_ctrls=2; *=2"\n(write per-range overrides with | instead of ;)',
+        text=current,
+        button=["OK", "Cancel"],
+        defaultButton="OK",
+        cancelButton="Cancel",
+        dismissString="Cancel"
+    )
+    if result != "OK":
+        return
+    try:
+        entries = parse_cadence_map(cmds.promptDialog(query=True, text=True))
+    except ValueError as e:
+        cmds.warning(str(e))
+        return
+    with TwosifySession("edit_cadence_map"):
+        write_cadence_map(layer, entries)
+    print(f"{layer}: cadence map set to {entries}")
 
 
-def set_keys_twos_anim_layer():
-    
-    
+# Thresholds of the adaptive cadence, relative to the shot's median motion:
+# faster than fast_speed times the median goes on 1s, slower than
+# slow_speed times it on 3s, the rest on 2s. Sharp speed changes
+# (fast_accel times the median acceleration) also go on 1s.
+SMART_CADENCE_DEFAULTS = {"fast_speed": 1.5, "slow_speed": 0.5, "fast_accel": 3.0, "percentile": 90}
+
+
+def sample_anim_curves(curves, frames, dtype=float):
+    """
+    Evaluates AnimCurve models at every frame of a sorted array into a
+    (curves, frames) array in one vectorized pass over all their keys.
+    Segments are cubic Hermite splines through the key slopes, as Maya
+    evaluates unweighted curves, or linear for curves without slopes; step
+    and stepnext out tangents hold. Values outside the keys are held.
+    dtype picks the precision of the evaluation and of the result.
+    """
+    rows = [row for row, curve in enumerate(curves) if len(curve)]
+    if not rows or not len(frames):
+        return np.zeros((len(curves), len(frames)), dtype=dtype)
+    keyed = [curves[row] for row in rows]
+    lengths = np.array([len(curve) for curve in keyed])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    last = starts + lengths - 1
+    times = np.concatenate([np.frombuffer(curve.times, dtype=float) for curve in keyed])
+    values = np.concatenate([np.frombuffer(curve.values, dtype=float) for curve in keyed])
+    out_codes = np.concatenate([np.frombuffer(curve.out_tangents, dtype=np.uint8) for curve in keyed])
+
+    # One cubic per key for the segment it starts, in t = (frame - key time) / span;
+    # the last key of a curve gets a constant one
+    spans = np.ones(len(times))
+    spans[:-1] = np.diff(times)
+    spans[last] = 1.0
+    next_values = np.empty(len(values))
+    next_values[:-1] = values[1:]
+    next_values[last] = values[last]
+    delta = next_values - values
+    out_slopes = delta / spans
+    in_slopes = np.empty(len(times))
+    in_slopes[1:] = out_slopes[:-1]
+    for curve, first, count in zip(keyed, starts, lengths):
+        if curve.out_slopes is not None:
+            out_slopes[first:first + count] = curve.out_slopes
+            in_slopes[first:first + count] = curve.in_slopes
+    m0 = out_slopes * spans
+    m1 = np.empty(len(times))
+    m1[:-1] = in_slopes[1:] * spans[:-1]
+    m1[last] = 0.0
+    m0[last] = 0.0
+    cubic = np.stack((m0 + m1 - 2 * delta, 3 * delta - 2 * m0 - m1, m0, values))
+    held = (out_codes == STEP_TANGENT) | (out_codes == STEP_NEXT_TANGENT)
+    held[last] = True
+    cubic[:3, held] = 0.0
+    step_next = out_codes == STEP_NEXT_TANGENT
+    step_next[last] = False
+    cubic[3, step_next] = next_values[step_next]
+
+    # Each key's cubic covers the frames from the first one at or after it up to
+    # the next key's; the first key of a curve also covers the frames before it.
+    # Repeating the coefficients over those runs lines them up with the frames
+    # without a per-frame search
+    position = np.searchsorted(frames, times)
+    position[starts] = 0
+    ends = np.empty(len(times), dtype=position.dtype)
+    ends[:-1] = position[1:]
+    ends[last] = len(frames)
+    counts = ends - position
+    a, b, c, d, origin, scale = np.repeat(np.vstack((cubic, times, spans)).astype(dtype), counts, axis=1)
+
+    t = np.tile(frames.astype(dtype), len(keyed))
+    t -= origin
+    t /= scale
+    np.clip(t, 0.0, 1.0, out=t)
+    result = a * t
+    result += b
+    result *= t
+    result += c
+    result *= t
+    result += d
+    if step_next.any():
+        # A stepnext key keeps its own value on its own frame
+        on_key = (t == 0.0) & np.repeat(step_next, counts)
+        result[on_key] = np.repeat(values.astype(dtype), counts)[on_key]
+    result = result.reshape(len(keyed), len(frames))
+    if len(keyed) == len(curves):
+        return result
+    matrix = np.zeros((len(curves), len(frames)), dtype=dtype)
+    matrix[rows] = result
+    return matrix
+
+
+def sample_curve_matrix(curves, start, end, dtype=float):
+    """Samples AnimCurve models on every frame from start to end into a (curves, frames) array."""
+    return sample_anim_curves(curves, np.arange(start, end + 1, dtype=float), dtype)
+
+
+def motion_profile(matrix, percentile=90):
+    """
+    Per-frame speed and acceleration of a (channels, frames) matrix, taken
+    at the given percentile over the channels so a few noisy channels don't
+    decide. Each channel is normalized by its range over the frames, so
+    translate and rotate channels compare; static channels are left out.
+    Returns (speed, acceleration) arrays, one value per frame.
+    """
+    count = matrix.shape[1]
+    speed = np.zeros(count)
+    accel = np.zeros(count)
+    if count < 2:
+        return speed, accel
+    span = np.ptp(matrix, axis=1)
+    moving = span > 1e-6
+    if not moving.any():
+        return speed, accel
+
+    # Frame-major float32 keeps the per-frame percentile on contiguous rows
+    # and halves the memory the differences stream through
+    normalized = np.ascontiguousarray(matrix[moving].T, dtype=np.float32)
+    normalized /= span[moving].astype(np.float32)
+    velocity = normalized[1:] - normalized[:-1]
+    change = np.abs(velocity[1:] - velocity[:-1])
+    np.abs(velocity, out=velocity)
+
+    channels = velocity.shape[1]
+    kth = min(channels - 1, int(channels * percentile / 100.0))
+    speed[:-1] = np.partition(velocity, kth, axis=1)[:, kth]
+    speed[-1] = speed[-2]
+    if count > 2:
+        accel[1:-1] = np.partition(change, kth, axis=1)[:, kth]
+    return speed, accel
+
+
+def plan_adaptive_frames(speed, accel, start, fast_speed=1.5, slow_speed=0.5, fast_accel=3.0):
+    """
+    Picks the frames to key from a motion profile: 1s where the motion is fast
+    or changes speed sharply, 3s where it is slow and 2s in between, with the
+    thresholds relative to the median speed and acceleration. A hold is cut
+    short as soon as a faster frame falls inside it.
+    """
+    median_speed = np.median(speed)
+    median_accel = np.median(accel)
+    hold = np.full(len(speed), 2, dtype=int)
+    hold[speed < slow_speed * median_speed] = 3
+    hold[(speed > fast_speed * median_speed) | (accel > fast_accel * median_accel)] = 1
+
+    frames = []
+    frame = 0
+    while frame < len(hold):
+        frames.append(start + frame)
+        frame += int(hold[frame:frame + hold[frame]].min())
+    return frames
+
+
+def adaptive_cadence_frames(objects, start, end, **thresholds):
+    """
+    Frames to key for the adaptive "smart twos" cadence of objects between
+    start and end, analysed from their base animation curves.
+    """
+    options = dict(SMART_CADENCE_DEFAULTS, **thresholds)
+    percentile = options.pop("percentile")
+    load_start = time.perf_counter()
+    curves = load_anim_curves_bulk(get_base_anim_curves(objects))
+
+    analysis_start = time.perf_counter()
+    # Single precision is plenty for comparing speeds and halves the memory traffic
+    speed, accel = motion_profile(sample_curve_matrix(curves, start, end, np.float32), percentile)
+    frames = plan_adaptive_frames(speed, accel, start, **options)
+    done = time.perf_counter()
+    print(f"Smart cadence: {len(frames)} keys over {end - start + 1} frames from {len(curves)} curves "
+          f"in {(done - load_start) * 1000:.0f} ms (load {(analysis_start - load_start) * 1000:.0f} ms, "
+          f"analysis {(done - analysis_start) * 1000:.0f} ms)")
+    return frames
+
+
+@twosify_operation("smart_cadence")
+def set_keys_smart_anim_layer(dry_run=False, **thresholds):
+    """
+    Keys the selection on 1s, 2s or 3s depending on how fast it moves.
+    With dry_run=True the KeyEditPlan is only reported.
+    """
+    if np is None:
+        cmds.warning("Smart cadence needs NumPy.")
+        return
     sel = cmds.ls(sl=True)
-    min_time = int(cmds.playbackOptions(q=True, min=True))
-    max_time = int(cmds.playbackOptions(q=True, max=True))
-    
-    timelineRange = range(min_time, max_time+1)
-    
-    odd_frames=[]
-    even_frames=[]
-    for time in timelineRange:
-        remainder = time % 2
-        if remainder > 0:
-            odd_frames.append(time)
-        else:
-            even_frames.append(time)
+    if not sel:
+        cmds.warning("Please select something!")
+        return
+    min_time, max_time = get_playback_range()
+    return apply_key_frames(adaptive_cadence_frames(sel, min_time, max_time, **thresholds), dry_run=dry_run,
+                            name="smart_cadence")
 
-    keys = cmds.keyframe(sel , q=True) or []  
-    cmds.waitCursor(state=True)  
-    if keys:    
-        cmds.cutKey(t = (min_time, max_time))
-        
-    try:
-        cmds.setKeyframe(t = (min_time))
-    except:
+
+# Time-warp curve used by the live stepped mode
+LIVE_STEP_CURVE = "twosify_live_step"
+
+# Curve types driven by time, the only ones the live stepped mode reroutes
+TIME_CURVE_TYPES = ("animCurveTL", "animCurveTA", "animCurveTU", "animCurveTT")
+
+
+def get_live_step_range(curves=()):
+    """
+    Frame range the time-warp curve is keyed over: the scene's animation range,
+    widened to the keys of the curves it drives, so nothing is held on the
+    first or last stepped frame of the playback range.
+    """
+    start = cmds.playbackOptions(q=True, animationStartTime=True)
+    end = cmds.playbackOptions(q=True, animationEndTime=True)
+    if curves:
+        times = cmds.keyframe(list(curves), q=True, timeChange=True) or []
+        if times:
+            start = min(start, min(times))
+            end = max(end, max(times))
+    return int(math.floor(start)), int(math.ceil(end))
+
+
+def build_live_step_curve(spec, start, end, name=LIVE_STEP_CURVE):
+    """
+    Creates, or re-keys, the stepped animCurveTT that maps every frame to the
+    last cadence frame before it. All keys are written with one setAttr.
+    The end keys get linear outer tangents and infinity, so time before and
+    after the keyed range passes through unstepped instead of freezing.
+    Returns the curve name.
+    """
+    if cmds.objExists(name):
+        cmds.cutKey(name, clear=True)
+    else:
+        name = cmds.createNode("animCurveTT", name=name)
+
+    frames = compile_cadence(spec, start, end)
+    flat = []
+    for frame in frames:
+        flat.extend((frame, frame))
+    cmds.setAttr(f"{name}.ktv[0:{len(frames) - 1}]", *flat, size=len(frames))
+    cmds.keyTangent(name, itt="step", ott="step")
+    cmds.keyTangent(name, index=(0, 0), itt="linear")
+    cmds.keyTangent(name, index=(len(frames) - 1, len(frames) - 1), ott="linear")
+    cmds.setInfinity(name, preInfinite="linear", postInfinite="linear")
+    return name
+
+
+@twosify_operation("enable_live_stepping")
+def enable_live_stepping(spec="2", nodes=None):
+    """
+    Live stepped playback without baking.
+    Builds the time-warp curve for the cadence and plugs it into the input of
+    every time-driven anim curve on the nodes (the selection by default).
+    Curves that already have an input connection are left alone.
+    Returns the number of curves routed through the warp.
+    """
+    nodes = nodes or cmds.ls(sl=True)
+    if not nodes:
+        cmds.warning("Please select something to step.")
+        return 0
+
+    curves = [curve for curve in set(cmds.keyframe(nodes, q=True, name=True) or [])
+              if curve != LIVE_STEP_CURVE and cmds.nodeType(curve) in TIME_CURVE_TYPES
+              and not cmds.listConnections(curve + ".input", source=True, destination=False)]
+    if cmds.objExists(LIVE_STEP_CURVE):
+        curves += get_live_step_targets()
+    warp = build_live_step_curve(spec, *get_live_step_range(curves))
+
+    routed = 0
+    for curve in curves:
+        if cmds.isConnected(warp + ".output", curve + ".input"):
+            continue
+        cmds.connectAttr(warp + ".output", curve + ".input")
+        routed += 1
+
+    print(f"Live stepping on {spec}: {routed} curves routed through {warp}")
+    return routed
+
+
+def get_live_step_targets():
+    """Returns the anim curves driven by the time-warp curve."""
+    if not cmds.objExists(LIVE_STEP_CURVE):
+        return []
+    return cmds.listConnections(LIVE_STEP_CURVE + ".output", source=False, destination=True) or []
+
+
+@twosify_operation("set_live_cadence")
+def set_live_cadence(spec):
+    """
+    Switches the live stepped cadence by re-keying the single time-warp curve.
+    Enables live stepping on the selection when it is not on yet.
+    """
+    if not cmds.objExists(LIVE_STEP_CURVE):
+        enable_live_stepping(spec)
         return
-                
-        
-    if sel:    
-        if (min_time % 2 == 0):        
-            cmds.setKeyframe(i=True, t=(even_frames))
-        else:        
-            cmds.setKeyframe(i=True, t=(odd_frames))
-        cmds.waitCursor(state=False)
-                
-                
-                
+    build_live_step_curve(spec, *get_live_step_range(get_live_step_targets()))
+
+
+@twosify_operation("disable_live_stepping")
+def disable_live_stepping():
+    """Disconnects every curve from the time-warp curve and deletes it."""
+    if not cmds.objExists(LIVE_STEP_CURVE):
+        return
+    destinations = cmds.listConnections(LIVE_STEP_CURVE + ".output", source=False, destination=True, plugs=True) or []
+    for destination in destinations:
+        cmds.disconnectAttr(LIVE_STEP_CURVE + ".output", destination)
+    cmds.delete(LIVE_STEP_CURVE)
+    print(f"Live stepping off: {len(destinations)} curves restored")
+
+
 # Class variable to store copied key times (for backwards compatibility)
 copied_key_times = []
 
@@ -255,14 +1120,25 @@ def paste_action(mode="Pose to Pose"):
     elif mode == "Channels":
         paste_key_times_smart()
 
-def clean_range_script():
+# Pose to Pose pastes cutting more intervals, summed over the plugs, than this run as a ChunkedTask
+CHUNKED_PASTE_CUTS = 5000
+# Targets per edit call in a chunked paste, so each idle callback stays short
+CHUNKED_PASTE_TARGETS = 50
+
+
+@twosify_operation("clean_range_script")
+def clean_range_script(chunked=None, queue=None, dry_run=False):
     """
     Paste script - loads key times from JSON file and applies them to selected objects
     Works exactly like the "dada" logic
+    The edits are planned as a KeyEditPlan (see plan_pose_to_pose); with
+    dry_run=True it is reported and returned without changing anything.
+    With chunked=True its calls run as a ChunkedTask, which is returned; by
+    default only plans cutting more than CHUNKED_PASTE_CUTS intervals do. A
+    cancelled or failed chunked paste restores the curves it recorded before
+    starting
     """
     try:
-        cmds.undoInfo(openChunk=True)
-        
         # Load key times from JSON file
         desktop_path = get_desktop_path()
         json_filename = "esn_key_times.json"
@@ -317,68 +1193,575 @@ def clean_range_script():
         print(f"Using stored playback range: {Minn} to {Maxx}")
 
         objects = cmds.ls(sl=1)
+        plan = plan_pose_to_pose(objects, allKeys, Minn, Maxx)
+        if dry_run:
+            plan.report()
+            return plan
 
-        cmds.waitCursor(state=True)
-        
-        # Find objects with no keys and add a key at the first copied time (same as dada logic)
-        objWithNoKeys = []
-        for obj in objects:
-            keyframes = cmds.keyframe(obj, q=1)
-            if keyframes is None:
-                objWithNoKeys.append(obj)
+        if chunked is None:
+            chunked = sum(len(entry["cut"]) for entry in plan.entries.values()) > CHUNKED_PASTE_CUTS
+
+        if chunked:
+            snapshot = [read_anim_curve(curve) for curve in set(cmds.keyframe(objects, q=True, name=True) or [])]
+            unkeyed = [obj for obj in objects if not cmds.keyframe(obj, q=True, keyframeCount=True)]
 
-        # Set keyframes on objects that don't have any at the first copied key time (same as dada logic)
-        if objWithNoKeys and allKeys:
-            for obj in objWithNoKeys:
-                cmds.setKeyframe(obj, t=allKeys[0])
+            def restore():
+                restore_anim_curves(snapshot, "Paste Pose to Pose rollback")
+                if unkeyed:
+                    cmds.cutKey(unkeyed, time=(min(allKeys), max(allKeys)))
+                cmds.currentTime(CT)
 
-        # Get all frames in the playback range (same as dada logic)
-        allFrames = range(Minn, Maxx+1)
+            def run_calls(calls):
+                for function, args, kwargs in calls:
+                    function(*args, **kwargs)
 
-        # Set keyframes at all copied key times with INSERT flag (same as dada logic)
-        for key in allKeys:
-            cmds.setKeyframe(objects, i=True, t=key)
+            def finish():
+                cmds.currentTime(CT)
+                print(f"Applied key timing exactly like dada logic: {allKeys}")
 
-        # Remove keyframes that are NOT in our copied keys list (same as dada logic)
-        for frame in allFrames:    
-            if frame not in allKeys:
-                cmds.cutKey(objects, t=(frame, frame))
+            return ChunkedTask("Paste Pose to Pose", plan.calls(batch=CHUNKED_PASTE_TARGETS), run_calls,
+                               on_done=finish, queue=queue, rollback=restore).start()
+
+        calls = plan.execute()
+        print(f"{plan}: {calls} edit calls")
 
         # Restore current time (same as dada logic)
         cmds.currentTime(CT)
-        cmds.waitCursor(state=False)
         
         print(f"Applied key timing exactly like dada logic: {allKeys}")
         print("Paste completed.")
         
     except Exception as e:
-        cmds.waitCursor(state=False)
         print(f"Error in paste script: {str(e)}")
-    finally:
-        cmds.undoInfo(closeChunk=True)
 
-def paste_key_times_smart():
+
+def plan_pose_to_pose(objects, allKeys, start, end):
+    """
+    Plans the "Pose to Pose" paste as a KeyEditPlan: every keyed plug of
+    objects gets keys at the copied times and loses its other keys between
+    start and end. Objects with no keys at all are keyed at the first copied
+    time first (same as dada logic). Key times are read in one batch (see
+    discover_keyed_plugs); only objects keyed through anim layers or
+    pairBlends are queried plug by plug.
+    """
+    keyed, layered = discover_keyed_plugs(objects)
+    plug_times = [(f"{obj}.{attr}", times) for obj, attrs in keyed.items() for attr, times in attrs.items()]
+    if layered:
+        for plug in cmds.listAnimatable(layered) or []:
+            times = cmds.keyframe(plug, q=True, timeChange=True)
+            if times:
+                plug_times.append((plug, times))
+    unkeyed = [obj for obj in objects if not cmds.keyframe(obj, q=True, keyframeCount=True)]
+    if unkeyed:
+        plug_times.extend((plug, []) for plug in cmds.listAnimatable(unkeyed) or [])
+    return plan_plug_key_times(plug_times, allKeys, start, end, seed=allKeys[0],
+                               plan=KeyEditPlan("clean_range_script"))
+
+
+def plan_plug_sync(ref_times, actual_times, timeline_min, timeline_max):
     """
-    Smart Paste Key Times - syncs keyframes based on JSON data
-    Uses object-specific timing with fallback to reference object
+    Works out how one plug has to change to match the reference timing.
+    Returns (times to insert, intervals to cut, number of keys removed), all
+    limited to the timeline range. Every cut interval only spans keys that have
+    to go, so no kept or inserted key is ever inside one.
+    """
+    ref = FrameSet(ref_times).clip(timeline_min, timeline_max)
+    actual = FrameSet(actual_times or [])
+
+    to_add = ref - actual
+    to_remove = (actual - ref).clip(timeline_min, timeline_max)
+    kept = (actual - to_remove) | to_add
+
+    intervals = to_remove.spans(breaks=kept.frames())
+    return tuple(to_add), tuple(intervals), len(to_remove)
+
+
+class KeyEditPlan(object):
+    """
+    Key edits worked out before anything in the scene changes.
+    Each plug maps to the keys to insert, the intervals to cut (each spanning
+    only keys that go, see plan_plug_sync), the key values to set and the
+    tangent changes, plus a seed time to key first for plugs without a curve
+    to insert on. A plan can
+    be reported as a dry run, diffed with another one, saved as JSON and
+    applied by execute() in as few bulk calls as possible, in one undo chunk.
+    """
+
+    VERSION = 1
+
+    def __init__(self, name="key_edits"):
+        self.name = name
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __repr__(self):
+        return f"KeyEditPlan({self.name}, {len(self.entries)} plugs)"
+
+    def add(self, plug, final_times, current_times, start=float("-inf"), end=float("inf"),
+            tangents=None, values=None, target=None, seed=None):
+        """
+        Plans the keys of plug between start and end going from current_times
+        to final_times, plus tangent changes as {(in, out): [times]} and key
+        values to set as {time: value}. Inserted keys without a value keep the
+        curve's shape. seed is a time to set a key at first, with the plug's
+        current value, when it has no curve yet; keys with a value create
+        the curve themselves. target is the node the edit calls act on, the
+        plug itself by default (e.g. an anim curve on a layer).
+        Returns (keys added, keys removed).
+        """
+        to_add, cuts, removed = plan_plug_sync(final_times, current_times, start, end)
+        tangents = dict((types, tuple(times)) for types, times in (tangents or {}).items() if times)
+        values = tuple(sorted((values or {}).items()))
+        if to_add or cuts or tangents or values:
+            self.entries[plug] = {"target": target or plug, "seed": seed, "add": to_add, "cut": cuts,
+                                  "removed": removed, "values": values, "tangents": tangents}
+        else:
+            self.entries.pop(plug, None)
+        return len(to_add), removed
+
+    @classmethod
+    def from_curves(cls, curves, name="commit_anim_curves"):
+        """Plans the difference between AnimCurve models and their loaded state."""
+        plan = cls(name)
+        for curve in curves:
+            _, _, tangents = curve.diff()
+            plan.add(curve.plug or curve.name, list(curve.times), list(curve._loaded_times),
+                     tangents=tangents, values=curve.value_changes(), target=curve.name)
+        return plan
+
+    def counts(self):
+        """Dry run: {object: {"plugs", "added", "removed", "values", "tangents"}}."""
+        counts = {}
+        for plug, entry in self.entries.items():
+            obj = counts.setdefault(plug.split(".", 1)[0], {"plugs": 0, "added": 0, "removed": 0,
+                                                           "values": 0, "tangents": 0})
+            obj["plugs"] += 1
+            obj["added"] += len(entry["add"])
+            obj["removed"] += entry["removed"]
+            obj["values"] += len(entry["values"])
+            obj["tangents"] += sum(len(times) for times in entry["tangents"].values())
+        return counts
+
+    def report(self):
+        """Prints the dry run counts per object and returns them."""
+        counts = self.counts()
+        for obj, c in sorted(counts.items()):
+            print(f"{obj}: {c['plugs']} plugs, +{c['added']} keys, -{c['removed']} keys, "
+                  f"{c['values']} values, {c['tangents']} tangents")
+        added = sum(c["added"] for c in counts.values())
+        removed = sum(c["removed"] for c in counts.values())
+        print(f"{self.name} (dry run): {len(self.entries)} plugs on {len(counts)} objects, +{added} keys, -{removed} keys")
+        return counts
+
+    def diff(self, other):
+        """
+        Compares with another plan, e.g. a cached run.
+        Returns {plug: (entry here, entry in other)} for the plugs planned
+        differently, None standing for a plug missing from a plan.
+        """
+        changed = {}
+        for plug in set(self.entries) | set(other.entries):
+            mine = self.entries.get(plug)
+            theirs = other.entries.get(plug)
+            if mine != theirs:
+                changed[plug] = (mine, theirs)
+        return changed
+
+    def to_json(self):
+        """Serializes the plan to a JSON string."""
+        entries = {}
+        for plug, entry in self.entries.items():
+            entry = dict(entry)
+            entry["tangents"] = [[i, o, list(times)] for (i, o), times in entry["tangents"].items()]
+            entries[plug] = entry
+        return json.dumps({"version": self.VERSION, "name": self.name, "entries": entries})
+
+    @classmethod
+    def from_json(cls, text):
+        """Reads a plan written by to_json()."""
+        data = json.loads(text)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported key edit plan version: {data.get('version')}")
+        plan = cls(data.get("name", "key_edits"))
+        for plug, entry in data["entries"].items():
+            plan.entries[plug] = {
+                "target": entry["target"],
+                "seed": entry.get("seed"),
+                "add": tuple(entry["add"]),
+                "cut": tuple(tuple(interval) for interval in entry["cut"]),
+                "removed": entry["removed"],
+                "values": tuple(tuple(pair) for pair in entry.get("values", ())),
+                "tangents": dict(((i, o), tuple(times)) for i, o, times in entry["tangents"]),
+            }
+        return plan
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_json(f.read())
+
+    def calls(self, batch=None):
+        """
+        The edit calls execute() makes, in order, as (function, args, kwargs).
+        Targets with the same seed, inserts, cuts or tangent change share one
+        call, split into calls of at most batch targets when batch is given.
+        Seeds come first so there are curves to insert on, inserts before
+        cuts so the curve shape is still there to insert on, and values are
+        written per curve with one setAttr (see write_plug_keys) once every
+        planned key exists.
+        """
+        seeds = {}
+        inserts = {}
+        cuts = {}
+        tangents = {}
+        for entry in self.entries.values():
+            if entry["seed"] is not None:
+                seeds.setdefault(entry["seed"], []).append(entry["target"])
+            if entry["add"]:
+                inserts.setdefault(entry["add"], []).append(entry["target"])
+            if entry["cut"]:
+                cuts.setdefault(entry["cut"], []).append(entry["target"])
+            for types, times in entry["tangents"].items():
+                tangents.setdefault((types, times), []).append(entry["target"])
+
+        def batches(targets):
+            size = batch or len(targets)
+            return [targets[i:i + size] for i in range(0, len(targets), size)]
+
+        calls = []
+        for time, targets in seeds.items():
+            calls.extend((cmds.setKeyframe, (chunk,), {"time": time}) for chunk in batches(targets))
+        for times, targets in inserts.items():
+            calls.extend((cmds.setKeyframe, (chunk,), {"time": list(times), "insert": True})
+                         for chunk in batches(targets))
+        for intervals, targets in cuts.items():
+            calls.extend((cmds.cutKey, (chunk,), {"time": list(intervals), "option": "keys"})
+                         for chunk in batches(targets))
+        for entry in self.entries.values():
+            if entry["values"]:
+                times = [time for time, _ in entry["values"]]
+                values = [value for _, value in entry["values"]]
+                calls.append((write_plug_keys, (entry["target"], times, values), {}))
+        for ((in_tangent, out_tangent), times), targets in tangents.items():
+            calls.extend((cmds.keyTangent, (chunk,), {"time": [(t, t) for t in times], "itt": in_tangent,
+                                                     "ott": out_tangent})
+                         for chunk in batches(targets))
+        return calls
+
+    def execute(self, **session_options):
+        """
+        Applies the plan inside one TwosifySession (see calls()).
+        Returns the number of edit calls made.
+        """
+        calls = self.calls()
+        with TwosifySession(self.name, **session_options):
+            for function, args, kwargs in calls:
+                function(*args, **kwargs)
+        return len(calls)
+
+
+def plan_key_times_sync(plug_ref_times, timeline_min, timeline_max):
+    """
+    Plans the smart paste key sync: plug_ref_times is a list of
+    (plug, reference times). Returns a KeyEditPlan.
+    """
+    plan = KeyEditPlan("paste_key_times_smart")
+    for plug, ref_times in plug_ref_times:
+        actual_times = cmds.keyframe(plug, q=True, timeChange=True) or []
+        plan.add(plug, ref_times, actual_times, timeline_min, timeline_max)
+    return plan
+
+
+def plan_plug_key_times(plug_times, key_times, start, end, keep_existing=False, seed=None, plan=None):
+    """
+    Plans keying plugs at key_times between start and end. plug_times is a
+    list of (plug, current key times); their other keys in the range are cut
+    unless keep_existing is set. Plugs without keys are keyed at seed first,
+    or left out when no seed is given. Entries go into plan when one is passed.
+    Returns the KeyEditPlan.
+    """
+    plan = plan if plan is not None else KeyEditPlan("key_times")
+    for plug, current_times in plug_times:
+        if not current_times and seed is None:
+            continue
+        final_times = sorted(set(key_times).union(current_times)) if keep_existing else key_times
+        plan.add(plug, final_times, current_times, start, end, seed=None if current_times else seed)
+    return plan
+
+
+def sync_key_times_batched(plug_ref_times, timeline_min, timeline_max):
+    """
+    Batched version of the smart paste key sync.
+    plug_ref_times is a list of (plug, reference times). Plugs that need the
+    same inserts and cuts are grouped, and each group gets one setKeyframe and
+    one cutKey call (see KeyEditPlan.execute).
+    Returns {plug: (keys added, keys removed)}.
+    """
+    plan = plan_key_times_sync(plug_ref_times, timeline_min, timeline_max)
+    summary = dict((plug, (0, 0)) for plug, _ in plug_ref_times)
+    for plug, entry in plan.entries.items():
+        summary[plug] = (len(entry["add"]), entry["removed"])
+    plan.execute()
+    return summary
+
+
+# Binary key-timing clipboard written by Smart Copy
+KEY_TIMING_FILENAME = "maya_key_timing.bin"
+KEY_TIMING_MAGIC = b"TWSK"
+KEY_TIMING_VERSION = 1
+# magic, version, number of float64 times, byte length of the JSON index
+KEY_TIMING_HEADER = struct.Struct("<4sIQQ")
+
+# path -> (mtime_ns, size, KeyTimingClipboard)
+_key_timing_cache = {}
+
+
+class KeyTimingClipboard(object):
+    """
+    Key timing read from the binary clipboard.
+    All times live in one flat float64 array; the index maps each object and
+    attribute to an (offset, count) slice of it. Behaves like the
+    {obj: {attr: [times]}} dict the JSON clipboard used to hold.
+    """
+
+    def __init__(self, times, index):
+        self.times = times
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __contains__(self, obj):
+        return obj in self.index
+
+    def __getitem__(self, obj):
+        return dict((attr, self.times[offset:offset + count])
+                    for attr, (offset, count) in self.index[obj].items())
+
+    def get(self, obj, default=None):
+        return self[obj] if obj in self.index else default
+
+
+def write_key_timing_clipboard(path, data):
+    """
+    Writes {obj: {attr: [times]}} to the binary clipboard at path.
+    Identical timing lists are stored once and shared through the index.
+    """
+    times = array("d")
+    offsets = {}
+    index = {}
+    for obj, attrs in data.items():
+        obj_index = {}
+        for attr, key_times in attrs.items():
+            key = tuple(float(t) for t in key_times)
+            if key not in offsets:
+                offsets[key] = len(times)
+                times.extend(key)
+            obj_index[attr] = (offsets[key], len(key))
+        index[obj] = obj_index
+
+    if sys.byteorder != "little":
+        times.byteswap()
+    index_bytes = json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(KEY_TIMING_HEADER.pack(KEY_TIMING_MAGIC, KEY_TIMING_VERSION, len(times), len(index_bytes)))
+        f.write(times.tobytes())
+        f.write(index_bytes)
+    os.replace(temp_path, path)
+    return len(offsets)
+
+
+def load_key_timing_clipboard(path):
+    """
+    Reads the binary clipboard through mmap.
+    The result is cached on the file's mtime and size, so repeated pastes of
+    the same copy skip reading altogether.
+    """
+    stat = os.stat(path)
+    cached = _key_timing_cache.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, count, index_length = KEY_TIMING_HEADER.unpack_from(mm, 0)
+            if magic != KEY_TIMING_MAGIC or version != KEY_TIMING_VERSION:
+                raise ValueError(f"Not a Twosify key timing file: {path}")
+            start = KEY_TIMING_HEADER.size
+            times = array("d")
+            times.frombytes(mm[start:start + count * 8])
+            index = json.loads(mm[start + count * 8:start + count * 8 + index_length].decode("utf-8"))
+
+    if sys.byteorder != "little":
+        times.byteswap()
+    clipboard = KeyTimingClipboard(times, index)
+    _key_timing_cache[path] = (stat.st_mtime_ns, stat.st_size, clipboard)
+    return clipboard
+
+
+# optionVar holding the namespace substitution rules for Smart Paste
+NAMESPACE_RULES_OPTION = "twosifyNamespaceRules"
+
+
+def strip_namespaces(name):
+    """Removes the namespaces from every component of a node name or DAG path."""
+    return "|".join(part.rpartition(":")[2] for part in name.split("|"))
+
+
+def leaf_namespace(name):
+    """Returns the namespace of the last component of a node name, '' for the root namespace."""
+    return name.rsplit("|", 1)[-1].rpartition(":")[0]
+
+
+def parse_namespace_rules(text):
+    """
+    Parses rules written as "copied=pasted;copied2=pasted2" into a list of
+    (copied namespace, pasted namespace) pairs. An empty side is the root namespace.
+    """
+    rules = []
+    for rule in (text or "").split(";"):
+        if not rule.strip():
+            continue
+        copied, sep, pasted = rule.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid namespace rule: {rule!r}")
+        rules.append((copied.strip().strip(":"), pasted.strip().strip(":")))
+    return rules
+
+
+def get_namespace_rules():
+    """Returns the namespace substitution rules saved in Maya's preferences."""
+    if not cmds.optionVar(exists=NAMESPACE_RULES_OPTION):
+        return []
+    try:
+        return parse_namespace_rules(cmds.optionVar(q=NAMESPACE_RULES_OPTION))
+    except ValueError as e:
+        cmds.warning(f"Ignoring namespace rules: {e}")
+        return []
+
+
+def set_namespace_rules_dialog():
+    """Prompts for the namespace substitution rules and saves them."""
+    current = ";".join(f"{copied}={pasted}" for copied, pasted in get_namespace_rules())
+    result = cmds.promptDialog(
+        title="Namespace Rules",
+        message="Copied=pasted namespaces, e.g. mireuk_v01_2=mireuk_v01_3;charA=charB",
+        text=current,
+        button=["OK", "Cancel"],
+        defaultButton="OK",
+        cancelButton="Cancel",
+        dismissString="Cancel",
+    )
+    if result != "OK":
+        return
+    text = cmds.promptDialog(q=True, text=True)
+    try:
+        parse_namespace_rules(text)
+    except ValueError as e:
+        cmds.warning(str(e))
+        return
+    cmds.optionVar(stringValue=(NAMESPACE_RULES_OPTION, text))
+
+
+class NamespaceRemap(object):
+    """
+    Maps pasted objects to copied ones across namespaces.
+    Built once per paste from the copied names: an exact-name set plus an
+    index from bare node name (no DAG path, no namespaces) to
+    {namespace: copied name}, so each resolve() is a couple of dict lookups.
+    A pasted object resolves to, in order: the copied object with the same
+    name, the one in the namespace its rules map to (its own namespace when
+    there is no rule), the only copied object with the same bare name.
+    Names may be short names or DAG paths on either side. Pasted namespaces without a rule are paired
+    with the unused copied namespaces in order by pair_namespaces().
+    """
+
+    def __init__(self, names, rules=()):
+        self.exact = set()
+        self.by_base = {}
+        self.namespaces = []
+        for name in names:
+            self.exact.add(name)
+            namespace = leaf_namespace(name)
+            base = strip_namespaces(name).rsplit("|", 1)[-1]
+            self.by_base.setdefault(base, {}).setdefault(namespace, name)
+            if namespace not in self.namespaces:
+                self.namespaces.append(namespace)
+        # pasted namespace -> copied namespace
+        self.mapping = dict((pasted, copied) for copied, pasted in rules)
+
+    def pair_namespaces(self, objects):
+        """
+        Pairs the namespaces of objects that have no rule, in selection order,
+        with the copied namespaces not mapped yet, in copy order.
+        """
+        free = [ns for ns in self.namespaces if ns not in self.mapping.values()]
+        for obj in objects:
+            namespace = leaf_namespace(obj)
+            if namespace in self.mapping or namespace in self.namespaces:
+                continue
+            if not free:
+                break
+            self.mapping[namespace] = free.pop(0)
+
+    def resolve(self, obj):
+        """Returns the copied name matching obj, or None."""
+        if obj in self.exact:
+            return obj
+        candidates = self.by_base.get(strip_namespaces(obj).rsplit("|", 1)[-1])
+        if not candidates:
+            return None
+        namespace = leaf_namespace(obj)
+        copied_namespace = self.mapping.get(namespace, namespace)
+        if copied_namespace in candidates:
+            return candidates[copied_namespace]
+        if len(candidates) == 1:
+            return next(iter(candidates.values()))
+        return None
+
+
+@twosify_operation("paste_key_times_smart")
+def paste_key_times_smart(batched=True, dry_run=False):
+    """
+    Smart Paste Key Times - syncs keyframes based on the Smart Copy clipboard
+    Uses object-specific timing, matched across namespaces by NamespaceRemap,
+    with fallback to reference object
+    With batched=True, plugs sharing the same timing change are edited together
+    With dry_run=True nothing is changed; the KeyEditPlan is reported and returned
     """
     try:
-        # Load JSON file from Desktop
+        # Load the clipboard from Desktop, falling back to the older JSON format
         desktop_path = get_desktop_path()
-        json_filename = "maya_key_timing.json"
-        json_path = os.path.join(desktop_path, json_filename)
-        
-        if not os.path.exists(json_path):
-            cmds.warning("JSON file not found. Please use Smart Copy first.")
-            print("JSON file not found. Please use Smart Copy first.")
+        clipboard_path = os.path.join(desktop_path, KEY_TIMING_FILENAME)
+        json_path = os.path.join(desktop_path, "maya_key_timing.json")
+
+        if os.path.exists(clipboard_path):
+            data = load_key_timing_clipboard(clipboard_path)
+        elif os.path.exists(json_path):
+            with open(json_path, "r") as f:
+                data = json.load(f)
+        else:
+            cmds.warning("Key timing file not found. Please use Smart Copy first.")
+            print("Key timing file not found. Please use Smart Copy first.")
             return
 
-        with open(json_path, "r") as f:
-            data = json.load(f)
-
         if not data:
-            cmds.warning("JSON is empty or invalid.")
-            print("JSON is empty or invalid.")
+            cmds.warning("Key timing file is empty or invalid.")
+            print("Key timing file is empty or invalid.")
             return
 
         selected = cmds.ls(sl=True)
@@ -395,9 +1778,37 @@ def paste_key_times_smart():
         # Reference object for fallback
         ref_obj = next(iter(data))
 
+        remap = NamespaceRemap(data, get_namespace_rules())
+        remap.pair_namespaces(selected)
+        sources = dict((obj, remap.resolve(obj)) for obj in selected)
+        unmatched = [obj for obj, source in sources.items() if source is None]
+        if unmatched:
+            cmds.warning(f"No copied timing matches {len(unmatched)} objects, using {ref_obj}: {', '.join(unmatched[:5])}")
+
+        if batched or dry_run:
+            plug_ref_times = []
+            for obj in selected:
+                obj_key_data = data[sources[obj] or ref_obj]
+                for attr, ref_times in obj_key_data.items():
+                    full_attr = f"{obj}.{attr}"
+                    if cmds.objExists(full_attr):
+                        plug_ref_times.append((full_attr, ref_times))
+
+            if dry_run:
+                plan = plan_key_times_sync(plug_ref_times, timeline_min, timeline_max)
+                plan.report()
+                return plan
+
+            summary = sync_key_times_batched(plug_ref_times, timeline_min, timeline_max)
+            changed = [plug for plug, counts in summary.items() if counts[0] or counts[1]]
+            added = sum(counts[0] for counts in summary.values())
+            removed = sum(counts[1] for counts in summary.values())
+            print(f"Smart paste completed. Synced {len(changed)} of {len(summary)} attributes: +{added} keys, -{removed} keys inside timeline")
+            return summary
+
         for obj in selected:
             # Use object's own key timing if exists, else fallback to ref_obj
-            obj_key_data = data.get(obj, data[ref_obj])
+            obj_key_data = data[sources[obj] or ref_obj]
 
             for attr, ref_times in obj_key_data.items():
                 full_attr = f"{obj}.{attr}"
@@ -405,16 +1816,15 @@ def paste_key_times_smart():
                     continue
 
                 # Filter keys strictly within timeline range
-                filtered_ref_times = [t for t in ref_times if timeline_min <= t <= timeline_max]
-                ref_set = set(filtered_ref_times)
+                ref_frames = FrameSet(ref_times).clip(timeline_min, timeline_max)
 
                 actual_times = cmds.keyframe(full_attr, q=True, timeChange=True)
-                actual_set = set(actual_times) if actual_times else set()
+                actual_frames = FrameSet(actual_times or [])
 
                 # Keys to add (insert)
-                to_add = [t for t in sorted(ref_set - actual_set) if timeline_min <= t <= timeline_max]
+                to_add = (ref_frames - actual_frames).frames()
                 # Keys to remove (cut)
-                to_remove = [t for t in sorted(actual_set - ref_set) if timeline_min <= t <= timeline_max]
+                to_remove = (actual_frames - ref_frames).clip(timeline_min, timeline_max).frames()
 
                 for t in to_add:
                     cmds.setKeyframe(full_attr, time=t, insert=True)
@@ -483,14 +1893,13 @@ def copy_action(mode="Pose to Pose"):
     elif mode == "Channels":
         copy_key_times_smart()
 
+@twosify_operation("copy_key_times_script")
 def copy_key_times_script():
     """
     Copy Key Times script - stores keyframe timing from selected objects to JSON file
     Even handles objects with no keys by storing empty timing data
     """
     try:
-        cmds.undoInfo(openChunk=True)
-        
         sel = cmds.ls(sl=True)
         if len(sel) == 0:
             print("No objects selected for copy operation.")
@@ -506,8 +1915,7 @@ def copy_key_times_script():
         # Handle case where no keys exist - store empty list
         if allKeys:
             # Remove duplicates and sort
-            key_times = list(set(allKeys))
-            key_times.sort()
+            key_times = FrameSet(allKeys).frames()
             print(f"Found keyframes: {key_times}")
         else:
             # No keys found - store empty list but still create JSON
@@ -540,27 +1948,123 @@ def copy_key_times_script():
                 
     except Exception as e:
         print(f"Error in copy_key_times_script: {str(e)}")
-    finally:
-        cmds.undoInfo(closeChunk=True)
 
+def read_curve_key_times(curves):
+    """
+    Reads the key times of all curves in one pass through the API.
+    Returns {curve: [times]} in the current time unit.
+    """
+    selection = om.MSelectionList()
+    for curve in curves:
+        selection.add(curve)
+    unit = om.MTime.uiUnit()
+
+    result = {}
+    for index, curve in enumerate(curves):
+        fn = oma.MFnAnimCurve(selection.getDependNode(index))
+        result[curve] = [fn.input(key).asUnits(unit) for key in range(fn.numKeys)]
+    return result
+
+
+def map_long_names(names):
+    """
+    Returns {full DAG path: name} for node names given in any form, short,
+    partial or full paths; a name matching several nodes maps all of them.
+    Names that each resolve to one node cost a single ls call.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    long_names = cmds.ls(names, long=True) or []
+    if len(long_names) == len(names):
+        return dict(zip(long_names, names))
+    mapping = {}
+    for name in names:
+        for long_name in cmds.ls(name, long=True) or []:
+            mapping.setdefault(long_name, name)
+    return mapping
+
+
+def discover_keyed_plugs(objects, attrs=None):
+    """
+    Finds the animated plugs of objects without touching unanimated attributes.
+    One connection query maps every time-driven anim curve to the plug it drives,
+    then all key times are read in one batch. attrs limits the result to those
+    attribute names, short or long.
+    Returns ({obj: {attr: [times]}}, [objects to scan attribute by attribute]);
+    the second list holds objects keyed through anim layers or pairBlends,
+    whose curves don't connect to them directly. Objects are named as they
+    were passed in, whatever names the connection queries return.
+    """
+    pairs = cmds.listConnections(objects, source=True, destination=False, connections=True,
+                                 plugs=False, skipConversionNodes=True, type="animCurve") or []
+    time_curves = set(cmds.ls(pairs[1::2], type=list(TIME_CURVE_TYPES)) or [])
+
+    blend_plugs = []
+    for blend_type in ("animBlendNodeBase", "pairBlend"):
+        blend_pairs = cmds.listConnections(objects, source=True, destination=False, connections=True,
+                                           plugs=False, type=blend_type) or []
+        blend_plugs.extend(blend_pairs[0::2])
+
+    # Both sides as full paths, so long, DAG path or short names all match
+    passed_names = map_long_names(objects)
+    found_names = map_long_names(plug.split(".", 1)[0] for plug in pairs[0::2] + blend_plugs)
+    passed = dict((name, passed_names.get(long_name)) for long_name, name in found_names.items())
+    blended = set(passed.get(plug.split(".", 1)[0]) for plug in blend_plugs)
+
+    wanted = None
+    if attrs:
+        wanted = {}
+        for obj in objects:
+            names = set()
+            for attr in attrs:
+                names.add(attr)
+                try:
+                    names.add(cmds.attributeQuery(attr, node=obj, longName=True))
+                except Exception:
+                    pass
+            wanted[obj] = names
+
+    plug_curves = []
+    for plug, curve in zip(pairs[0::2], pairs[1::2]):
+        node, _, attr = plug.partition(".")
+        obj = passed.get(node)
+        if obj is None or curve not in time_curves or obj in blended:
+            continue
+        if wanted is not None and attr not in wanted.get(obj, ()):
+            continue
+        plug_curves.append((obj, attr, curve))
+
+    key_times = read_curve_key_times(sorted(set(curve for _, _, curve in plug_curves)))
+
+    result = {}
+    for obj, attr, curve in plug_curves:
+        if key_times[curve]:
+            result.setdefault(obj, {})[attr] = key_times[curve]
+
+    fallback = [obj for obj in objects if obj in blended]
+    return result, fallback
+
+
+@twosify_operation("copy_key_times_smart")
 def copy_key_times_smart():
     """
     Smart Copy Key Times - works with channel box selections
     Saves key timing data to JSON file on Desktop
     """
     try:
-        cmds.undoInfo(openChunk=True)
-        
         selected = cmds.ls(sl=True)
         if not selected:
             cmds.warning("No objects selected.")
             print("No objects selected for smart copy.")
             return
 
-        result = {}
+        channel_attrs = get_selected_channelbox_attrs()
+        result, fallback = discover_keyed_plugs(selected, channel_attrs or None)
 
-        for obj in selected:
-            attrs = get_selected_channelbox_attrs()
+        # Objects keyed through anim layers or blends still go attribute by attribute
+        for obj in fallback:
+            attrs = channel_attrs
             if not attrs:
                 # No selected channels, fallback to all keyable visible attrs
                 attrs = get_all_keyable_attrs(obj)
@@ -579,6 +2083,9 @@ def copy_key_times_smart():
             if obj_data:
                 result[obj] = obj_data
 
+        # Keep selection order, the first object is the paste fallback
+        result = dict((obj, result[obj]) for obj in selected if obj in result)
+
         if not result:
             cmds.warning("No keyed attributes found on selected objects.")
             print("No keyed attributes found on selected objects.")
@@ -586,19 +2093,14 @@ def copy_key_times_smart():
 
         # Save to Desktop
         desktop_path = get_desktop_path()
-        json_filename = "maya_key_timing.json"
-        json_path = os.path.join(desktop_path, json_filename)
+        clipboard_path = os.path.join(desktop_path, KEY_TIMING_FILENAME)
+        write_key_timing_clipboard(clipboard_path, result)
 
-        with open(json_path, "w") as f:
-            json.dump(result, f, indent=4)
-
-        print(f"Smart copy completed. Keyframe timing saved to: {json_path}")
+        print(f"Smart copy completed. Keyframe timing saved to: {clipboard_path}")
         show_feedback_message("Copied Key Time")
         
     except Exception as e:
         print(f"Error in smart copy: {str(e)}")
-    finally:
-        cmds.undoInfo(closeChunk=True)
 
 def get_selected_channelbox_attrs():
     """Get selected attributes from the channel box"""
@@ -646,24 +2148,73 @@ def show_feedback_message(message):
 
 
 
+def is_keyable_plug(plug):
+    """True when the plug is keyable and unlocked, asked of the plug itself."""
+    try:
+        return bool(cmds.getAttr(plug, keyable=True)) and not cmds.getAttr(plug, lock=True)
+    except (RuntimeError, ValueError):
+        return False
+
+
+def add_plugs_to_anim_layer(layer, plugs):
+    """
+    Adds plugs to an anim layer with a single animLayer edit.
+    Plugs already on the layer, locked plugs and non-keyable plugs are skipped,
+    using one listAttr query per node rather than one check per plug. Plugs
+    listAttr names differently (aliases, multi and compound children such as
+    blendShape weights) are checked with getAttr one by one.
+    Returns {"added": n, "already_on_layer": n, "locked_or_not_keyable": n}.
+    """
+    long_names = {}
+
+    def long_plug(plug):
+        node, _, attr = plug.partition(".")
+        if node not in long_names:
+            found = cmds.ls(node, long=True) or [node]
+            long_names[node] = found[0]
+        return long_names[node], attr
+
+    existing = set(long_plug(plug) for plug in cmds.animLayer(layer, q=True, attribute=True) or [])
+
+    by_node = {}
+    for plug in plugs:
+        node, attr = long_plug(plug)
+        by_node.setdefault(node, []).append(attr)
+
+    report = {"added": 0, "already_on_layer": 0, "locked_or_not_keyable": 0}
+    to_add = []
+    for node, attrs in by_node.items():
+        keyable = set(cmds.listAttr(node, keyable=True, unlocked=True) or [])
+        for attr in dict.fromkeys(attrs):
+            if (node, attr) in existing:
+                report["already_on_layer"] += 1
+            elif attr in keyable or is_keyable_plug(f"{node}.{attr}"):
+                to_add.append(f"{node}.{attr}")
+            else:
+                report["locked_or_not_keyable"] += 1
+
+    if to_add:
+        cmds.animLayer(layer, e=True, attribute=to_add)
+    report["added"] = len(to_add)
+    print(f"{layer}: added {report['added']} plugs, skipped {report['already_on_layer']} already on the layer "
+          f"and {report['locked_or_not_keyable']} locked or non-keyable")
+    return report
+
+
 def create_twos_layer():
 
     sel = cmds.ls(sl=True)
 
     if sel:    
-        root_layer = cmds.animLayer(query=True, root=True) or []
-        animLayers = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or []
-        cmds.waitCursor(state=True)
-        animLayerName = cmds.animLayer("TWOS", selected=True)
-        # Deselect the previous selected layers
-        for layer in animLayers:
-            mel.eval('animLayerEditorOnSelect {0} 0;'.format(layer))    
-
-        attrs = cmds.listAnimatable()
-
-        for attr in attrs:
-            cmds.animLayer(animLayerName, e=True, attribute = attr)
-        cmds.waitCursor(state=False)
+        with TwosifySession("create_twos_layer"):
+            root_layer = cmds.animLayer(query=True, root=True) or []
+            animLayers = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or []
+            animLayerName = cmds.animLayer("TWOS", selected=True)
+            # Deselect the previous selected layers
+            for layer in animLayers:
+                mel.eval('animLayerEditorOnSelect {0} 0;'.format(layer))    
+
+            add_plugs_to_anim_layer(animLayerName, cmds.listAnimatable() or [])
         
     else:
         cmds.confirmDialog(title="Error", message="Please select something to create an animLayer.")
@@ -677,104 +2228,1096 @@ def add_selected_to_anim_layer():
     if sel:
         try:      
             animLayerName = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True)[0]
-            attrs = cmds.listAnimatable()
-
-            for attr in attrs:
-                cmds.animLayer(animLayerName, e=True, attribute = attr)
+            with TwosifySession("add_selected_to_anim_layer"):
+                add_plugs_to_anim_layer(animLayerName, cmds.listAnimatable() or [])
         except:
             pass
 
 
-def convert_to_twos():
+def find_anim_curve(plug, layer=None):
+    """
+    Returns the anim curve driving the plug, on the given anim layer if one is passed.
+    """
+    try:
+        if layer:
+            curves = cmds.animLayer(layer, q=True, findCurveForPlug=plug) or []
+        else:
+            curves = cmds.keyframe(plug, q=True, name=True) or []
+    except Exception:
+        curves = []
+    return curves[0] if curves else None
 
-    animLayerName = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or []
-    if animLayerName:
-        animLayerName = animLayerName[0]
-    else:
+
+def write_plug_keys(plug, times, values, layer=None):
+    """
+    Writes all (time, value) keys onto the plug's curve with one setAttr on the
+    curve's key array, merging with the keys already there.
+    Missing keys are inserted with one setKeyframe first, so Maya keeps the
+    per-key tangent arrays in step with the key indices the setAttr writes.
+    Creates the curve (on the layer, if given) when the plug has none yet.
+    Returns the curve name.
+    """
+    if not times:
+        return None
+
+    curve = find_anim_curve(plug, layer)
+    if not curve:
+        if layer:
+            cmds.setKeyframe(plug, t=times[0], v=values[0], animLayer=layer)
+        else:
+            cmds.setKeyframe(plug, t=times[0], v=values[0])
+        curve = find_anim_curve(plug, layer)
+    if not curve:
+        return None
+
+    keys = dict(cmds.getAttr(f"{curve}.ktv[*]") or [])
+    new_times = [t for t in times if t not in keys]
+    if new_times:
+        cmds.setKeyframe(curve, time=new_times, insert=True)
+    keys.update(zip(times, values))
+    flat = []
+    for t in sorted(keys):
+        flat.extend((t, keys[t]))
+    cmds.setAttr(f"{curve}.ktv[0:{len(keys) - 1}]", *flat, size=len(keys))
+    return curve
+
+
+# Tangent type names as keyTangent uses them, stored by index in AnimCurve
+TANGENT_TYPES = ("auto", "spline", "linear", "flat", "step", "stepnext",
+                 "fixed", "clamped", "plateau", "slow", "fast")
+STEP_TANGENT = TANGENT_TYPES.index("step")
+STEP_NEXT_TANGENT = TANGENT_TYPES.index("stepnext")
+TANGENT_CODES = {name: code for code, name in enumerate(TANGENT_TYPES)}
+
+
+def tangent_code(name):
+    """Returns the AnimCurve code for a keyTangent tangent type name."""
+    return TANGENT_CODES.get(name, 0)
+
+
+class AnimCurve(object):
+    """
+    In-memory anim curve.
+    Keys live in parallel buffers: times and values as float arrays, in/out
+    tangent types as byte codes (see TANGENT_TYPES) and in/out weights as floats.
+    Curves loaded with their tangent slopes (value per frame, see
+    load_anim_curves_bulk) are sampled as Maya's Hermite segments, others
+    linearly; timing edits drop the slopes, which only fit the loaded shape.
+    Timing operations edit the buffers only; commit_anim_curves() pushes the
+    difference from the loaded state back to Maya.
+    """
+
+    def __init__(self, name=None, plug=None, times=(), values=(), in_tangents=None,
+                 out_tangents=None, in_weights=None, out_weights=None, curve_type=None,
+                 in_slopes=None, out_slopes=None):
+        self.name = name
+        self.plug = plug
+        self.curve_type = curve_type
+        self.times = array("d", times)
+        self.values = array("d", values)
+        count = len(self.times)
+        self.in_tangents = array("B", [TANGENT_CODES.get(t, 0) for t in in_tangents] if in_tangents else [0] * count)
+        self.out_tangents = array("B", [TANGENT_CODES.get(t, 0) for t in out_tangents] if out_tangents else [0] * count)
+        self.in_weights = array("d", in_weights if in_weights else [1.0] * count)
+        self.out_weights = array("d", out_weights if out_weights else [1.0] * count)
+        self.in_slopes = array("d", in_slopes) if in_slopes is not None else None
+        self.out_slopes = array("d", out_slopes) if out_slopes is not None else None
+        self.mark_clean()
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        return f"AnimCurve({self.name or self.plug}, {len(self.times)} keys)"
+
+    def mark_clean(self):
+        """Remembers the current keys as the state loaded from the scene."""
+        self._loaded_times = array("d", self.times)
+        self._loaded_values = array("d", self.values)
+        self._loaded_tangents = (array("B", self.in_tangents), array("B", self.out_tangents))
+        # Values insert_keys() estimated; Maya works out the exact ones on insert
+        self._inserted_values = {}
+
+    def as_numpy(self):
+        """Returns (times, values) as NumPy views of the buffers."""
+        return np.frombuffer(self.times, dtype=float), np.frombuffer(self.values, dtype=float)
+
+    def sample(self, frames):
+        """
+        Evaluates the curve at every time of a NumPy array, following its
+        tangents when it has slopes (see sample_anim_curves).
+        """
+        return sample_anim_curves([self], np.asarray(frames, dtype=float))[0]
+
+    def find(self, time):
+        """Returns the index of the key at time, or None."""
+        index = bisect_left(self.times, time)
+        if index < len(self.times) and self.times[index] == time:
+            return index
+        return None
+
+    def value_at(self, time):
+        """
+        Evaluates the curve at time.
+        Stepped segments hold, everything else is interpolated linearly, which is
+        close enough for timing work. Maya does the exact evaluation on commit.
+        """
+        if not self.times:
+            return 0.0
+        index = bisect_right(self.times, time)
+        if index == 0:
+            return self.values[0]
+        if index == len(self.times):
+            return self.values[-1]
+        before = index - 1
+        if self.times[before] == time or self.out_tangents[before] == STEP_TANGENT:
+            return self.values[before]
+        t0, t1 = self.times[before], self.times[index]
+        v0, v1 = self.values[before], self.values[index]
+        return v0 + (v1 - v0) * (time - t0) / (t1 - t0)
+
+    def insert_keys(self, times):
+        """Adds keys at times that have none, keeping the curve's shape."""
+        new_times = (FrameSet(times) - FrameSet(self.times)).frames()
+        new_values = [self.value_at(t) for t in new_times]
+        for time, value in zip(new_times, new_values):
+            index = bisect_left(self.times, time)
+            self.times.insert(index, time)
+            self.values.insert(index, value)
+            self.in_tangents.insert(index, 0)
+            self.out_tangents.insert(index, 0)
+            self.in_weights.insert(index, 1.0)
+            self.out_weights.insert(index, 1.0)
+            self._inserted_values[time] = value
+        if new_times:
+            self.in_slopes = self.out_slopes = None
+        return len(new_times)
+
+    def remove_keys(self, times):
+        """Removes the keys at times. Returns how many were removed."""
+        remove = set(times)
+        keep = [i for i, t in enumerate(self.times) if t not in remove]
+        removed = len(self.times) - len(keep)
+        if removed:
+            for name in ("times", "values", "in_tangents", "out_tangents", "in_weights", "out_weights"):
+                buffer = getattr(self, name)
+                setattr(self, name, array(buffer.typecode, [buffer[i] for i in keep]))
+            self.in_slopes = self.out_slopes = None
+        return removed
+
+    def retime(self, key_times, start, end):
+        """
+        Makes the keys between start and end match key_times exactly: inserts
+        the missing ones and removes the rest. The batch driver's stepping
+        engine runs on it; the interactive operations plan the same edit per
+        plug with plan_plug_sync.
+        Returns (keys added, keys removed).
+        """
+        wanted = FrameSet(key_times).clip(start, end)
+        added = self.insert_keys(wanted)
+        lo = bisect_left(self.times, start)
+        hi = bisect_right(self.times, end)
+        removed = self.remove_keys([t for t in self.times[lo:hi] if t not in wanted])
+        return added, removed
+
+    def set_tangents(self, in_tangent=None, out_tangent=None, start=None, end=None):
+        """Sets the tangent types of the keys between start and end (all keys by default)."""
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        for index in range(lo, hi):
+            if in_tangent:
+                self.in_tangents[index] = tangent_code(in_tangent)
+            if out_tangent:
+                self.out_tangents[index] = tangent_code(out_tangent)
+
+    def diff(self):
+        """
+        Compares the keys with the loaded state.
+        Returns (added times, removed times, {(in, out) tangent names: [times]}).
+        """
+        loaded = set(self._loaded_times)
+        current = set(self.times)
+        added = sorted(current - loaded)
+        removed = sorted(loaded - current)
+        loaded_tangents = dict(zip(self._loaded_times, zip(*self._loaded_tangents)))
+        tangents = {}
+        for time, in_code, out_code in zip(self.times, self.in_tangents, self.out_tangents):
+            if loaded_tangents.get(time) != (in_code, out_code):
+                tangents.setdefault((TANGENT_TYPES[in_code], TANGENT_TYPES[out_code]), []).append(time)
+        return added, removed, tangents
+
+    def value_changes(self):
+        """
+        Returns {time: value} for the keys whose value was edited since load:
+        kept keys with a new value and added keys not holding the value
+        insert_keys() estimated for them.
+        """
+        loaded_values = dict(zip(self._loaded_times, self._loaded_values))
+        changes = {}
+        for time, value in zip(self.times, self.values):
+            loaded = loaded_values.get(time, self._inserted_values.get(time))
+            if loaded is None or loaded != value:
+                changes[time] = value
+        return changes
+
+
+def load_anim_curves(plugs, layer=None):
+    """
+    Maya adapter: reads the curves driving plugs into AnimCurve models.
+    Plugs without a curve are skipped.
+    """
+    curves = []
+    for plug in plugs:
+        curve = find_anim_curve(plug, layer)
+        if curve:
+            curves.append(read_anim_curve(curve, plug))
+    return curves
+
+
+def read_anim_curve(curve, plug=None):
+    """Maya adapter: reads one anim curve node into an AnimCurve model."""
+    keys = cmds.getAttr(f"{curve}.ktv[*]") or []
+    return AnimCurve(
+        name=curve,
+        plug=plug,
+        times=[k[0] for k in keys],
+        values=[k[1] for k in keys],
+        in_tangents=cmds.keyTangent(curve, q=True, inTangentType=True),
+        out_tangents=cmds.keyTangent(curve, q=True, outTangentType=True),
+        in_weights=cmds.keyTangent(curve, q=True, inWeight=True),
+        out_weights=cmds.keyTangent(curve, q=True, outWeight=True),
+    )
+
+
+def get_base_anim_curves(objects):
+    """
+    Returns the time-driven anim curves of the objects' base animation.
+    One connection query finds the curves driving them directly; only
+    objects keyed through anim layers or pairBlends are looked up plug by
+    plug on the root layer.
+    """
+    direct = cmds.listConnections(objects, source=True, destination=False,
+                                  skipConversionNodes=True, type="animCurve") or []
+    curves = list(dict.fromkeys(cmds.ls(direct, type=list(TIME_CURVE_TYPES)) or []))
+
+    blended = set()
+    for blend_type in ("animBlendNodeBase", "pairBlend"):
+        blend_pairs = cmds.listConnections(objects, source=True, destination=False, connections=True,
+                                           plugs=False, type=blend_type) or []
+        blended.update(plug.split(".", 1)[0] for plug in blend_pairs[0::2])
+    if blended:
+        root = cmds.animLayer(q=True, root=True)
+        for plug in cmds.listAnimatable(sorted(blended)) or []:
+            curve = find_anim_curve(plug, root)
+            if curve and curve not in curves:
+                curves.append(curve)
+    return curves
+
+
+def tangent_slopes(x, y):
+    """
+    Converts keyTangent x/y tangent components, x in seconds, to slopes in
+    value per frame. Vertical tangents get a slope of 0.
+    """
+    x = np.asarray(x, dtype=float) * mel.eval("currentTimeUnitToFPS")
+    y = np.asarray(y, dtype=float)
+    return np.divide(y, x, out=np.zeros(len(x)), where=x != 0).tolist()
+
+
+def load_anim_curves_bulk(curves):
+    """
+    Maya adapter: reads anim curve nodes into AnimCurve models with their
+    tangent slopes, in value per frame, for sample_anim_curves().
+    Keys and tangents of all curves come from a fixed number of batched
+    queries and the key counts from the API, instead of several queries per
+    curve as in read_anim_curve(); weights aren't read.
+    """
+    if not curves:
+        return []
+    selection = om.MSelectionList()
+    for curve in curves:
+        selection.add(curve)
+    counts = [oma.MFnAnimCurve(selection.getDependNode(index)).numKeys for index in range(len(curves))]
+
+    times = cmds.keyframe(curves, q=True, timeChange=True) or []
+    values = cmds.keyframe(curves, q=True, valueChange=True) or []
+    in_types = cmds.keyTangent(curves, q=True, inTangentType=True) or []
+    out_types = cmds.keyTangent(curves, q=True, outTangentType=True) or []
+    in_x = cmds.keyTangent(curves, q=True, ix=True) or []
+    in_y = cmds.keyTangent(curves, q=True, iy=True) or []
+    out_x = cmds.keyTangent(curves, q=True, ox=True) or []
+    out_y = cmds.keyTangent(curves, q=True, oy=True) or []
+    if any(len(column) != sum(counts) for column in (times, values, in_types, out_types, in_x, in_y, out_x, out_y)):
+        # Not laid out curve by curve as expected; read them one at a time
+        return [read_anim_curve(curve) for curve in curves]
+
+    in_slopes = tangent_slopes(in_x, in_y)
+    out_slopes = tangent_slopes(out_x, out_y)
+
+    models = []
+    first = 0
+    for curve, count in zip(curves, counts):
+        keys = slice(first, first + count)
+        models.append(AnimCurve(
+            name=curve,
+            times=times[keys],
+            values=values[keys],
+            in_tangents=in_types[keys],
+            out_tangents=out_types[keys],
+            in_slopes=in_slopes[keys],
+            out_slopes=out_slopes[keys],
+        ))
+        first += count
+    return models
+
+
+def restore_anim_curves(snapshot, name="restore_anim_curves"):
+    """
+    Puts curves back to the keys of AnimCurve models read earlier, through a
+    KeyEditPlan: keys added since are cut, removed ones are inserted again
+    with their values and tangent types. Used to roll back a ChunkedTask
+    without undoing edits made in between. Returns the executed plan.
+    """
+    plan = KeyEditPlan(name)
+    for model in snapshot:
+        if not cmds.objExists(model.name):
+            continue
+        current = cmds.keyframe(model.name, q=True, timeChange=True) or []
+        tangents = {}
+        for time, in_code, out_code in zip(model.times, model.in_tangents, model.out_tangents):
+            tangents.setdefault((TANGENT_TYPES[in_code], TANGENT_TYPES[out_code]), []).append(time)
+        plan.add(model.name, list(model.times), current, tangents=tangents,
+                 values=dict(zip(model.times, model.values)), target=model.name)
+    plan.execute()
+    return plan
+
+
+def commit_anim_curves(curves):
+    """
+    Maya adapter: pushes each model's timing, value and tangent changes to its
+    curve. New keys are inserted so Maya keeps the curve shape, removed keys
+    are cut in merged intervals, edited values are set after the inserts, and
+    curves with the same edits share one call each.
+    Returns the executed KeyEditPlan.
+    """
+    plan = KeyEditPlan.from_curves(curves)
+    plan.execute()
+    for curve in curves:
+        curve.mark_clean()
+    return plan
+
+
+# Maya's animCurve tangent type enum values, as written to .kit/.kot in .ma files
+MA_TANGENT_TYPES = {1: "fixed", 2: "linear", 3: "flat", 4: "spline", 5: "step", 6: "slow",
+                    7: "fast", 8: "clamped", 9: "plateau", 10: "stepnext", 18: "auto"}
+
+MA_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s;]+')
+MA_QUOTE = re.compile(r'\\.|"')
+MA_ARRAY_ATTR = re.compile(r'^\.(\w+)\[(\d+)(?::(\d+))?\]$')
+MA_PLACEHOLDER = re.compile(r'^(.+)\.(?:placeHolderList|phl)\[(\d+)\]$')
+
+
+def _is_ma_flag(token):
+    """True for MEL flags like -s or -type, but not negative numbers."""
+    return len(token) > 1 and token[0] == "-" and token[1].isalpha()
+
+
+def tokenize_ma_statement(text):
+    """Splits one .ma statement into tokens, quoted strings kept whole without their quotes."""
+    return [token[1:-1] if token.startswith('"') else token for token in MA_TOKEN.findall(text)]
+
+
+def _ma_line_state(line, in_string):
+    """Returns whether a .ma line ends inside a quoted string."""
+    if '"' not in line:
+        return in_string
+    for match in MA_QUOTE.finditer(line):
+        if match.group() == '"':
+            in_string = not in_string
+    return in_string
+
+
+def _apply_ma_curve_attr(curve, attr, values):
+    """Stores one setAttr of an animCurve node on its AnimCurve."""
+    if attr == ".tan":
+        curve.default_tangent = MA_TANGENT_TYPES.get(int(values[0]), "auto")
         return
-    rootLayer = cmds.animLayer(q=True, root=True)
-    animLayers = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or []
-    min_time = cmds.playbackOptions(q=True, min=True)
-    max_time = cmds.playbackOptions(q=True, max=True)
-    sel = cmds.ls(sl=True)
+    match = MA_ARRAY_ATTR.match(attr)
+    if not match:
+        return
+    name, first = match.group(1), int(match.group(2))
+    if name == "ktv":
+        for index in range(0, len(values) - 1, 2):
+            curve.times.append(float(values[index]))
+            curve.values.append(float(values[index + 1]))
+    elif name in ("kit", "kot", "kiw", "kow"):
+        curve.ma_arrays.setdefault(name, {}).update(
+            (first + i, v) for i, v in enumerate(values))
+
+
+def _finish_ma_curve(curve):
+    """Turns the raw tangent arrays read from the file into the AnimCurve buffers."""
+    count = len(curve.times)
+    default = tangent_code(getattr(curve, "default_tangent", "auto"))
+    arrays = curve.__dict__.pop("ma_arrays", {})
+    for name, buffer in (("kit", curve.in_tangents), ("kot", curve.out_tangents)):
+        raw = arrays.get(name, {})
+        buffer.extend(tangent_code(MA_TANGENT_TYPES.get(int(raw[i]), "auto")) if i in raw else default
+                      for i in range(count))
+    for name, buffer in (("kiw", curve.in_weights), ("kow", curve.out_weights)):
+        raw = arrays.get(name, {})
+        buffer.extend(float(raw.get(i, 1.0)) for i in range(count))
+    curve.mark_clean()
+
+
+def read_ma_anim_curves(path):
+    """
+    Streams a Maya ASCII file and returns {curve name: AnimCurve} for every
+    animCurve node, without Maya.
+    The file is read line by line and only animCurve statements and connections
+    are kept, so memory follows the amount of animation rather than file size.
+    Each curve's plug is its connectAttr destination. Connections into reference
+    placeholders are resolved to the referenced plug.
+    """
+    curves = {}
+    placeholders = {}
+    connections = []
+
+    current_curve = None
+    current_type = None
+    statement = []
+    keep = False
+    in_string = False
+    last_quoted = None
+
+    with open(path, "r", encoding="latin-1") as f:
+        for line in f:
+            if not statement and not in_string:
+                stripped = line.lstrip()
+                keyword = stripped.split(None, 1)[0] if stripped else ""
+                if keyword == "createNode":
+                    tokens = tokenize_ma_statement(stripped)
+                    current_type = tokens[1]
+                    current_curve = None
+                    if current_type.startswith("animCurve") and "-n" in tokens:
+                        name = tokens[tokens.index("-n") + 1]
+                        current_curve = AnimCurve(name=name, curve_type=current_type)
+                        current_curve.ma_arrays = {}
+                        curves[name] = current_curve
+                elif keyword and not line[:1].isspace():
+                    # Unindented statements end the current node's block
+                    current_type = None
+                    current_curve = None
+                keep = keyword == "connectAttr" or (keyword == "setAttr" and current_curve is not None)
+
+            if keep:
+                statement.append(line)
+            elif current_type == "reference" and '"' in line:
+                # Reference edits pair a plug with the placeholder standing in for it
+                for token in re.findall(r'"([^"]*)"', line):
+                    match = MA_PLACEHOLDER.match(token)
+                    if match and last_quoted:
+                        placeholders[(match.group(1), int(match.group(2)))] = last_quoted
+                    last_quoted = token
+
+            in_string = _ma_line_state(line, in_string)
+            if in_string or not line.rstrip().endswith(";"):
+                continue
+
+            if keep:
+                tokens = tokenize_ma_statement("".join(statement))
+                if tokens[0] == "connectAttr":
+                    plugs = [t for t in tokens[1:] if not _is_ma_flag(t)]
+                    if len(plugs) >= 2:
+                        connections.append((plugs[0], plugs[1]))
+                else:
+                    attr_index = next((i for i, t in enumerate(tokens) if t.startswith(".")), None)
+                    if attr_index is not None:
+                        values = [t for t in tokens[attr_index + 1:] if not _is_ma_flag(t)]
+                        _apply_ma_curve_attr(current_curve, tokens[attr_index], values)
+            statement = []
+            keep = False
+
+    for curve in curves.values():
+        _finish_ma_curve(curve)
+
+    for source, destination in connections:
+        node, _, attr = source.partition(".")
+        curve = curves.get(node)
+        if curve is None or attr not in ("o", "output"):
+            continue
+        match = MA_PLACEHOLDER.match(destination)
+        if match:
+            destination = placeholders.get((match.group(1), int(match.group(2))), destination)
+        if curve.plug is None:
+            curve.plug = destination
+
+    return curves
+
+
+def key_density_report(curves, start=None, end=None):
+    """
+    Summarises key density for a set of AnimCurves, optionally inside start-end.
+    Returns a dict with totals, keys per curve type and the number of static curves.
+    """
+    report = {"curves": 0, "keys": 0, "static_curves": 0, "keys_by_type": {}, "densest": None}
+    densest = 0
+    for curve in curves:
+        lo = 0 if start is None else bisect_left(curve.times, start)
+        hi = len(curve.times) if end is None else bisect_right(curve.times, end)
+        count = hi - lo
+        report["curves"] += 1
+        report["keys"] += count
+        curve_type = curve.curve_type or "animCurve"
+        report["keys_by_type"][curve_type] = report["keys_by_type"].get(curve_type, 0) + count
+        if count and max(curve.values[lo:hi]) == min(curve.values[lo:hi]):
+            report["static_curves"] += 1
+        if count > densest:
+            densest = count
+            report["densest"] = curve.plug or curve.name
+    report["keys_per_curve"] = report["keys"] / report["curves"] if report["curves"] else 0.0
+    return report
+
+
+def get_layer_plugs(layer, nodes):
+    """Returns the plugs of the anim layer that belong to the given nodes."""
+    node_names = set(cmds.ls(nodes) + cmds.ls(nodes, long=True))
+    layer_attrs = cmds.animLayer(layer, q=True, attribute=True) or []
+    return [plug for plug in layer_attrs if plug.split(".", 1)[0] in node_names]
+
+
+def sample_plug_values(plugs, times):
+    """
+    Reads each plug's value at every time without moving the current time.
+    Returns {plug: [values]} in the order of times.
+    """
+    return dict((plug, [cmds.getAttr(plug, time=t) for t in times]) for plug in plugs)
+
+
+# Per-layer record of what convert_to_twos baked, used to re-bake only edits
+BAKE_STATE_ATTR = "twosifyBakeState"
+BAKE_STATE_VERSION = 1
+# Source curves are hashed in blocks of this many frames
+BAKE_BLOCK_FRAMES = 100
+
 
+def read_bake_state(layer):
+    """Returns the bake state stored on the anim layer, or an empty one."""
+    empty = {"version": BAKE_STATE_VERSION, "block": BAKE_BLOCK_FRAMES, "key_sets": {}, "plugs": {}}
+    if not cmds.attributeQuery(BAKE_STATE_ATTR, node=layer, exists=True):
+        return empty
     try:
-        cmds.selectKey(cl=True)
-    except:
-        pass
+        state = json.loads(cmds.getAttr(f"{layer}.{BAKE_STATE_ATTR}") or "{}")
+    except ValueError:
+        return empty
+    if state.get("version") != BAKE_STATE_VERSION or state.get("block") != BAKE_BLOCK_FRAMES:
+        return empty
+    return state
 
-    if sel:
 
-        # Get the timerange selected
-        playBackSlider = mel.eval('$animBot_playBackSliderPython=$gPlayBackSlider')
-        timeRange = cmds.timeControl(playBackSlider, query=True, rangeArray=True)
-        StartRange = timeRange[0]
-        EndRange = timeRange[1] - 1
-        StartRange = int(StartRange)
-        EndRange = int(EndRange)
-        
-        
-        if (EndRange - StartRange == 0):
-        
-            if animLayers[0] == rootLayer:
-                cmds.confirmDialog(title='Error', message='Please make sure to have an animLayer selected!', button="Got it!")
-                
-            else:    
-                cmds.animLayer(animLayerName, edit=True, override=True)  
-                cmds.animLayer(animLayerName, e=True, weight=0)
-                curTime = cmds.currentTime(q=True)
-                keys = cmds.keyframe(q=True, t=(min_time, max_time))
-
-                if keys:
-                    cmds.waitCursor(state=True)
-                    keys = list(set(keys))
-                    keys.sort()
-                
-                    for key in keys:
-                        cmds.currentTime(key)
-                        cmds.setKeyframe()
-                    
-                    cmds.currentTime(curTime)
-                    cmds.refresh(suspend=False)
-                    
-                    cmds.animLayer(animLayerName, e=True, weight=1)
-                    cmds.keyTangent(ott="step", itt="auto")
-                    
-                else:
-                    cmds.confirmDialog(title='Error', message='Please set some keys!', button="Got it!")
-                            
+def write_bake_state(layer, state):
+    """Stores the bake state on the anim layer, dropping unused key sets."""
+    if not cmds.attributeQuery(BAKE_STATE_ATTR, node=layer, exists=True):
+        cmds.addAttr(layer, longName=BAKE_STATE_ATTR, dataType="string")
+    used = set(entry["keys"] for entry in state["plugs"].values())
+    state["key_sets"] = dict((k, v) for k, v in state["key_sets"].items() if k in used)
+    cmds.setAttr(f"{layer}.{BAKE_STATE_ATTR}", json.dumps(state, separators=(",", ":")), type="string")
+
+
+def clear_bake_state(layer):
+    """Forgets what was baked, so the next convert_to_twos re-bakes everything."""
+    if cmds.attributeQuery(BAKE_STATE_ATTR, node=layer, exists=True):
+        cmds.setAttr(f"{layer}.{BAKE_STATE_ATTR}", "", type="string")
+
+
+def get_source_curves(plugs, layer):
+    """
+    Returns {plug: [curves]} with the anim curves feeding each plug from every
+    anim layer except layer, base animation included.
+    """
+    root = cmds.animLayer(q=True, root=True)
+    layers = [other for other in cmds.ls(type="animLayer") or [] if other != layer]
+    members = {}
+    for other in layers:
+        members[other] = None if other == root else set(cmds.animLayer(other, q=True, attribute=True) or [])
+
+    sources = {}
+    for plug in plugs:
+        curves = []
+        for other in layers:
+            if members[other] is not None and plug not in members[other]:
+                continue
+            curve = find_anim_curve(plug, other)
+            if curve and curve not in curves:
+                curves.append(curve)
+        sources[plug] = curves
+    return sources
+
+
+def hash_curve_blocks(rows, block=BAKE_BLOCK_FRAMES):
+    """
+    Hashes key rows (time first, then any key data) per block of frames.
+    Returns {block index as str: crc32}.
+    """
+    blocks = {}
+    for row in rows:
+        index = str(int(math.floor(row[0] / block)))
+        blocks[index] = zlib.crc32(repr(row).encode(), blocks.get(index, 0))
+    return blocks
+
+
+def read_curve_signature(curve):
+    """
+    Content hash of an anim curve: its settings hash, its block hashes and its
+    key times. The key times are used to widen dirty blocks over the keys
+    whose tangents an edit can change.
+    """
+    keys = cmds.getAttr(f"{curve}.ktv[*]") or []
+    columns = [
+        cmds.keyTangent(curve, q=True, inTangentType=True) or [],
+        cmds.keyTangent(curve, q=True, outTangentType=True) or [],
+        cmds.keyTangent(curve, q=True, inAngle=True) or [],
+        cmds.keyTangent(curve, q=True, outAngle=True) or [],
+        cmds.keyTangent(curve, q=True, inWeight=True) or [],
+        cmds.keyTangent(curve, q=True, outWeight=True) or [],
+    ]
+    rows = [tuple(key) + tuple(column[i] for column in columns if i < len(column)) for i, key in enumerate(keys)]
+    settings = (cmds.setInfinity(curve, q=True, preInfinite=True),
+                cmds.setInfinity(curve, q=True, postInfinite=True),
+                cmds.keyTangent(curve, q=True, weightedTangents=True))
+    return {"settings": zlib.crc32(repr(settings).encode()),
+            "blocks": hash_curve_blocks(rows),
+            "times": [key[0] for key in keys]}
+
+
+def dirty_curve_spans(previous, current, block=BAKE_BLOCK_FRAMES, neighbours=2):
+    """
+    Frame spans where a source curve may evaluate differently than when it was
+    baked. previous is the stored signature (None if unknown), current the new
+    one. Each changed block is widened to the neighbours-th key on either side,
+    since moving a key changes the auto tangents of the keys next to it.
+    Returns a list of (start, end), with (-inf, inf) for a full re-bake.
+    """
+    everything = [(float("-inf"), float("inf"))]
+    if previous is None or previous["settings"] != current["settings"]:
+        return everything
+
+    old_blocks = previous["blocks"]
+    new_blocks = current["blocks"]
+    changed = [int(index) for index in set(old_blocks) | set(new_blocks)
+               if old_blocks.get(index) != new_blocks.get(index)]
+    if not changed:
+        return []
+
+    times = current["times"]
+    if not times:
+        return everything
+    spans = []
+    for index in sorted(changed):
+        lo = bisect_left(times, index * block) - neighbours
+        hi = bisect_right(times, (index + 1) * block) + neighbours - 1
+        start = times[lo] if lo >= 0 else float("-inf")
+        end = times[hi] if hi < len(times) else float("inf")
+        spans.append((start, end))
+    return merge_spans(spans)
+
+
+def merge_spans(spans):
+    """Merges overlapping (start, end) spans into a sorted list."""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
         else:
-        
-            if animLayers[0] == rootLayer:
-                cmds.confirmDialog(title='Error', message='Please make sure to have an animLayer selected!', button="Got it!")
-                
-            else:    
-                cmds.animLayer(animLayerName, edit=True, override=True)  
-                cmds.animLayer(animLayerName, e=True, weight=0)
-                curTime = cmds.currentTime(q=True)
-                keys = cmds.keyframe(q=True, t=(StartRange,EndRange))
-                
-                if keys:
-                    keys = list(set(keys))
-                    keys.sort()
-                
-                    for key in keys:
-                        cmds.currentTime(key)
-                        cmds.setKeyframe()
-                    
-                    cmds.currentTime(curTime)
-                    cmds.refresh(suspend=False)
-                    
-                    cmds.animLayer(animLayerName, e=True, weight=1)
-                    cmds.keyTangent(ott="step", itt="step")
-                    
-                else:
-                    cmds.confirmDialog(title='Error', message='Please set some keys!', button="Got it!")
-                            
-        
-        cmds.waitCursor(state=False)
+            merged.append((start, end))
+    return merged
+
+
+def plan_incremental_bake(state, plug_sources, signatures, key_times, key_range, in_tangent, layer_curves):
+    """
+    Works out what convert_to_twos has to redo for each plug since the bake
+    recorded in state.
+    plug_sources is {plug: [source curves]}, signatures {curve: signature},
+    layer_curves the set of plugs that already have a curve on the layer.
+    Returns ({plug: (times to bake, times to cut)}, new state). Plugs that are
+    up to date are left out.
+    """
+    key_times = sorted(key_times)
+    key_set_id = str(zlib.crc32(repr(key_times).encode()))
+    # key_range is (start, end) or a FrameSet of several ranges
+    if isinstance(key_range, FrameSet):
+        range_record = [list(span) for span in key_range.spans()]
+    else:
+        range_record = [[float(key_range[0]), float(key_range[1])]]
+    new_state = {"version": BAKE_STATE_VERSION, "block": BAKE_BLOCK_FRAMES,
+                 "key_sets": dict(state["key_sets"]), "plugs": dict(state["plugs"])}
+    new_state["key_sets"][key_set_id] = key_times
+    current_keys = FrameSet(key_times)
+
+    work = {}
+    for plug, curves in plug_sources.items():
+        previous = state["plugs"].get(plug)
+        entry = {"range": range_record, "in_tangent": in_tangent, "keys": key_set_id,
+                 "sources": dict((curve, signatures[curve]) for curve in curves)}
+        new_state["plugs"][plug] = entry
+
+        if (previous is None or plug not in layer_curves or previous["range"] != range_record
+                or previous["in_tangent"] != in_tangent or previous["keys"] not in state["key_sets"]
+                or set(previous["sources"]) != set(curves)):
+            work[plug] = (key_times, [])
+            continue
+
+        old_keys = FrameSet(state["key_sets"][previous["keys"]])
+        spans = []
+        for curve in curves:
+            spans.extend(dirty_curve_spans(previous["sources"][curve], signatures[curve]))
+        spans = merge_spans(spans)
+
+        bake = set(current_keys - old_keys)
+        for start, end in spans:
+            bake.update(key_times[bisect_left(key_times, start):bisect_right(key_times, end)])
+        cut = (old_keys - current_keys).frames()
+        if bake or cut:
+            work[plug] = (sorted(bake), cut)
+
+    # Signatures carry key times only for widening spans, they are not stored
+    for entry in new_state["plugs"].values():
+        for curve, signature in entry["sources"].items():
+            if "times" in signature:
+                entry["sources"][curve] = {"settings": signature["settings"], "blocks": signature["blocks"]}
+    return work, new_state
+
+
+def plan_layer_bake(layer, plugs, key_times, key_range, in_tangent="auto", incremental=True):
+    """
+    Maya adapter for plan_incremental_bake: reads the stored state and the
+    source curve signatures. With incremental=False every plug is re-baked.
+    Returns ({plug: (times to bake, times to cut)}, new state).
+    """
+    if incremental:
+        state = read_bake_state(layer)
+    else:
+        state = {"version": BAKE_STATE_VERSION, "block": BAKE_BLOCK_FRAMES, "key_sets": {}, "plugs": {}}
+    plug_sources = get_source_curves(plugs, layer)
+    signatures = {}
+    for curves in plug_sources.values():
+        for curve in curves:
+            if curve not in signatures:
+                signatures[curve] = read_curve_signature(curve)
+    layer_curves = set(plug for plug in plugs if find_anim_curve(plug, layer))
+    return plan_incremental_bake(state, plug_sources, signatures, key_times, key_range, in_tangent, layer_curves)
+
+
+def plan_layer_bake_edits(layer, work, in_tangent="auto"):
+    """
+    The keys a layer bake sets and cuts, work as returned by plan_layer_bake,
+    as a KeyEditPlan on the layer curves for previewing. Values are left out:
+    they are only sampled once the layer weight is down, and the bake writes
+    them per curve with one setAttr (see bake_plug_keys), creating the layer
+    curves it needs, so it does not execute this plan.
+    """
+    plan = KeyEditPlan("convert_to_twos")
+    for plug, (times, cut) in work.items():
+        curve = find_anim_curve(plug, layer)
+        current = (cmds.keyframe(curve, q=True, timeChange=True) or []) if curve else []
+        final_times = sorted(set(current).difference(cut).union(times))
+        plan.add(plug, final_times, current, tangents={(in_tangent, "step"): times}, target=curve or plug)
+    return plan
+
+
+def bake_plug_keys(layer, plug, times, cut, values):
+    """
+    Writes the stepped keys of one plug on the layer and removes the keys at
+    cut that are no longer baked. Returns the layer curve.
+    """
+    curve = write_plug_keys(plug, times, values, layer=layer) if times else find_anim_curve(plug, layer)
+    if curve and cut:
+        cmds.cutKey(curve, time=[(t, t) for t in cut], option="keys")
+    return curve
+
+
+def set_step_tangents(baked, in_tangent="auto"):
+    """
+    Sets step out-tangents on the baked keys, one keyTangent call per frame
+    span shared by several curves. baked is {curve: times written}.
+    """
+    spans = {}
+    for curve, times in baked.items():
+        if times:
+            spans.setdefault((min(times), max(times)), []).append(curve)
+    for span, curves in spans.items():
+        cmds.keyTangent(curves, time=span, itt=in_tangent, ott="step")
+
+
+def bake_stepped_layer(layer, nodes, key_times, in_tangent="auto", key_range=None, incremental=True):
+    """
+    Timeless bake for convert_to_twos.
+    Samples the layer plugs of nodes at key_times with time-based getAttr, then
+    writes all the stepped keys per curve in one go and sets step tangents.
+    The layer weight must be 0 while sampling so the values come from below it.
+    With incremental=True only the frames whose source curves changed since
+    the last bake are sampled again (see plan_incremental_bake).
+    Returns the list of curves written.
+    """
+    plugs = get_layer_plugs(layer, nodes)
+    if key_range is None:
+        key_range = (min(key_times), max(key_times))
+    work, state = plan_layer_bake(layer, plugs, key_times, key_range, in_tangent, incremental)
+
+    baked = {}
+    for plug, (times, cut) in work.items():
+        values = sample_plug_values([plug], times)[plug]
+        curve = bake_plug_keys(layer, plug, times, cut, values)
+        if curve:
+            baked[curve] = times
+    set_step_tangents(baked, in_tangent)
+    write_bake_state(layer, state)
+    print(f"{layer}: re-baked {len(work)} of {len(plugs)} plugs, "
+          f"{sum(len(times) for times, _ in work.values())} keys sampled")
+    return list(baked)
+
+
+@twosify_operation("convert_to_twos")
+def bake_layer_keys(layer, nodes, keys, in_tangent="auto", engine="timeless", key_range=None, incremental=True):
+    """
+    Bakes keys of nodes onto the override anim layer as stepped keys.
+    The layer weight is 0 while baking and set back to 1 afterwards.
+    """
+    cmds.animLayer(layer, edit=True, override=True)
+    cmds.animLayer(layer, e=True, weight=0)
+    try:
+        if engine == "timeless":
+            bake_stepped_layer(layer, nodes, keys, in_tangent=in_tangent, key_range=key_range,
+                               incremental=incremental)
+        else:
+            curTime = cmds.currentTime(q=True)
+            for key in keys:
+                cmds.currentTime(key)
+                cmds.setKeyframe()
+            cmds.currentTime(curTime)
+            cmds.keyTangent(ott="step", itt=in_tangent)
+            clear_bake_state(layer)
+    finally:
+        cmds.animLayer(layer, e=True, weight=1)
+
+
+def bake_layer_keys_task(layer, nodes, keys, in_tangent="auto", queue=None, key_range=None, incremental=True):
+    """
+    Chunked version of the timeless bake_layer_keys, baking a few plugs per
+    idle callback. Only plugs with dirty frames are queued.
+    A cancelled or failed bake restores the layer curves, weight, mode and
+    bake state recorded before it started (see snapshot_layer_bake).
+    Returns the started ChunkedTask.
+    """
+    plugs = get_layer_plugs(layer, nodes)
+    if key_range is None:
+        key_range = (min(keys), max(keys))
+    work, state = plan_layer_bake(layer, plugs, keys, key_range, in_tangent, incremental)
+    restore = snapshot_layer_bake(layer, list(work))
+    baked = {}
+
+    def begin():
+        cmds.animLayer(layer, edit=True, override=True)
+        cmds.animLayer(layer, e=True, weight=0)
+
+    def bake(chunk):
+        for plug in chunk:
+            times, cut = work[plug]
+            values = sample_plug_values([plug], times)[plug]
+            curve = bake_plug_keys(layer, plug, times, cut, values)
+            if curve:
+                baked[curve] = times
+
+    def finish():
+        set_step_tangents(baked, in_tangent)
+        write_bake_state(layer, state)
+        cmds.animLayer(layer, e=True, weight=1)
+
+    return ChunkedTask("Update Layer", list(work), bake, on_start=begin, on_done=finish, queue=queue,
+                       rollback=restore).start()
+
+
+def snapshot_layer_bake(layer, plugs):
+    """
+    Records what a bake of plugs on the layer can change: their layer curves,
+    the layer weight and override mode and the stored bake state.
+    Returns a callable that puts them back, cutting the layer curves the
+    bake created, for ChunkedTask rollback.
+    """
+    curves = dict((plug, find_anim_curve(plug, layer)) for plug in plugs)
+    snapshot = [read_anim_curve(curve, plug) for plug, curve in curves.items() if curve]
+    unkeyed = [plug for plug, curve in curves.items() if not curve]
+    weight = cmds.animLayer(layer, q=True, weight=True)
+    override = cmds.animLayer(layer, q=True, override=True)
+    state = None
+    if cmds.attributeQuery(BAKE_STATE_ATTR, node=layer, exists=True):
+        state = cmds.getAttr(f"{layer}.{BAKE_STATE_ATTR}")
+
+    def restore():
+        restore_anim_curves(snapshot, "Update Layer rollback")
+        created = [curve for curve in (find_anim_curve(plug, layer) for plug in unkeyed) if curve]
+        if created:
+            cmds.cutKey(created, clear=True)
+        cmds.animLayer(layer, edit=True, override=override)
+        cmds.animLayer(layer, edit=True, weight=weight)
+        if state is not None:
+            cmds.setAttr(f"{layer}.{BAKE_STATE_ATTR}", state, type="string")
+        else:
+            clear_bake_state(layer)
+    return restore
+
+
+def plan_held_key_removal(curves, tolerance=1e-5):
+    """
+    Finds the keys of stepped AnimCurve models that only repeat the value
+    already held: a key can go when it and the key before it both have step
+    out-tangents and its value is within tolerance of the last key kept.
+    The curves' evaluated result stays the same, within tolerance.
+    All curves are analysed together as one concatenated NumPy array.
+    Returns {curve index: [times to remove]}.
+    """
+    lengths = [len(curve) for curve in curves]
+    total = sum(lengths)
+    if not total:
+        return {}
+    values = np.concatenate([np.frombuffer(curve.values, dtype=float) for curve in curves])
+    stepped = np.concatenate([np.frombuffer(curve.out_tangents, dtype=np.uint8) for curve in curves]) == STEP_TANGENT
+    starts = np.cumsum([0] + lengths[:-1])
+
+    drop = np.zeros(total, dtype=bool)
+    drop[1:] = stepped[1:] & stepped[:-1] & (np.abs(np.diff(values)) <= tolerance)
+    # Empty curves at the end start past the last key
+    drop[starts[starts < total]] = False
+
+    # Small steps add up, so compare with the held value and keep the keys that drift too far
+    indices = np.arange(total)
+    while True:
+        held = np.maximum.accumulate(np.where(drop, 0, indices))
+        drifted = drop & (np.abs(values - values[held]) > tolerance)
+        if not drifted.any():
+            break
+        drop &= ~drifted
+
+    plan = {}
+    for index, start in enumerate(starts):
+        removed = np.flatnonzero(drop[start:start + lengths[index]])
+        if len(removed):
+            plan[index] = [curves[index].times[i] for i in removed]
+    return plan
+
+
+@twosify_operation("reduce_held_keys")
+def reduce_held_keys(layer=None, nodes=None, tolerance=1e-5, dry_run=False):
+    """
+    Removes the redundant held keys from the stepped curves of the anim layer
+    (the selected one by default) for nodes (the selection by default).
+    Returns the number of keys removed, or the KeyEditPlan with dry_run=True.
+    """
+    if np is None:
+        cmds.warning("Removing held keys needs NumPy.")
+        return 0
+    if layer is None:
+        layer = (cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or [None])[0]
+    if nodes is None:
+        nodes = cmds.ls(sl=True)
+    if not layer or not nodes:
+        cmds.warning("Please select an animLayer and some objects.")
+        return 0
+
+    curves = load_anim_curves(get_layer_plugs(layer, nodes), layer=layer)
+    plan = plan_held_key_removal(curves, tolerance)
+    for index, times in plan.items():
+        curves[index].remove_keys(times)
+    if dry_run:
+        edit_plan = KeyEditPlan.from_curves([curves[index] for index in plan], "reduce_held_keys")
+        edit_plan.report()
+        return edit_plan
+    commit_anim_curves([curves[index] for index in plan])
+
+    removed = sum(len(times) for times in plan.values())
+    total = sum(len(curve) for curve in curves) + removed
+    print(f"{layer}: removed {removed} of {total} keys on {len(plan)} of {len(curves)} curves")
+    show_feedback_message(f"Removed {removed} held keys")
+    return removed
+
+
+def get_bake_ranges(ranges=None):
+    """
+    Frame ranges convert_to_twos works on, as (FrameSet, in-tangent type).
+    Explicit ranges, e.g. shot sub-ranges, and a time slider selection are
+    fully stepped; the whole timeline keeps auto in-tangents.
+    """
+    if ranges:
+        return FrameSet.from_ranges(ranges), "step"
+
+    # Get the timerange selected
+    playBackSlider = mel.eval('$animBot_playBackSliderPython=$gPlayBackSlider')
+    timeRange = cmds.timeControl(playBackSlider, query=True, rangeArray=True)
+    StartRange = int(timeRange[0])
+    EndRange = int(timeRange[1] - 1)
+    if EndRange > StartRange:
+        return FrameSet.from_ranges([(StartRange, EndRange)]), "step"
+    return FrameSet.from_ranges([get_playback_range()]), "auto"
+
+
+def convert_to_twos(engine="timeless", chunked=False, queue=None, incremental=True, ranges=None,
+                    dry_run=False):
+    """
+    Bakes the selection's keys onto the selected anim layer as stepped keys.
+    engine="timeless" samples values without changing the current time,
+    engine="timeline" steps the timeline and keys each frame.
+    With chunked=True the timeless bake runs as a ChunkedTask, which is returned.
+    With incremental=True the timeless bake only redoes the frames whose source
+    curves changed since the last run; incremental=False re-bakes everything.
+    ranges is an optional list of (start, end) frame ranges to bake instead of
+    the time slider selection or the timeline.
+    With dry_run=True nothing is baked; the keys to set and cut are reported
+    and returned as a KeyEditPlan (see plan_layer_bake_edits).
+    """
+
+    animLayerName = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or []
+    if animLayerName:
+        animLayerName = animLayerName[0]
     else:
+        return
+    rootLayer = cmds.animLayer(q=True, root=True)
+    animLayers = cmds.treeView("AnimLayerTabanimLayerEditor", q=True, selectItem=True) or []
+    sel = cmds.ls(sl=True)
+
+    try:
+        cmds.selectKey(cl=True)
+    except:
+        pass
+
+    if not sel:
         cmds.confirmDialog(title='Error', message='Please select something!', button="Got it!")
+        return
+
+    if animLayers[0] == rootLayer:
+        cmds.confirmDialog(title='Error', message='Please make sure to have an animLayer selected!', button="Got it!")
+        return
+
+    key_range, in_tangent = get_bake_ranges(ranges)
+    keys = FrameSet()
+    for span in key_range.spans():
+        keys = keys | FrameSet(cmds.keyframe(q=True, t=span) or [])
+    if not keys:
+        cmds.confirmDialog(title='Error', message='Please set some keys!', button="Got it!")
+        return
+
+    if dry_run:
+        plugs = get_layer_plugs(animLayerName, sel)
+        work, _ = plan_layer_bake(animLayerName, plugs, keys.frames(), key_range, in_tangent,
+                                  incremental and engine == "timeless")
+        plan = plan_layer_bake_edits(animLayerName, work, in_tangent)
+        plan.report()
+        return plan
+
+    if chunked and engine == "timeless":
+        return bake_layer_keys_task(animLayerName, sel, keys.frames(), in_tangent=in_tangent, queue=queue,
+                                    key_range=key_range, incremental=incremental)
+    bake_layer_keys(animLayerName, sel, keys.frames(), in_tangent=in_tangent, engine=engine,
+                    key_range=key_range, incremental=incremental)
 
 
 def simple_smart_constraint(ctrl=None, object=None, connect_to_attach_cam=False, attach_cam_object=None):
@@ -941,6 +3484,72 @@ def smart_constraint_create_attach_cam(ctrl=None, object=None):
     return constraints
 
 
+class NameAllocator(object):
+    """
+    Hands out unique "<base>_NN" names for generated helper nodes.
+    Each name family, e.g. "*_esn_cam_attach", is listed with one ls query the
+    first time it is needed, and the taken indices of every base in it are
+    kept in memory. Checks and allocations are then set lookups.
+    Inside a TwosifySession the snapshot lives until the outermost session
+    ends; outside of one it is taken again for every call.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        # family -> {base: set of taken indices}
+        self._families = {}
+        # (family, base) -> lowest index that may be free
+        self._next = {}
+
+    def begin(self):
+        self._depth += 1
+
+    def end(self):
+        self._depth = max(0, self._depth - 1)
+        if not self._depth:
+            self._families.clear()
+            self._next.clear()
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
+        return False
+
+    def _taken(self, base, family):
+        if not self._depth:
+            self._families.pop(family, None)
+            self._next.pop((family, base), None)
+        if family not in self._families:
+            bases = {}
+            for name in cmds.ls(f"{family}_*", recursive=True) or []:
+                stem, _, suffix = name.rsplit("|", 1)[-1].rpartition("_")
+                if suffix.isdigit():
+                    bases.setdefault(stem, set()).add(int(suffix))
+            self._families[family] = bases
+        return self._families[family].setdefault(base, set())
+
+    def exists(self, base, index=1, family=None):
+        """True if "<base>_NN" with that index is taken."""
+        return index in self._taken(base, family or base)
+
+    def allocate(self, base, family=None):
+        """Returns the lowest free "<base>_NN" name and marks it taken."""
+        family = family or base
+        taken = self._taken(base, family)
+        index = self._next.get((family, base), 1)
+        while index in taken:
+            index += 1
+        taken.add(index)
+        self._next[(family, base)] = index + 1
+        return f"{base}_{index:02d}"
+
+
+names = NameAllocator()
+
+
 def create_circle(master_name=None):
     # Generate unique name for the circle based on master name
     if master_name:
@@ -948,13 +3557,8 @@ def create_circle(master_name=None):
     else:
         base_name = "Follow_Cam_esn_cam_attach"
     
-    counter = 1
-    circle_name = f"{base_name}_{counter:02d}"
-    
-    # Keep incrementing until we find a name that doesn't exist
-    while cmds.objExists(circle_name):
-        counter += 1
-        circle_name = f"{base_name}_{counter:02d}"
+    # Lowest free index, from the names snapshot rather than objExists per index
+    circle_name = names.allocate(base_name, family="*_esn_cam_attach")
     
     # Create the NURBS circle (normal in Y-axis to make it horizontal in X)
     circle = cmds.circle(normal=(0, 1, 0), name=circle_name)[0]
@@ -982,14 +3586,7 @@ def create_circle(master_name=None):
 
 def create_locator():
     # Generate unique name for the locator
-    base_name = "Follow_Cam_Loc"
-    counter = 1
-    locator_name = f"{base_name}_{counter:02d}"
-    
-    # Keep incrementing until we find a name that doesn't exist
-    while cmds.objExists(locator_name):
-        counter += 1
-        locator_name = f"{base_name}_{counter:02d}"
+    locator_name = names.allocate("Follow_Cam_Loc")
     
     # Create the locator
     locator = cmds.spaceLocator(name=locator_name)[0]
@@ -1027,229 +3624,838 @@ def get_keys_time(objs=None):
         return []
     
     keys_time = cmds.keyframe(objs, query=True, timeChange=True) or []
-    return sorted(list(set(keys_time)))
+    return FrameSet(keys_time).frames()
 
 
-def show_ui():
-    window_name = "KeysTimeUI"
-    
-    # Delete existing window if it exists
-    if cmds.window(window_name, exists=True):
-        cmds.deleteUI(window_name, window=True)
-    
-    # Create main window
-    window = cmds.window(
-        window_name,
-        title="Twosify",
-        widthHeight=(260, 230),
-        sizeable=False,
-        minimizeButton=False,
-        maximizeButton=False,
-        retain=True,
-        backgroundColor=[0.12, 0.12, 0.12]
-    )
-    
-    # Main column layout
-    main_layout = cmds.columnLayout(
-        adjustableColumn=True,
-        columnAttach=('both', 10),
-        rowSpacing=8,
-        backgroundColor=[0.15, 0.15, 0.15],
-        parent=window
-    )
-    
-    # Add some spacing at the top
-    cmds.separator(height=5, style='none', parent=main_layout)
-    
-    # Dynamic label that changes based on dropdown
-    title_label = cmds.text(
-        label="Stepped", 
-        align='left', 
-        font='boldLabelFont',
-        backgroundColor=[0.15, 0.15, 0.15],
-        parent=main_layout
-    )
-    
-    # Dropdown menu
-    def on_dropdown_change(selection):
-        if selection == "Make It Stepped":        
-            cmds.text(title_label, edit=True, label="Stepped")
-            cmds.layout(make_it_twos_layout, e=True, visible=True)
-            cmds.layout(attach_to_camera_layout, e=True, visible=False)
+# Axis order of each Maya rotateOrder value (xyz, yzx, zxy, xzy, yxz, zyx)
+ROTATE_ORDERS = ((0, 1, 2), (1, 2, 0), (2, 0, 1), (0, 2, 1), (1, 0, 2), (2, 1, 0))
+
+# Centimetres per Maya linear unit
+LINEAR_UNIT_SCALE = {"mm": 0.1, "cm": 1.0, "m": 100.0, "km": 100000.0,
+                     "in": 2.54, "ft": 30.48, "yd": 91.44, "mi": 160934.4}
+
+
+def sample_world_matrices(node, times):
+    """
+    Samples the node's world matrix at every time without moving the current time.
+    Returns a (len(times), 4, 4) NumPy array.
+    """
+    plug = f"{node}.worldMatrix[0]"
+    return np.array([cmds.getAttr(plug, time=t) for t in times], dtype=float).reshape(-1, 4, 4)
+
+
+def camera_upstream_hash(cam_obj):
+    """
+    Content hash of everything the camera's world matrix depends on: the anim
+    curves upstream of the camera and its parents, plus the world matrix at
+    frame 0 to catch edits to unkeyed transforms.
+    """
+    parts = cmds.ls(cam_obj, long=True)[0].split("|")[1:]
+    path = ["|" + "|".join(parts[:i + 1]) for i in range(len(parts))]
+    curves = sorted(set(cmds.ls(cmds.listHistory(path) or [], type="animCurve") or []))
+    content = []
+    for curve in curves:
+        signature = read_curve_signature(curve)
+        content.append((curve, signature["settings"], sorted(signature["blocks"].items())))
+    content.append(cmds.getAttr(f"{cam_obj}.worldMatrix[0]", time=0))
+    return zlib.crc32(repr(content).encode())
+
+
+class CameraTrackCache(object):
+    """
+    Sampled camera world matrices, kept per camera and upstream hash.
+    Attaching several masters to the same camera samples each frame once;
+    asking for new frames only samples those. An edit upstream of the camera
+    changes the hash and drops its track.
+    """
+
+    def __init__(self):
+        # long camera name -> (upstream hash, {time: (4, 4) matrix})
+        self.tracks = {}
+
+    def clear(self):
+        self.tracks.clear()
+
+    def missing(self, cam_obj, times, upstream):
+        """Returns the times not sampled yet for this camera state."""
+        cached = self.tracks.get(cmds.ls(cam_obj, long=True)[0])
+        if not cached or cached[0] != upstream:
+            return list(times)
+        return [t for t in times if t not in cached[1]]
+
+    def store(self, cam_obj, upstream, times, matrices):
+        """Adds sampled matrices for times to the camera's track."""
+        key = cmds.ls(cam_obj, long=True)[0]
+        cached = self.tracks.get(key)
+        if not cached or cached[0] != upstream:
+            cached = (upstream, {})
+            self.tracks[key] = cached
+        cached[1].update(zip(times, matrices))
+
+    def lookup(self, cam_obj, times):
+        """Returns the cached (len(times), 4, 4) track."""
+        frames = self.tracks[cmds.ls(cam_obj, long=True)[0]][1]
+        return np.array([frames[t] for t in times])
+
+    def track(self, cam_obj, times, upstream=None):
+        """Returns the camera's world matrix track at times, sampling only what is missing."""
+        if upstream is None:
+            upstream = camera_upstream_hash(cam_obj)
+        missing = self.missing(cam_obj, times, upstream)
+        if missing:
+            self.store(cam_obj, upstream, missing, sample_world_matrices(cam_obj, missing))
+        return self.lookup(cam_obj, times)
+
+
+camera_tracks = CameraTrackCache()
+
+
+def euler_from_matrices(matrices, rotate_order=0):
+    """
+    Decomposes (n, 4, 4) Maya matrices into (n, 3) euler rotations in degrees
+    for the given rotateOrder. Scale is removed first and the result is
+    unwrapped over time so consecutive keys don't flip.
+    """
+    rot = matrices[:, :3, :3]
+    rot = rot / np.linalg.norm(rot, axis=2, keepdims=True)
+    # Maya matrices are row-major, transpose to column vector convention
+    rot = np.transpose(rot, (0, 2, 1))
+
+    i, j, k = ROTATE_ORDERS[rotate_order]
+    odd = (j - i) % 3 != 1
+
+    cy = np.hypot(rot[:, i, i], rot[:, j, i])
+    ax = np.arctan2(rot[:, k, j], rot[:, k, k])
+    ay = np.arctan2(-rot[:, k, i], cy)
+    az = np.arctan2(rot[:, j, i], rot[:, i, i])
+    if odd:
+        ax, ay, az = -ax, -ay, -az
+
+    euler = np.empty((len(rot), 3))
+    euler[:, i] = ax
+    euler[:, j] = ay
+    euler[:, k] = az
+    return np.degrees(np.unwrap(euler, axis=0))
+
+
+def local_transforms(world, parent_world, rotate_order=0):
+    """
+    Vectorized local translate/rotate of world matrices relative to parent
+    world matrices, both (n, 4, 4).
+    Returns (translate (n, 3) in centimetres, rotate (n, 3) in degrees).
+    """
+    local = np.matmul(world, np.linalg.inv(parent_world))
+    return local[:, 3, :3], euler_from_matrices(local, rotate_order)
+
+
+def bake_locator_to_master(loc_ctrl, circle_ctrl, cam_obj, master_obj, keys_time):
+    """
+    Bakes the locator under the camera attach circle so it matches the master at
+    every key time, without stepping the timeline.
+    The camera track comes from camera_tracks, the master world matrices are
+    sampled once per key time. The circle follows the camera through its
+    constraint offset, which is read at the current time. All keys are
+    written in one pass per channel.
+    """
+    cam_track = camera_tracks.track(cam_obj, keys_time)
+    master_track = sample_world_matrices(master_obj, keys_time)
+    write_locator_keys(loc_ctrl, circle_ctrl, cam_obj, cam_track, master_track, keys_time)
+
+
+def write_locator_keys(loc_ctrl, circle_ctrl, cam_obj, cam_track, master_track, keys_time):
+    """
+    Solves the locator's local translate/rotate from sampled camera and master
+    world matrix tracks and writes all its keys, one call per channel.
+    """
+    circle_now = np.array(cmds.xform(circle_ctrl, q=True, worldSpace=True, matrix=True)).reshape(4, 4)
+    cam_now = np.array(cmds.xform(cam_obj, q=True, worldSpace=True, matrix=True)).reshape(4, 4)
+    offset = np.matmul(circle_now, np.linalg.inv(cam_now))
+    circle_track = np.matmul(offset, cam_track)
+
+    rotate_order = cmds.getAttr(loc_ctrl + ".rotateOrder")
+    translate, rotate = local_transforms(master_track, circle_track, rotate_order)
+
+    translate = translate / LINEAR_UNIT_SCALE.get(cmds.currentUnit(q=True, linear=True), 1.0)
+    if cmds.currentUnit(q=True, angle=True) == "rad":
+        rotate = np.radians(rotate)
+
+    times = list(keys_time)
+    for index, attr in enumerate(("tx", "ty", "tz")):
+        write_plug_keys(f"{loc_ctrl}.{attr}", times, translate[:, index].tolist())
+    for index, attr in enumerate(("rx", "ry", "rz")):
+        write_plug_keys(f"{loc_ctrl}.{attr}", times, rotate[:, index].tolist())
+
+
+@twosify_operation("attach_to_camera", auto_key=False)
+def attach_master_to_camera(cam_obj, master_obj, keys_time):
+    """
+    Builds the attach-to-camera setup for one master control: a circle following
+    the camera, a locator under it baked to the master at keys_time, and the
+    constraint from the locator back to the master, switched by Attach_Cam.
+    """
+    rig = build_camera_attach_rig(cam_obj, master_obj, keys_time)
+    if not rig:
+        return
+    circle_ctrl, loc_ctrl = rig
+
+    # Animate the locator to match master at each keyframe
+    try:
+        if np is not None:
+            bake_locator_to_master(loc_ctrl, circle_ctrl, cam_obj, master_obj, keys_time)
         else:
-            cmds.text(title_label, edit=True, label="Camera")
-            cmds.layout(make_it_twos_layout, e=True, visible=False)
-            cmds.layout(attach_to_camera_layout, e=True, visible=True)
-        print("Dropdown changed to:", selection)
-
-    dropdown = cmds.optionMenu(
-        label='',
-        changeCommand=on_dropdown_change,
-        backgroundColor=[0.23, 0.23, 0.23],
-        parent=main_layout
-    )
-    cmds.menuItem(label="Make It Stepped")
-    cmds.menuItem(label="Attach to Camera")
-
-
-    # -------------------------
-    # Layout for "Make It Twos"
-    # -------------------------
-    make_it_twos_layout = cmds.columnLayout(
-        adjustableColumn=True,
-        rowSpacing=6,
-        backgroundColor=[0.15, 0.15, 0.15],
-        parent=main_layout
-    )
+            cur_time = cmds.currentTime(q=True)
+            for key in keys_time:
+                cmds.currentTime(key)
+                cmds.matchTransform(loc_ctrl, master_obj, pos=True, rot=True)
+                cmds.setKeyframe(loc_ctrl, at=("tx", "ty", "tz", "rx", "ry", "rz"))
+            cmds.currentTime(cur_time)
+    except Exception as e:
+        print(f"ERROR baking locator: {e}")
+        return
 
-    cmds.separator(height=7, style='none', parent=make_it_twos_layout)
+    constrain_master_to_locator(loc_ctrl, circle_ctrl, master_obj)
 
-    # Primary buttons
-    anim_layer_butt = cmds.button(
-        label=" =  Create animLayer from Selections  = ",
-        command="create_twos_layer()",
-        height=28,
-        backgroundColor=[0.26, 0.26, 0.26],
-        parent=make_it_twos_layout
-    )
+
+@twosify_operation("attach_to_camera", auto_key=False)
+def attach_masters_to_camera(cam_obj, master_objs, keys_time=None):
+    """
+    Batch attach to camera: sets up every master in master_objs in one undo
+    chunk. The camera is sampled once over the union of all key times and
+    each master reuses that track. keys_time applies to every master; when it
+    is empty each master uses its own key times.
+    Returns the list of masters attached.
+    """
+    if np is None:
+        attached = []
+        for master_obj in master_objs:
+            times = keys_time or get_keys_time(objs=[master_obj])
+            if times:
+                attach_master_to_camera(cam_obj, master_obj, times)
+                attached.append(master_obj)
+        return attached
+
+    master_times = []
+    for master_obj in master_objs:
+        times = list(keys_time) if keys_time else get_keys_time(objs=[master_obj])
+        if not times:
+            print(f"Skipping {master_obj}: no keys time")
+            continue
+        master_times.append((master_obj, times))
+    if not master_times:
+        return []
+
+    # One camera sampling pass for everyone, served from the cache after that
+    all_times = sorted(set(t for _, times in master_times for t in times))
+    camera_tracks.track(cam_obj, all_times)
+
+    attached = []
+    for master_obj, times in master_times:
+        rig = build_camera_attach_rig(cam_obj, master_obj, times)
+        if not rig:
+            continue
+        circle_ctrl, loc_ctrl = rig
+        write_locator_keys(loc_ctrl, circle_ctrl, cam_obj, camera_tracks.lookup(cam_obj, times),
+                           sample_world_matrices(master_obj, times), times)
+        constrain_master_to_locator(loc_ctrl, circle_ctrl, master_obj)
+        attached.append(master_obj)
+    print(f"Attached {len(attached)} of {len(master_objs)} masters to {cam_obj}")
+    return attached
+
+
+def attach_master_to_camera_task(cam_obj, master_obj, keys_time, queue=None):
+    """
+    Chunked attach to camera: builds the rig, samples the camera and master
+    matrices a few key times per idle callback, then writes the locator keys
+    and constrains the master. A cancelled or failed attach deletes the rig
+    nodes it created and the keys it set on an unkeyed master.
+    Returns the started ChunkedTask.
+    """
+    state = {}
+    master_track = []
+    group_existed = cmds.objExists("FOLLOW_CAM_GRP")
+    master_keyed = bool(cmds.keyframe(master_obj, q=True, keyframeCount=True))
+    current_time = cmds.currentTime(q=True)
+
+    def begin():
+        rig = build_camera_attach_rig(cam_obj, master_obj, keys_time)
+        if not rig:
+            raise RuntimeError("could not build the camera attach rig")
+        state["circle"], state["locator"] = rig
+        state["upstream"] = camera_upstream_hash(cam_obj)
+        state["missing"] = set(camera_tracks.missing(cam_obj, keys_time, state["upstream"]))
+
+    def sample(chunk):
+        cam_times = [t for t in chunk if t in state["missing"]]
+        if cam_times:
+            camera_tracks.store(cam_obj, state["upstream"], cam_times, sample_world_matrices(cam_obj, cam_times))
+        master_track.append(sample_world_matrices(master_obj, chunk))
+
+    def finish():
+        write_locator_keys(state["locator"], state["circle"], cam_obj,
+                           camera_tracks.lookup(cam_obj, keys_time), np.concatenate(master_track), keys_time)
+        constrain_master_to_locator(state["locator"], state["circle"], master_obj)
+
+    def rollback():
+        circle = state.get("circle")
+        if circle and cmds.objExists(circle):
+            # Once the master is constrained, the whole setup has to come off
+            for rig_master, rig in find_camera_attach_rigs([circle]).items():
+                remove_camera_attach_rig(rig_master, rig)
+            if cmds.objExists(circle):
+                cmds.delete(circle)
+        if not master_keyed and cmds.objExists(master_obj):
+            cmds.cutKey(master_obj, attribute=CONSTRAINED_CHANNELS, clear=True)
+        if (not group_existed and cmds.objExists("FOLLOW_CAM_GRP")
+                and not cmds.listRelatives("FOLLOW_CAM_GRP", children=True)):
+            cmds.delete("FOLLOW_CAM_GRP")
+        cmds.currentTime(current_time)
+
+    return ChunkedTask("Attach to Camera", keys_time, sample, on_start=begin, on_done=finish, queue=queue,
+                       rollback=rollback).start()
+
+
+def build_camera_attach_rig(cam_obj, master_obj, keys_time):
+    """
+    Creates the follow group, the circle constrained to the camera and the
+    locator under it. Returns (circle, locator), or None if an object is missing.
+    """
+    cmds.currentTime(keys_time[0])
+
+    print(f"Using camera: {cam_obj}")
+    print(f"Using master: {master_obj}")
+    print(f"Using keys time: {keys_time}")
+
+    # Check if objects exist
+    if not cmds.objExists(cam_obj):
+        print(f"ERROR: Camera '{cam_obj}' does not exist!")
+        return None
+    if not cmds.objExists(master_obj):
+        print(f"ERROR: Master control '{master_obj}' does not exist!")
+        return None
+
+    # Create follow cam group if it doesn't exist
+    follow_cam_grp = "FOLLOW_CAM_GRP"
+    if not cmds.objExists(follow_cam_grp):
+        cmds.group(n=follow_cam_grp, empty=True)
+        try:
+            set_outliner_color("FOLLOW_CAM_GRP", (0.75, 0.5, 0.9)) 
+        except:
+            pass
+
+    # Create controls
+    circle_ctrl = create_circle(master_name=master_obj)
+    loc_ctrl = create_locator()
+
+    # Parent locator to circle, circle to group
+    cmds.parent(loc_ctrl, circle_ctrl)
+    cmds.parent(circle_ctrl, follow_cam_grp)
+
+    # Create constraint between camera and circle
+    smart_constraint_create_attach_cam(cam_obj, circle_ctrl)
+
+    # Make translate X, Y, Z not-keyable and hide them on circle
+    for axis in ['X', 'Y', 'Z']:
+        tran_attr = circle_ctrl + ".translate" + axis
+        cmds.setAttr(tran_attr, keyable=False)
+        cmds.setAttr(tran_attr, channelBox=False)
+
+    # Make rotate X, Y, Z not-keyable and hide them on circle
+    for axis in ['X', 'Y', 'Z']:
+        rot_attr = circle_ctrl + ".rotate" + axis
+        cmds.setAttr(rot_attr, keyable=False)
+        cmds.setAttr(rot_attr, channelBox=False)
+
+    return circle_ctrl, loc_ctrl
+
+
+def constrain_master_to_locator(loc_ctrl, circle_ctrl, master_obj):
+    """
+    Steps the baked locator keys and constrains the master to the locator,
+    with the constraint blend driven by the circle's Attach_Cam switch.
+    """
+    # Set key tangents after all keyframes are created
+    cmds.keyTangent(loc_ctrl, at=("tx", "ty", "tz", "rx", "ry", "rz"), itt="auto", ott="step")
+
+    # Check if master_obj has keys, if not, add a key to lock its current position
+    master_keys = cmds.keyframe(master_obj, query=True, timeChange=True) or []
+    if not master_keys:
+        print(f"DEBUG: {master_obj} has no keys, adding key at current position")
+        cmds.setKeyframe(master_obj, at=("tx", "ty", "tz", "rx", "ry", "rz"))
+
+    # Create the constraint between locator and master
+    constraints = simple_smart_constraint(loc_ctrl, master_obj, connect_to_attach_cam=True, attach_cam_object=circle_ctrl)
+
+    # Always connect to blendParent1 after constraint creation
+    if constraints:
+        # Check if blendParent1 exists after constraint creation
+        if cmds.attributeQuery('blendParent1', node=master_obj, exists=True):
+            # If master_obj had no keys, set blendParent1 to 1 (on) first
+            if not master_keys:
+                print(f"DEBUG: Setting {master_obj}.blendParent1 to 1 (on) for object with no original keys")
+                cmds.setAttr(f"{master_obj}.blendParent1", 1)
+
+            # Connect the Attach_Cam to blendParent1 for all objects
+            if cmds.attributeQuery('Attach_Cam', node=circle_ctrl, exists=True):
+                try:
+                    print(f"DEBUG: Connecting {circle_ctrl}.Attach_Cam to {master_obj}.blendParent1")
+                    cmds.connectAttr(f"{circle_ctrl}.Attach_Cam", f"{master_obj}.blendParent1", force=True)
+                    print(f"SUCCESS: Connected {circle_ctrl}.Attach_Cam to {master_obj}.blendParent1")
+                except Exception as e:
+                    print(f"ERROR connecting to blendParent1: {e}")
+        else:
+            print(f"DEBUG: blendParent1 attribute not found on {master_obj}")
+
+    print("ATTACH TO CAMERA operation completed!")
+
+
+CONSTRAINED_CHANNELS = ("tx", "ty", "tz", "rx", "ry", "rz")
+PAIR_BLEND_INPUTS = {"outTranslateX": "inTranslateX1", "outTranslateY": "inTranslateY1",
+                     "outTranslateZ": "inTranslateZ1", "outRotateX": "inRotateX1",
+                     "outRotateY": "inRotateY1", "outRotateZ": "inRotateZ1"}
+
+
+def find_camera_attach_rigs(objects):
+    """
+    Finds the attach-to-camera setups of objects, which can be the masters,
+    their circles or their locators.
+    Returns {master: {"constraints": [...], "circles": [...]}}.
+    """
+    locators = set()
+    for obj in objects:
+        if cmds.attributeQuery("Attach_Cam", node=obj, exists=True):
+            locators.update(cmds.listRelatives(obj, children=True, type="transform", fullPath=True) or [])
+        elif cmds.listRelatives(obj, shapes=True, type="locator"):
+            parent = cmds.listRelatives(obj, parent=True, fullPath=True) or []
+            if parent and cmds.attributeQuery("Attach_Cam", node=parent[0], exists=True):
+                locators.add(cmds.ls(obj, long=True)[0])
+        else:
+            for constraint in cmds.listRelatives(obj, children=True, type="constraint", fullPath=True) or []:
+                for target in cmds.listConnections(f"{constraint}.target", source=True, destination=False) or []:
+                    locators.update(cmds.ls(target, long=True))
+
+    rigs = {}
+    for loc in locators:
+        parent = cmds.listRelatives(loc, parent=True, fullPath=True) or []
+        if not parent or not cmds.attributeQuery("Attach_Cam", node=parent[0], exists=True):
+            continue
+        constraints = set(cmds.listConnections(loc, source=False, destination=True, type="constraint") or [])
+        for constraint in constraints:
+            master = (cmds.listRelatives(constraint, parent=True) or [None])[0]
+            if not master:
+                continue
+            rig = rigs.setdefault(master, {"constraints": [], "circles": []})
+            if constraint not in rig["constraints"]:
+                rig["constraints"].append(constraint)
+            if parent[0] not in rig["circles"]:
+                rig["circles"].append(parent[0])
+    return rigs
+
+
+def remove_camera_attach_rig(master_obj, rig):
+    """
+    Deletes one master's attach-to-camera setup: its constraints, the
+    pairBlends and blendParent1 they added, and the circles and locators.
+    Anim curves that went through a pairBlend are reconnected to the master.
+    Empties FOLLOW_CAM_GRP get deleted too.
+    """
+    reconnect = []
+    pair_blends = set(cmds.listConnections(master_obj, source=True, destination=False, type="pairBlend") or [])
+    for pair_blend in pair_blends:
+        connections = cmds.listConnections(pair_blend, source=False, destination=True,
+                                           plugs=True, connections=True) or []
+        for out_plug, dest_plug in zip(connections[::2], connections[1::2]):
+            in_attr = PAIR_BLEND_INPUTS.get(out_plug.rsplit(".", 1)[-1])
+            if not in_attr:
+                continue
+            source = cmds.listConnections(f"{pair_blend}.{in_attr}", source=True, destination=False, plugs=True) or []
+            if source:
+                reconnect.append((source[0], dest_plug))
+
+    blend_curves = []
+    if cmds.attributeQuery("blendParent1", node=master_obj, exists=True):
+        blend_curves = cmds.listConnections(f"{master_obj}.blendParent1", source=True, destination=False,
+                                            type="animCurve") or []
+
+    helper_curves = []
+    for circle in rig["circles"]:
+        helpers = [circle] + (cmds.listRelatives(circle, allDescendents=True, fullPath=True) or [])
+        helper_curves.extend(cmds.keyframe(helpers, q=True, name=True) or [])
+
+    cmds.delete([node for node in rig["constraints"] + list(pair_blends) + blend_curves + helper_curves
+                 if cmds.objExists(node)])
+    if cmds.attributeQuery("blendParent1", node=master_obj, exists=True):
+        cmds.deleteAttr(f"{master_obj}.blendParent1")
+    for source, dest in reconnect:
+        cmds.connectAttr(source, dest, force=True)
+
+    circles = [circle for circle in rig["circles"] if cmds.objExists(circle)]
+    if circles:
+        cmds.delete(circles)
+    if cmds.objExists("FOLLOW_CAM_GRP") and not cmds.listRelatives("FOLLOW_CAM_GRP", children=True):
+        cmds.delete("FOLLOW_CAM_GRP")
+
+
+def get_rig_driven_plugs(master_obj, rig):
+    """
+    Returns the master's translate/rotate plugs driven by its attach-to-camera
+    constraints, directly or through the pairBlend a keyed channel gets.
+    Channels connected to anything else are not part of the setup.
+    """
+    constraints = set(rig["constraints"])
+    plugs = []
+    for attr in CONSTRAINED_CHANNELS:
+        plug = f"{master_obj}.{attr}"
+        sources = cmds.listConnections(plug, source=True, destination=False, plugs=True,
+                                       skipConversionNodes=True) or []
+        if not sources:
+            continue
+        node, _, out_attr = sources[0].partition(".")
+        if node in constraints:
+            plugs.append(plug)
+        elif cmds.nodeType(node) == "pairBlend" and out_attr in PAIR_BLEND_INPUTS:
+            # The constraint feeds the blend's second input, the curve the first
+            in_attr = PAIR_BLEND_INPUTS[out_attr][:-1] + "2"
+            blend_sources = cmds.listConnections(f"{node}.{in_attr}", source=True, destination=False,
+                                                 skipConversionNodes=True) or []
+            if constraints.intersection(blend_sources):
+                plugs.append(plug)
+    return plugs
+
+
+@twosify_operation("bake_down_camera_attach", auto_key=False)
+def bake_down_camera_attach(objects=None, cadence=None, dry_run=False):
+    """
+    Collapses attach-to-camera setups back into plain keys on the masters.
+    The constrained translate/rotate channels are sampled in one pass at the
+    key times of the master and its locator, or at the frames of a cadence
+    spec over the playback range, and planned as one KeyEditPlan: the
+    samples as stepped keys and the channels' other keys in that range cut.
+    Then the setups are removed and the plan is executed. objects defaults
+    to the selection and can be masters, circles or locators.
+    With dry_run=True the setups are left alone and the plan is reported.
+    Returns the list of masters baked, or the KeyEditPlan with dry_run=True.
+    """
+    if objects is None:
+        objects = cmds.ls(sl=True)
+    rigs = find_camera_attach_rigs(objects or [])
+    if not rigs:
+        cmds.warning("No attach to camera setup found on the selection.")
+        return []
+
+    if cadence:
+        start, end = get_playback_range()
+        cadence_times = [float(frame) for frame in compile_cadence(str(cadence), int(start), int(end))]
+
+    plan = KeyEditPlan("bake_down_camera_attach")
+    channels = {}
+    for master_obj, rig in rigs.items():
+        if cadence:
+            times = cadence_times
+        else:
+            locators = cmds.listRelatives(rig["circles"], children=True, type="transform", fullPath=True) or []
+            times = get_keys_time(objs=[master_obj] + locators)
+        # Only the channels the setup drives, the others keep their own curves
+        plugs = get_rig_driven_plugs(master_obj, rig)
+        channels[master_obj] = (len(times), len(plugs))
+        if not times:
+            continue
+        samples = sample_plug_values(plugs, times)
+        for plug in plugs:
+            current = cmds.keyframe(plug, q=True, timeChange=True) or []
+            plan.add(plug, times, current, times[0], times[-1], values=dict(zip(times, samples[plug])),
+                     tangents={("auto", "step"): times})
+
+    if dry_run:
+        plan.report()
+        return plan
+
+    for master_obj, rig in rigs.items():
+        remove_camera_attach_rig(master_obj, rig)
+    plan.execute()
+    for master_obj, (key_count, plug_count) in channels.items():
+        print(f"Baked down {master_obj}: {key_count} keys on {plug_count} channels")
+    return list(rigs)
+
+
+def ui_command(func, *args, **kwargs):
+    """Wraps func as a UI callback, dropping the arguments Maya passes to it."""
+    def command(*_):
+        return func(*args, **kwargs)
+    return command
+
+
+class TwosifyWindow(object):
+    """
+    Retained Twosify window.
+    The window is built once and shown again on later calls, each panel of
+    the dropdown is built the first time it is displayed, and every control
+    is bound to a callable rather than a command string, so the UI works
+    the same whether Twosify is imported or run in __main__.
+    """
+
+    WINDOW_NAME = "KeysTimeUI"
+    # Dropdown entry -> (title label, builder method name)
+    PANELS = {
+        "Make It Stepped": ("Stepped", "_build_stepped_panel"),
+        "Attach to Camera": ("Camera", "_build_camera_panel"),
+    }
+
+    def __init__(self):
+        self.window = None
+        self.main_layout = None
+        self.title_label = None
+        self.panels = {}
+
+    def show(self, panel="Make It Stepped"):
+        """Shows the window, building it only if it does not exist yet."""
+        if self.window and cmds.window(self.window, exists=True):
+            cmds.showWindow(self.window)
+            return
+
+        # A window left by an earlier load of the module has stale callbacks
+        if cmds.window(self.WINDOW_NAME, exists=True):
+            cmds.deleteUI(self.WINDOW_NAME, window=True)
+        self.panels = {}
+
+        # Create main window
+        self.window = cmds.window(
+            self.WINDOW_NAME,
+            title="Twosify",
+            widthHeight=(260, 230),
+            sizeable=False,
+            minimizeButton=False,
+            maximizeButton=False,
+            retain=True,
+            backgroundColor=[0.12, 0.12, 0.12]
+        )
+
+        # Main column layout
+        self.main_layout = cmds.columnLayout(
+            adjustableColumn=True,
+            columnAttach=('both', 10),
+            rowSpacing=8,
+            backgroundColor=[0.15, 0.15, 0.15],
+            parent=self.window
+        )
+
+        # Add some spacing at the top
+        cmds.separator(height=5, style='none', parent=self.main_layout)
+
+        # Dynamic label that changes based on dropdown
+        self.title_label = cmds.text(
+            label="Stepped",
+            align='left',
+            font='boldLabelFont',
+            backgroundColor=[0.15, 0.15, 0.15],
+            parent=self.main_layout
+        )
+
+        cmds.optionMenu(
+            label='',
+            changeCommand=self.show_panel,
+            backgroundColor=[0.23, 0.23, 0.23],
+            parent=self.main_layout
+        )
+        for name in self.PANELS:
+            cmds.menuItem(label=name)
+
+        self.show_panel(panel)
+        cmds.showWindow(self.window)
+
+    def show_panel(self, name):
+        """Shows the named dropdown panel, building it on first use, and hides the others."""
+        label, builder = self.PANELS[name]
+        if name not in self.panels:
+            self.panels[name] = getattr(self, builder)(self.main_layout)
+        for other, layout in self.panels.items():
+            cmds.layout(layout, e=True, visible=other == name)
+        cmds.text(self.title_label, edit=True, label=label)
+
+    def _build_stepped_panel(self, parent):
+        # -------------------------
+        # Layout for "Make It Twos"
+        # -------------------------
+        make_it_twos_layout = cmds.columnLayout(
+            adjustableColumn=True,
+            rowSpacing=6,
+            backgroundColor=[0.15, 0.15, 0.15],
+            parent=parent
+        )
+
+        cmds.separator(height=7, style='none', parent=make_it_twos_layout)
+
+        # Primary buttons
+        anim_layer_butt = cmds.button(
+            label=" =  Create animLayer from Selections  = ",
+            command=ui_command(create_twos_layer),
+            height=28,
+            backgroundColor=[0.26, 0.26, 0.26],
+            parent=make_it_twos_layout
+        )
 
 
-    anim_layer_butt = cmds.popupMenu(parent = anim_layer_butt)
-    cmds.menuItem(label='Add Selection to AnimLayer', command='add_selected_to_anim_layer()', parent=anim_layer_butt)
-    cmds.menuItem(label='Set Keys On 1s', command='set_keys_ones_anim_layer()', parent=anim_layer_butt)
-    cmds.menuItem(label='Set Keys On 2s', command='set_keys_twos_anim_layer()', parent=anim_layer_butt)
-    cmds.menuItem(label='Set Keys On 3s', command='set_keys_threes_anim_layer()', parent=anim_layer_butt)
-    cmds.menuItem(label='Set Keys On 2s-3s', command='set_keys_twos_threes_anim_layer()', parent=anim_layer_butt)
-    cmds.menuItem(label='Set Keys On 3s-4s', command='set_keys_threes_fours_anim_layer()', parent=anim_layer_butt)
+        anim_layer_butt = cmds.popupMenu(parent = anim_layer_butt)
+        cmds.menuItem(label='Add Selection to AnimLayer', command=ui_command(add_selected_to_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys On 1s', command=ui_command(set_keys_ones_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys On 2s', command=ui_command(set_keys_twos_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys On 3s', command=ui_command(set_keys_threes_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys On 2s-3s', command=ui_command(set_keys_twos_threes_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys On 3s-4s', command=ui_command(set_keys_threes_fours_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys On Custom...', command=ui_command(set_keys_custom_cadence), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys Smart (1s-3s)', command=ui_command(set_keys_smart_anim_layer), parent=anim_layer_butt)
+        cmds.menuItem(label='Set Keys From Cadence Map', command=ui_command(apply_cadence_map), parent=anim_layer_butt)
+        cmds.menuItem(label='Preview Keys On 2s', command=ui_command(apply_cadence, "2", dry_run=True), parent=anim_layer_butt)
+        cmds.menuItem(label='Preview Smart Keys', command=ui_command(set_keys_smart_anim_layer, dry_run=True), parent=anim_layer_butt)
+        cmds.menuItem(label='Preview Cadence Map', command=ui_command(apply_cadence_map, dry_run=True), parent=anim_layer_butt)
+        cmds.menuItem(label='Edit Cadence Map...', command=ui_command(edit_cadence_map_dialog), parent=anim_layer_butt)
+        cmds.menuItem(divider=True, parent=anim_layer_butt)
+        cmds.menuItem(label='Live Stepped On 2s', command=ui_command(enable_live_stepping, "2"), parent=anim_layer_butt)
+        cmds.menuItem(label='Live Stepped On 1s', command=ui_command(set_live_cadence, "1"), parent=anim_layer_butt)
+        cmds.menuItem(label='Live Stepped Off', command=ui_command(disable_live_stepping), parent=anim_layer_butt)
     
   
 
-    # Dummy empty column to push buttons to center
+        # Dummy empty column to push buttons to center
 
-    # Centered Copy/Paste buttons without stretching
-    button_row = cmds.rowLayout(
-        numberOfColumns=3,
-        columnAttach=[(1, 'both', 0), (2, 'both', 5), (3, 'both', 0)],
-        columnWidth3=(33, 80, 80),
-        parent=make_it_twos_layout,
-        backgroundColor=[0.15, 0.15, 0.15]
-    )
+        # Centered Copy/Paste buttons without stretching
+        button_row = cmds.rowLayout(
+            numberOfColumns=3,
+            columnAttach=[(1, 'both', 0), (2, 'both', 5), (3, 'both', 0)],
+            columnWidth3=(33, 80, 80),
+            parent=make_it_twos_layout,
+            backgroundColor=[0.15, 0.15, 0.15]
+        )
     
 
 
-    cmds.text(label='', parent=button_row)
-    cmds.separator(height=30, style='none', parent=make_it_twos_layout)
-    
-    cmds.button(
-        label="Copy Time",
-        command='copy_action("Pose to Pose")',
-        height=24,
-        backgroundColor=[0.22, 0.22, 0.22],
-        parent=button_row
-    )
-    
-    cmds.button(
-        label='Paste Time',
-        command='paste_action("Pose to Pose")',
-        height=24,
-        backgroundColor=[0.22, 0.22, 0.22],
-        parent=button_row
-    )
+        cmds.text(label='', parent=button_row)
+        cmds.separator(height=30, style='none', parent=make_it_twos_layout)
     
-    # Main button for this tab
-    cmds.button(
-        label="UPDATE LAYER",
-        command="convert_to_twos()",
-        height=35,
-        backgroundColor=[0.35, 0.35, 0.35],
-        parent=make_it_twos_layout
-    )
+        copy_butt = cmds.button(
+            label="Copy Time",
+            command=ui_command(copy_action, "Pose to Pose"),
+            height=24,
+            backgroundColor=[0.22, 0.22, 0.22],
+            parent=button_row
+        )
+
+        copy_butt = cmds.popupMenu(parent=copy_butt)
+        cmds.menuItem(label='Copy Channels', command=ui_command(copy_action, "Channels"), parent=copy_butt)
     
+        paste_butt = cmds.button(
+            label='Paste Time',
+            command=ui_command(paste_action, "Pose to Pose"),
+            height=24,
+            backgroundColor=[0.22, 0.22, 0.22],
+            parent=button_row
+        )
+
+        paste_butt = cmds.popupMenu(parent=paste_butt)
+        cmds.menuItem(label='Paste Channels', command=ui_command(paste_action, "Channels"), parent=paste_butt)
+        cmds.menuItem(label='Preview Paste Time', command=ui_command(clean_range_script, dry_run=True), parent=paste_butt)
+        cmds.menuItem(label='Preview Smart Paste', command=ui_command(paste_key_times_smart, dry_run=True), parent=paste_butt)
+        cmds.menuItem(label='Namespace Rules...', command=ui_command(set_namespace_rules_dialog), parent=paste_butt)
     
+        # Main button for this tab
+        update_layer_butt = cmds.button(
+            label="UPDATE LAYER",
+            command=ui_command(convert_to_twos, chunked=True),
+            height=35,
+            backgroundColor=[0.35, 0.35, 0.35],
+            parent=make_it_twos_layout
+        )
 
-    # -----------------------------
-    # Layout for "Attach to Camera"
-    # -----------------------------
-    attach_to_camera_layout = cmds.columnLayout(
-        adjustableColumn=True,
-        rowSpacing=10,
-        backgroundColor=[0.15, 0.15, 0.15],
-        parent=main_layout,
-        visible=False
-    )
+        update_layer_butt = cmds.popupMenu(parent=update_layer_butt)
+        cmds.menuItem(label='Re-bake Whole Layer', command=ui_command(convert_to_twos, chunked=True, incremental=False), parent=update_layer_butt)
+        cmds.menuItem(label='Preview Update Layer', command=ui_command(convert_to_twos, dry_run=True), parent=update_layer_butt)
+        cmds.menuItem(label='Remove Redundant Held Keys', command=ui_command(reduce_held_keys), parent=update_layer_butt)
+        cmds.menuItem(label='Preview Redundant Held Keys', command=ui_command(reduce_held_keys, dry_run=True), parent=update_layer_butt)
+        return make_it_twos_layout
+
+    def _build_camera_panel(self, parent):
+        # -----------------------------
+        # Layout for "Attach to Camera"
+        # -----------------------------
+        attach_to_camera_layout = cmds.columnLayout(
+            adjustableColumn=True,
+            rowSpacing=10,
+            backgroundColor=[0.15, 0.15, 0.15],
+            parent=parent
+        )
     
-    # Function to assign camera from selection
-    def assign_camera(*args):
-        selection = cmds.ls(selection=True)
-        if selection:
-            # Check if selected object is a camera or camera transform
-            selected_obj = selection[0]
-            if cmds.nodeType(selected_obj) == 'camera':
-                # It's a camera shape, get its transform
-                camera_transform = cmds.listRelatives(selected_obj, parent=True)[0]
-                cmds.textField(camera_field, edit=True, text=camera_transform)
-                print(f"Assigned camera shape's transform: {camera_transform}")
-            elif cmds.listRelatives(selected_obj, shapes=True, type='camera'):
-                # It's a camera transform
-                cmds.textField(camera_field, edit=True, text=selected_obj)
-                print(f"Assigned camera transform: {selected_obj}")
+        # Function to assign camera from selection
+        def assign_camera(*args):
+            selection = cmds.ls(selection=True)
+            if selection:
+                # Check if selected object is a camera or camera transform
+                selected_obj = selection[0]
+                if cmds.nodeType(selected_obj) == 'camera':
+                    # It's a camera shape, get its transform
+                    camera_transform = cmds.listRelatives(selected_obj, parent=True)[0]
+                    cmds.textField(camera_field, edit=True, text=camera_transform)
+                    print(f"Assigned camera shape's transform: {camera_transform}")
+                elif cmds.listRelatives(selected_obj, shapes=True, type='camera'):
+                    # It's a camera transform
+                    cmds.textField(camera_field, edit=True, text=selected_obj)
+                    print(f"Assigned camera transform: {selected_obj}")
+                else:
+                    # Not a camera, but assign it anyway
+                    cmds.textField(camera_field, edit=True, text=selected_obj)
+                    print(f"Assigned object: {selected_obj}")
             else:
-                # Not a camera, but assign it anyway
-                cmds.textField(camera_field, edit=True, text=selected_obj)
-                print(f"Assigned object: {selected_obj}")
-        else:
-            print("No objects selected!")
+                print("No objects selected!")
     
-    # Function to assign master control from selection
-    def assign_master_ctrl(*args):
-        selection = cmds.ls(selection=True)
-        if selection:
-            selected_obj = selection[0]
-            cmds.textField(master_field, edit=True, text=selected_obj)
-            print(f"Assigned master control: {selected_obj}")
-        else:
-            print("No objects selected!")
+        # Function to assign master control from selection
+        def assign_master_ctrl(*args):
+            selection = cmds.ls(selection=True)
+            if selection:
+                selected_obj = selection[0]
+                cmds.textField(master_field, edit=True, text=selected_obj)
+                print(f"Assigned master control: {selected_obj}")
+            else:
+                print("No objects selected!")
     
-    # Function to get keys time from selection
-    def assign_keys_time(*args):
-        selection = cmds.ls(selection=True)
-        if selection:
-            keys_time = get_keys_time(objs=selection)
-            if keys_time:
-                # Convert the list of keyframe times to a string
-                keys_string = ', '.join([str(int(key)) for key in keys_time])
-                cmds.textField(keys_time_field, edit=True, text=keys_string)
-                print(f"Found keyframe times: {keys_string}")
+        # Function to get keys time from selection
+        def assign_keys_time(*args):
+            selection = cmds.ls(selection=True)
+            if selection:
+                keys_time = get_keys_time(objs=selection)
+                if keys_time:
+                    # Convert the list of keyframe times to a string
+                    keys_string = ', '.join([str(int(key)) for key in keys_time])
+                    cmds.textField(keys_time_field, edit=True, text=keys_string)
+                    print(f"Found keyframe times: {keys_string}")
+                else:
+                    cmds.textField(keys_time_field, edit=True, text="No keys found")
+                    print("No keyframes found on selected objects")
             else:
-                cmds.textField(keys_time_field, edit=True, text="No keys found")
-                print("No keyframes found on selected objects")
-        else:
-            print("No objects selected!")
+                print("No objects selected!")
     
-    # Function to execute the main attach to camera functionality
-    def attach_to_camera(*args):
-        # Get values from text fields
-        cam_obj = cmds.textField(camera_field, query=True, text=True)
-        master_obj = cmds.textField(master_field, query=True, text=True)
-        keys_time_text = cmds.textField(keys_time_field, query=True, text=True)
+        # Function to execute the main attach to camera functionality
+        def attach_to_camera(*args):
+            # Get values from text fields
+            cam_obj = cmds.textField(camera_field, query=True, text=True)
+            master_obj = cmds.textField(master_field, query=True, text=True)
+            keys_time_text = cmds.textField(keys_time_field, query=True, text=True)
         
-        # Validate inputs
-        if not cam_obj or cam_obj.strip() == "":
-            print("ERROR: No camera assigned!")
-            return
-        if not master_obj or master_obj.strip() == "":
-            print("ERROR: No master control assigned!")
-            return
-        if not keys_time_text or keys_time_text.strip() == "":
-            print("ERROR: No keys time assigned!")
-            return
+            # Validate inputs
+            if not cam_obj or cam_obj.strip() == "":
+                print("ERROR: No camera assigned!")
+                return
+            if not master_obj or master_obj.strip() == "":
+                print("ERROR: No master control assigned!")
+                return
+            if not keys_time_text or keys_time_text.strip() == "":
+                print("ERROR: No keys time assigned!")
+                return
 
-        sel = cmds.ls(sl=True)
-        for s in sel:
-            if cmds.objExists(s + "_esn_cam_attach_01"):
+            sel = cmds.ls(sl=True)
+            with names:
+                has_setup = [s for s in sel if names.exists(s + "_esn_cam_attach", 1, family="*_esn_cam_attach")]
+            if has_setup:
                 cmds.confirmDialog(
                     title='Warning',
-                    message='You have already done a setup on the selected objects. \n Please remove the old setup.',
+                    message='You have already done a setup on the selected objects. \n Please bake down the old setup first.',
                     button=['OK'],
                     defaultButton='OK',
                     icon='warning'
@@ -1258,173 +4464,148 @@ def show_ui():
 
 
         
-        # Parse the keys time string
-        try:
-            keys_time = [float(key.strip()) for key in keys_time_text.split(',') if key.strip()]
-        except ValueError:
-            print("ERROR: Invalid keys time format!")
-            return
-
-        cmds.currentTime(keys_time[0])
-        
-        print(f"Using camera: {cam_obj}")
-        print(f"Using master: {master_obj}")
-        print(f"Using keys time: {keys_time}")
-        
-        # Check if objects exist
-        if not cmds.objExists(cam_obj):
-            print(f"ERROR: Camera '{cam_obj}' does not exist!")
-            return
-        if not cmds.objExists(master_obj):
-            print(f"ERROR: Master control '{master_obj}' does not exist!")
-            return
-        
-        # Create follow cam group if it doesn't exist
-        follow_cam_grp = "FOLLOW_CAM_GRP"
-        if not cmds.objExists(follow_cam_grp):
-            cmds.group(n=follow_cam_grp, empty=True)
+            # Parse the keys time string
             try:
-                set_outliner_color("FOLLOW_CAM_GRP", (0.75, 0.5, 0.9)) 
-            except:
-                pass
-        
-        # Create controls
-        circle_ctrl = create_circle(master_name=master_obj)
-        loc_ctrl = create_locator()
-        
-        # Parent locator to circle, circle to group
-        cmds.parent(loc_ctrl, circle_ctrl)
-        cmds.parent(circle_ctrl, follow_cam_grp)
-        
-        # Create constraint between camera and circle
-        smart_constraint_create_attach_cam(cam_obj, circle_ctrl)
-        
-        # Make translate X, Y, Z not-keyable and hide them on circle
-        for axis in ['X', 'Y', 'Z']:
-            tran_attr = circle_ctrl + ".translate" + axis
-            cmds.setAttr(tran_attr, keyable=False)
-            cmds.setAttr(tran_attr, channelBox=False)
-        
-        # Make rotate X, Y, Z not-keyable and hide them on circle
-        for axis in ['X', 'Y', 'Z']:
-            rot_attr = circle_ctrl + ".rotate" + axis
-            cmds.setAttr(rot_attr, keyable=False)
-            cmds.setAttr(rot_attr, channelBox=False)
-        
-        # Animate the locator to match master at each keyframe
-        try:
-            cmds.refresh(suspend=True)
-            cmds.evaluationManager(mode="off")
-            cmds.waitCursor(state=True)
-            cur_time = cmds.currentTime(q=True)
-
-            for key in keys_time:
-                cmds.currentTime(key)
-                cmds.matchTransform(loc_ctrl, master_obj, pos=True, rot=True)
-                cmds.setKeyframe(loc_ctrl, at=("tx", "ty", "tz", "rx", "ry", "rz"))
+                keys_time = [float(key.strip()) for key in keys_time_text.split(',') if key.strip()]
+            except ValueError:
+                print("ERROR: Invalid keys time format!")
+                return
 
-            cmds.currentTime(cur_time)
-            cmds.refresh(suspend=False)
-            cmds.evaluationManager(mode="parallel") 
-            cmds.waitCursor(state=False)                           
-       
-        except Exception as e:
-            cmds.refresh(suspend=False)
-            cmds.evaluationManager(mode="parallel") 
-            cmds.waitCursor(state=False)            
-            return
-        
-        # Set key tangents after all keyframes are created
-        cmds.keyTangent(loc_ctrl, at=("tx", "ty", "tz", "rx", "ry", "rz"), itt="auto", ott="step")
-        
-        # Check if master_obj has keys, if not, add a key to lock its current position
-        master_keys = cmds.keyframe(master_obj, query=True, timeChange=True) or []
-        if not master_keys:
-            print(f"DEBUG: {master_obj} has no keys, adding key at current position")
-            cmds.setKeyframe(master_obj, at=("tx", "ty", "tz", "rx", "ry", "rz"))
-        
-        # Create the constraint between locator and master
-        constraints = simple_smart_constraint(loc_ctrl, master_obj, connect_to_attach_cam=True, attach_cam_object=circle_ctrl)
-        
-        # Always connect to blendParent1 after constraint creation
-        if constraints:
-            # Check if blendParent1 exists after constraint creation
-            if cmds.attributeQuery('blendParent1', node=master_obj, exists=True):
-                # If master_obj had no keys, set blendParent1 to 1 (on) first
-                if not master_keys:
-                    print(f"DEBUG: Setting {master_obj}.blendParent1 to 1 (on) for object with no original keys")
-                    cmds.setAttr(f"{master_obj}.blendParent1", 1)
-                
-                # Connect the Attach_Cam to blendParent1 for all objects
-                if cmds.attributeQuery('Attach_Cam', node=circle_ctrl, exists=True):
-                    try:
-                        print(f"DEBUG: Connecting {circle_ctrl}.Attach_Cam to {master_obj}.blendParent1")
-                        cmds.connectAttr(f"{circle_ctrl}.Attach_Cam", f"{master_obj}.blendParent1", force=True)
-                        print(f"SUCCESS: Connected {circle_ctrl}.Attach_Cam to {master_obj}.blendParent1")
-                    except Exception as e:
-                        print(f"ERROR connecting to blendParent1: {e}")
+            if np is not None:
+                attach_master_to_camera_task(cam_obj, master_obj, keys_time)
             else:
-                print(f"DEBUG: blendParent1 attribute not found on {master_obj}")
-        
-        print("ATTACH TO CAMERA operation completed!")
-    
+                attach_master_to_camera(cam_obj, master_obj, keys_time)
+
+        # Batch mode: every selected object is a master, sharing one camera track
+        def attach_selected_to_camera(*args):
+            cam_obj = cmds.textField(camera_field, query=True, text=True).strip()
+            keys_time_text = cmds.textField(keys_time_field, query=True, text=True)
+            if not cam_obj:
+                print("ERROR: No camera assigned!")
+                return
 
-    cam_row = cmds.rowLayout(
-        numberOfColumns=2,
-        columnAttach=[(1, 'both', 5), (2, 'both', 5)],
-        columnWidth2=(120, 120),
-        parent=attach_to_camera_layout
-    )
-    cmds.button(
-        label="Assign Camera",
-        command=assign_camera,
-        backgroundColor=[0.25, 0.25, 0.25],
-        parent=cam_row
-    )
-    camera_field = cmds.textField(parent=cam_row, backgroundColor=[0.19, 0.19, 0.19])
+            masters = []
+            with names:
+                for s in cmds.ls(sl=True):
+                    if names.exists(s + "_esn_cam_attach", 1, family="*_esn_cam_attach"):
+                        print(f"Skipping {s}: it already has a camera setup")
+                    else:
+                        masters.append(s)
+            if not masters:
+                print("ERROR: No masters without a setup selected!")
+                return
+
+            # Keys time field applies to everyone, empty means each master's own keys
+            try:
+                keys_time = [float(key.strip()) for key in (keys_time_text or "").split(',') if key.strip()]
+            except ValueError:
+                keys_time = []
+
+            attach_masters_to_camera(cam_obj, masters, keys_time)
     
 
-    master_row = cmds.rowLayout(
-        numberOfColumns=2,
-        columnAttach=[(1, 'both', 5), (2, 'both', 5)],
-        columnWidth2=(120, 120),
-        parent=attach_to_camera_layout
-    )
-    cmds.button(
-        label="Assign Master Ctrl",
-        command=assign_master_ctrl,
-        backgroundColor=[0.25, 0.25, 0.25],
-        parent=master_row
-    )
-    master_field = cmds.textField(parent=master_row, backgroundColor=[0.19, 0.19, 0.19])
+        cam_row = cmds.rowLayout(
+            numberOfColumns=2,
+            columnAttach=[(1, 'both', 5), (2, 'both', 5)],
+            columnWidth2=(120, 120),
+            parent=attach_to_camera_layout
+        )
+        cmds.button(
+            label="Assign Camera",
+            command=assign_camera,
+            backgroundColor=[0.25, 0.25, 0.25],
+            parent=cam_row
+        )
+        camera_field = cmds.textField(parent=cam_row, backgroundColor=[0.19, 0.19, 0.19])
     
 
-    keys_time_row = cmds.rowLayout(
-        numberOfColumns=2,
-        columnAttach=[(1, 'both', 5), (2, 'both', 5)],
-        columnWidth2=(120, 120),
-        parent=attach_to_camera_layout
-    )
-    cmds.button(
-        label="Assign Keys Time",
-        command=assign_keys_time,
-        backgroundColor=[0.25, 0.25, 0.25],
-        parent=keys_time_row
-    )
-    keys_time_field = cmds.textField(parent=keys_time_row, backgroundColor=[0.19, 0.19, 0.19])    
+        master_row = cmds.rowLayout(
+            numberOfColumns=2,
+            columnAttach=[(1, 'both', 5), (2, 'both', 5)],
+            columnWidth2=(120, 120),
+            parent=attach_to_camera_layout
+        )
+        cmds.button(
+            label="Assign Master Ctrl",
+            command=assign_master_ctrl,
+            backgroundColor=[0.25, 0.25, 0.25],
+            parent=master_row
+        )
+        master_field = cmds.textField(parent=master_row, backgroundColor=[0.19, 0.19, 0.19])
     
-    cmds.separator(height=1, style='none', parent=attach_to_camera_layout)
-
-    cmds.button(
-        label="ATTACH TO CAMERA",
-        command=attach_to_camera,
-        height=35,
-        backgroundColor=[0.35, 0.35, 0.35],
-        parent=attach_to_camera_layout,
-        align="center"
-    )
+
+        keys_time_row = cmds.rowLayout(
+            numberOfColumns=2,
+            columnAttach=[(1, 'both', 5), (2, 'both', 5)],
+            columnWidth2=(120, 120),
+            parent=attach_to_camera_layout
+        )
+        cmds.button(
+            label="Assign Keys Time",
+            command=assign_keys_time,
+            backgroundColor=[0.25, 0.25, 0.25],
+            parent=keys_time_row
+        )
+        keys_time_field = cmds.textField(parent=keys_time_row, backgroundColor=[0.19, 0.19, 0.19])    
     
-    cmds.showWindow(window)
+        cmds.separator(height=1, style='none', parent=attach_to_camera_layout)
+
+        attach_butt = cmds.button(
+            label="ATTACH TO CAMERA",
+            command=attach_to_camera,
+            height=35,
+            backgroundColor=[0.35, 0.35, 0.35],
+            parent=attach_to_camera_layout,
+            align="center"
+        )
+
+        attach_butt = cmds.popupMenu(parent=attach_butt)
+        cmds.menuItem(label='Attach All Selected Masters', command=attach_selected_to_camera, parent=attach_butt)
+
+        bake_down_butt = cmds.button(
+            label="Bake Down & Remove Setup",
+            command=ui_command(bake_down_camera_attach),
+            height=24,
+            backgroundColor=[0.22, 0.22, 0.22],
+            parent=attach_to_camera_layout
+        )
+
+        bake_down_butt = cmds.popupMenu(parent=bake_down_butt)
+        cmds.menuItem(label='Bake Down On 1s', command=ui_command(bake_down_camera_attach, cadence="1"), parent=bake_down_butt)
+        cmds.menuItem(label='Bake Down On 2s', command=ui_command(bake_down_camera_attach, cadence="2"), parent=bake_down_butt)
+        cmds.menuItem(label='Preview Bake Down', command=ui_command(bake_down_camera_attach, dry_run=True), parent=bake_down_butt)
+        return attach_to_camera_layout
+
+
+_twosify_window = None
+
+
+def show_ui():
+    """Opens the Twosify window, reusing the one already built."""
+    global _twosify_window
+    if _twosify_window is None:
+        _twosify_window = TwosifyWindow()
+    _twosify_window.show()
+
+
+# Source modification time when this module was imported, see launch()
+_SOURCE_MTIME = os.path.getmtime(__file__) if "__file__" in globals() else None
+
+
+def launch(reload_if_changed=False):
+    """
+    Shelf entry point when Twosify is installed as a module.
+    With reload_if_changed=True the module is reloaded first if its source
+    file changed since it was imported, for working on Twosify itself.
+    """
+    module = sys.modules[__name__]
+    if reload_if_changed and _SOURCE_MTIME is not None and os.path.getmtime(__file__) != _SOURCE_MTIME:
+        module = importlib.reload(module)
+        print(f"Reloaded Twosify from {module.__file__}")
+    module.show_ui()
 
 
-show_ui()
\ No newline at end of file
+# Running the file itself (script editor, old embedded shelf buttons) opens the UI,
+# importing it as a module does not
+if __name__ == "__main__" and cmds is not None:
+    show_ui()